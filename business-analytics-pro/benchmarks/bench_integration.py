@@ -0,0 +1,124 @@
+"""
+Benchmark de throughput e latência dos caminhos de busca do IntegrationManager.
+
+Executa cada caminho (Salesforce, SAP, TOTVS, dados financeiros e operacionais
+padronizados) contra o simulador local de ERP/CRM e reporta latência
+p50/p95/p99, requisições HTTP e registros por segundo.
+
+Uso:
+    python benchmarks/bench_integration.py --records 5000 --iterations 20 --latency-ms 10
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_project.erp_crm_integration import IntegrationManager  # noqa: E402
+from langchain_project.erp_crm_integration.simulator import ERPSimulator, SimulatorConfig  # noqa: E402
+
+
+def build_manager(simulator: ERPSimulator, respect_limits: bool) -> IntegrationManager:
+    """Configura um IntegrationManager apontando para o simulador"""
+    manager = IntegrationManager()
+    manager.logger.setLevel('WARNING')
+    if not respect_limits:
+        for system in ('salesforce', 'sap', 'totvs'):
+            manager.configure_rate_limit(system, rate=1e6, capacity=1e6)
+
+    manager.configure_salesforce('client', 'secret', 'user', 'pass', 'token', login_url=simulator.base_url)
+    manager.configure_sap(simulator.sap_base_url, 'user', 'pass', '100')
+    manager.configure_totvs(simulator.base_url, 'user', 'pass', '01', '0101')
+    return manager
+
+
+def fetch_paths(manager: IntegrationManager, records: int):
+    """Caminhos de busca medidos pelo benchmark"""
+    return {
+        'salesforce_opportunity': lambda: manager.get_salesforce_data(
+            'Opportunity', ['Id', 'Name', 'Amount', 'CloseDate', 'StageName', 'Type'], limit=records),
+        'sap_sales_orders': lambda: manager.get_sap_data('SalesOrderSet', top=records),
+        'sap_production_orders': lambda: manager.get_sap_data('ProductionOrderSet', top=records),
+        'totvs_invoices': lambda: manager.get_totvs_data('api/financial/v1/invoices'),
+        'financial_salesforce': lambda: manager.get_financial_data('salesforce', '2024-01-01', '2024-12-31'),
+        'financial_sap': lambda: manager.get_financial_data('sap', '2024-01-01', '2024-12-31'),
+        'financial_totvs': lambda: manager.get_financial_data('totvs', '2024-01-01', '2024-12-31'),
+        'operational_sap': lambda: manager.get_operational_data('sap', '2024-01-01', '2024-12-31'),
+        'operational_totvs': lambda: manager.get_operational_data('totvs', '2024-01-01', '2024-12-31'),
+    }
+
+
+def run_path(fetch, simulator: ERPSimulator, iterations: int, concurrency: int):
+    """Mede latência e throughput de um caminho de busca"""
+    def timed():
+        start = time.perf_counter()
+        df = fetch()
+        return time.perf_counter() - start, 0 if df is None else len(df), df is None
+
+    requests_before = simulator.request_count
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: timed(), range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    rows = sum(r[1] for r in results)
+    return {
+        'iterations': iterations,
+        'failures': sum(r[2] for r in results),
+        'http_requests': simulator.request_count - requests_before,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'calls_per_s': iterations / wall,
+        'rows_per_s': rows / wall
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do IntegrationManager contra o simulador")
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--paths', nargs='*', help="Subconjunto de caminhos a executar")
+    parser.add_argument('--respect-limits', action='store_true',
+                        help="Mantém os limites padrão de taxa do IntegrationManager")
+    parser.add_argument('--output', help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    # O cache de fallback é gravado no diretório atual; isolar em um diretório temporário
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix='bench_integration_'))
+
+    config = SimulatorConfig(records=args.records, page_size=args.page_size,
+                             latency_ms=args.latency_ms, latency_jitter_ms=args.latency_ms / 2,
+                             error_rate=args.error_rate)
+    results = {}
+    with ERPSimulator(config) as simulator:
+        manager = build_manager(simulator, args.respect_limits)
+        for name, fetch in fetch_paths(manager, args.records).items():
+            if args.paths and name not in args.paths:
+                continue
+            results[name] = run_path(fetch, simulator, args.iterations, args.concurrency)
+            r = results[name]
+            print(f"{name:<24} p50={r['p50_ms']:8.1f}ms p95={r['p95_ms']:8.1f}ms p99={r['p99_ms']:8.1f}ms "
+                  f"req={r['http_requests']:5d} rows/s={r['rows_per_s']:10.0f} falhas={r['failures']}")
+        results['_throttling'] = manager.get_throttling_metrics()
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark do controle de tentativas de login compartilhado.
+
+Simula uma rajada de credential stuffing: vários processos registram falhas
+em um mesmo banco SQLite (LoginAttemptTracker), espalhadas por muitos
+usuários, e em seguida repetem tentativas contra contas já bloqueadas.
+Reporta tentativas por segundo e latências p50/p95/p99 de cada caminho.
+
+Uso:
+    python benchmarks/bench_lockout.py --processes 4 --attempts 5000 --users 2000 --output bench_lockout.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_project.security_system.lockout import LoginAttemptTracker  # noqa: E402
+
+
+def run_worker(db_path: str, worker: int, attempts: int, users: int, max_attempts: int,
+               start_at: float):
+    """Registra falhas e consulta bloqueios como o login_user faria"""
+    tracker = LoginAttemptTracker(db_path)
+    tracker.logger.setLevel(logging.WARNING)
+    rng = np.random.default_rng(worker)
+    names = [f"user{i}" for i in rng.integers(0, users, attempts)]
+
+    # Todos os processos começam juntos para medir a contenção
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    failures, locked = [], []
+    start = time.perf_counter()
+    for name in names:
+        t0 = time.perf_counter()
+        if tracker.locked_until(name) is not None:
+            locked.append(time.perf_counter() - t0)
+            continue
+        tracker.record_failure(name, max_attempts, 600)
+        failures.append(time.perf_counter() - t0)
+    return {'seconds': time.perf_counter() - start, 'failures': failures, 'locked': locked}
+
+
+def summarize(latencies, seconds):
+    if not latencies:
+        return {'count': 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        'count': len(values),
+        'per_s': len(values) / seconds,
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do bloqueio de login compartilhado")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--attempts', type=int, default=5000, help="Tentativas por processo")
+    parser.add_argument('--users', type=int, default=2000, help="Usuários distintos atacados")
+    parser.add_argument('--max-attempts', type=int, default=5)
+    parser.add_argument('--db', help="Banco SQLite (padrão: arquivo temporário)")
+    parser.add_argument('--output', help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, 'login_attempts.db')
+        LoginAttemptTracker(db_path)
+        start_at = time.time() + 1.0
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            runs = list(executor.map(run_worker, [db_path] * args.processes, range(args.processes),
+                                     [args.attempts] * args.processes, [args.users] * args.processes,
+                                     [args.max_attempts] * args.processes,
+                                     [start_at] * args.processes))
+
+    seconds = max(run['seconds'] for run in runs)
+    results = {
+        'seconds': seconds,
+        'attempts_per_s': args.processes * args.attempts / seconds,
+        'record_failure': summarize([x for run in runs for x in run['failures']], seconds),
+        'locked_check': summarize([x for run in runs for x in run['locked']], seconds)
+    }
+
+    print(f"{args.processes} processos x {args.attempts} tentativas em {args.users} usuários: "
+          f"{results['attempts_per_s']:.0f} tentativas/s")
+    for path in ('record_failure', 'locked_check'):
+        r = results[path]
+        if r['count']:
+            print(f"{path:<15} n={r['count']:7d} p50={r['p50_ms']:.3f}ms "
+                  f"p95={r['p95_ms']:.3f}ms p99={r['p99_ms']:.3f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+"""
+Benchmark de tempo, memória e acurácia dos métodos de PredictiveAnalysis.
+
+Cada caso (método x tamanho) roda em um processo Python novo, de modo que
+o pico de RSS reflete apenas aquele caso. Os dados são sintéticos com
+verdade conhecida (períodos futuros retidos, anomalias injetadas, clusters
+gerados) ou séries gravadas em CSV. Os resultados são salvos em JSON e
+comparados com um baseline: tempo, memória ou acurácia piores que a
+tolerância são reportados como regressão (código de saída 1).
+
+Uso:
+    python benchmarks/bench_predictive.py --sizes small medium --output bench_predictive.json
+    python benchmarks/bench_predictive.py --sizes small --save-baseline benchmarks/baseline_predictive.json
+    python benchmarks/bench_predictive.py --sizes small --baseline benchmarks/baseline_predictive.json
+    python benchmarks/bench_predictive.py --recorded vendas.csv --cases forecast_ets forecast_auto
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES = {'small': 1, 'medium': 10, 'large': 50}
+HOLDOUT = 6
+
+# Direção de cada métrica de acurácia: True quando maior é melhor
+ACCURACY_DIRECTION = {'mae': False, 'mape': False, 'r2': True, 'precision': True,
+                      'recall': True, 'adjusted_rand': True, 'rules': True}
+
+
+def _seasonal_series(rng: np.random.Generator, n: int, level: float = 1000.0) -> np.ndarray:
+    """Série mensal com tendência, sazonalidade anual e ruído"""
+    t = np.arange(n)
+    return level * (1 + 0.01 * t) + 0.1 * level * np.sin(2 * np.pi * t / 12) + rng.normal(0, 0.03 * level, n)
+
+
+def _long_panel(rng: np.random.Generator, series: int, points: int) -> pd.DataFrame:
+    """Painel longo de séries mensais identificadas por 'serie'"""
+    values = np.concatenate([_seasonal_series(rng, points, rng.uniform(100, 5000)) for _ in range(series)])
+    return pd.DataFrame({
+        'serie': np.repeat(np.arange(series), points),
+        'data': np.tile(pd.date_range('2015-01-31', periods=points, freq='M').to_numpy(), series),
+        'valor': values
+    })
+
+
+def _holdout_accuracy(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    return {'mae': float(np.mean(np.abs(actual - predicted))),
+            'mape': float(np.mean(np.abs((actual - predicted) / actual)) * 100)}
+
+
+def _forecast_case(model_type: str):
+    def run(analysis, scale, rng, recorded):
+        if recorded is not None:
+            history = recorded.groupby('data', as_index=False)['valor'].sum()
+        else:
+            n = 24 * scale + 24 + HOLDOUT
+            history = pd.DataFrame({'data': pd.date_range('2015-01-31', periods=n, freq='M'),
+                                    'valor': _seasonal_series(rng, n)})
+        train, future = history.iloc[:-HOLDOUT], history['valor'].to_numpy()[-HOLDOUT:]
+
+        def call():
+            return analysis.forecast_time_series(train, 'data', 'valor', periods=HOLDOUT,
+                                                 model_type=model_type)
+        result_df, _ = yield call
+        predicted = result_df.loc[result_df['tipo'] == 'previsão', 'valor'].to_numpy()
+        yield _holdout_accuracy(future, predicted)
+    return run
+
+
+def _forecast_many_case(analysis, scale, rng, recorded):
+    panel = recorded if recorded is not None and 'serie' in recorded else _long_panel(rng, 20 * scale, 36 + HOLDOUT)
+    panel = panel.sort_values(['serie', 'data'])
+    holdout = panel.groupby('serie').cumcount(ascending=False) < HOLDOUT
+    train, future = panel[~holdout], panel[holdout]
+
+    def call():
+        return analysis.forecast_many(train, ['serie'], 'data', 'valor', periods=HOLDOUT, model_type='ets')
+    result_df, _, failures = yield call
+    predicted = result_df[result_df['tipo'] == 'previsão'].sort_values(['serie', 'data'])
+    actual = future.sort_values(['serie', 'data'])
+    accuracy = _holdout_accuracy(actual['valor'].to_numpy(), predicted['valor'].to_numpy()) \
+        if len(predicted) == len(actual) else {}
+    yield {**accuracy, 'failures': len(failures)}
+
+
+def _analyze_trend_case(analysis, scale, rng, recorded):
+    n = 48 * scale
+    df = pd.DataFrame({'data': pd.date_range('2000-01-31', periods=n, freq='M'),
+                       'valor': _seasonal_series(rng, n)})
+    yield lambda: analysis.analyze_trend(df, 'data', 'valor')
+    yield {}
+
+
+def _analyze_trend_many_case(analysis, scale, rng, recorded):
+    panel = _long_panel(rng, 200 * scale, 36)
+    result = yield lambda: analysis.analyze_trend_many(panel, ['serie'], 'data', 'valor')
+    # Todas as séries sintéticas têm tendência de alta
+    yield {'precision': float((result['summary']['total_growth_pct'] > 0).mean())}
+
+
+def _detect_anomalies_case(analysis, scale, rng, recorded):
+    panel = _long_panel(rng, 1000 * scale, 36)
+    injected = rng.random(len(panel)) < 0.005
+    scale_by_row = panel.groupby('serie')['valor'].transform('std').to_numpy()
+    panel.loc[injected, 'valor'] += 8 * scale_by_row[injected]
+    result = yield lambda: analysis.detect_anomalies(panel, 'valor', method='mad', threshold=3.5,
+                                                     group_columns=['serie'], date_column='data')
+    flagged = result['anomalia'].to_numpy(dtype=bool)
+    hits = int((flagged & injected).sum())
+    yield {'precision': hits / max(1, int(flagged.sum())), 'recall': hits / max(1, int(injected.sum()))}
+
+
+def _regression_frame(rng, rows: int) -> pd.DataFrame:
+    X = rng.normal(size=(rows, 10))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) * 2 + X[:, 2] * X[:, 3] + rng.normal(0, 0.5, rows)
+    df = pd.DataFrame(X, columns=[f"x{i}" for i in range(10)])
+    df['alvo'] = y
+    return df
+
+
+def _train_case(analysis, scale, rng, recorded):
+    df = _regression_frame(rng, 5000 * scale)
+    features = [f"x{i}" for i in range(10)]
+    metrics = yield lambda: analysis.train_prediction_model(df, 'alvo', features, 'bench',
+                                                            model_type='hist_gradient_boosting')
+    yield {'r2': float(metrics['r2']), 'mae': float(metrics['mae'])}
+
+
+def _predict_case(analysis, scale, rng, recorded):
+    features = [f"x{i}" for i in range(10)]
+    analysis.train_prediction_model(_regression_frame(rng, 5000), 'alvo', features, 'bench',
+                                    model_type='hist_gradient_boosting')
+    df = _regression_frame(rng, 50000 * scale)
+    predicted = yield lambda: analysis.predict(df, 'bench', features)
+    yield {'mae': float(np.mean(np.abs(np.asarray(predicted) - df['alvo'].to_numpy())))}
+
+
+def _market_basket_case(analysis, scale, rng, recorded):
+    transactions = 2000 * scale
+    sizes = rng.integers(1, 6, transactions)
+    items = rng.zipf(1.6, sizes.sum()) % 200
+    df = pd.DataFrame({'transacao': np.repeat(np.arange(transactions), sizes), 'item': items})
+    result = yield lambda: analysis.market_basket_analysis(df, 'item', 'transacao', min_support=0.01)
+    yield {'rules': len(result.get('rules', []))}
+
+
+def _segmentation_case(analysis, scale, rng, recorded):
+    rows = 5000 * scale
+    truth = rng.integers(0, 4, rows)
+    centers = np.array([[10, 2, 100], [60, 8, 600], [120, 15, 2000], [30, 25, 5000]])
+    values = centers[truth] * rng.normal(1, 0.1, (rows, 3))
+    df = pd.DataFrame(values, columns=['recencia', 'frequencia', 'valor'])
+    result = yield lambda: analysis.customer_segmentation(df, ['recencia', 'frequencia', 'valor'], n_clusters=4)
+    from sklearn.metrics import adjusted_rand_score
+    yield {'adjusted_rand': float(adjusted_rand_score(truth, result['segmento']))}
+
+
+def _hierarchical_case(analysis, scale, rng, recorded):
+    panel = _long_panel(rng, 20 * scale, 36 + HOLDOUT)
+    panel['regiao'] = panel['serie'] % 4
+    cutoff = panel['data'].sort_values().unique()[-HOLDOUT]
+    train = panel[panel['data'] < cutoff]
+    future_total = panel[panel['data'] >= cutoff].groupby('data')['valor'].sum().to_numpy()
+    result_df, _ = yield lambda: analysis.forecast_hierarchical(train, ['regiao', 'serie'], 'data', 'valor',
+                                                                periods=HOLDOUT, method='mint')
+    total = result_df[(result_df['nivel'] == 'total') & (result_df['tipo'] == 'previsão')]
+    yield _holdout_accuracy(future_total, total['valor'].to_numpy())
+
+
+def _rfm_segmentation_case(analysis, scale, rng, recorded):
+    rows = 20000 * scale
+    df = pd.DataFrame({
+        'cliente_id': rng.integers(0, rows // 10, rows),
+        'data': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), 'D'),
+        'valor': rng.gamma(2, 100, rows)
+    })
+    result = yield lambda: analysis.rfm_segmentation(df, reference_date='2024-01-01')
+    yield {'customers': len(result)}
+
+
+CASES = {
+    'forecast_arima': _forecast_case('arima'),
+    'forecast_ets': _forecast_case('ets'),
+    'forecast_theta': _forecast_case('theta'),
+    'forecast_auto': _forecast_case('auto'),
+    'forecast_many': _forecast_many_case,
+    'forecast_hierarchical': _hierarchical_case,
+    'analyze_trend': _analyze_trend_case,
+    'analyze_trend_many': _analyze_trend_many_case,
+    'detect_anomalies': _detect_anomalies_case,
+    'train_prediction_model': _train_case,
+    'predict': _predict_case,
+    'market_basket_analysis': _market_basket_case,
+    'customer_segmentation': _segmentation_case,
+    'rfm_segmentation': _rfm_segmentation_case,
+}
+
+# Casos que aceitam séries gravadas (CSV com data, valor e opcionalmente serie)
+RECORDED_CASES = {'forecast_arima', 'forecast_ets', 'forecast_theta', 'forecast_auto', 'forecast_many'}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        # ru_maxrss é reportado em KB no Linux e em bytes no macOS
+        divisor = 1024 ** 2 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    except ImportError:
+        return None
+
+
+def run_case(name: str, size: str, seed: int, recorded_path: str = None) -> dict:
+    """Executa um caso no processo atual (chamado no processo filho)"""
+    from langchain_project.analytics import PredictiveAnalysis
+
+    logging.disable(logging.WARNING)
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    # Cache de ordens ARIMA e registro de modelos isolados por execução
+    os.chdir(tempfile.mkdtemp(prefix='bench_predictive_'))
+    recorded = None
+    if recorded_path:
+        recorded = pd.read_csv(recorded_path, parse_dates=['data'])
+
+    analysis = PredictiveAnalysis()
+    case = CASES[name](analysis, SIZES[size], np.random.default_rng(seed), recorded)
+    call = next(case)
+
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    result = call()
+    wall = time.perf_counter() - start
+    peak = _peak_rss_mb()
+
+    return {
+        'wall_s': wall,
+        'peak_rss_mb': peak,
+        'rss_before_mb': rss_before,
+        'accuracy': case.send(result)
+    }
+
+
+def run_isolated(name: str, size: str, seed: int, recorded_path: str = None, timeout: float = 1800) -> dict:
+    """Executa um caso em um processo Python novo e devolve o resultado"""
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', name, '--size', size,
+               '--seed', str(seed)]
+    if recorded_path:
+        command += ['--recorded', os.path.abspath(recorded_path)]
+    completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'falha'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float, memory_tolerance: float,
+            accuracy_tolerance: float) -> list:
+    """Compara os resultados com o baseline e lista as regressões"""
+    regressions = []
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if not reference or 'error' in reference:
+            continue
+        if 'error' in current:
+            regressions.append({'case': key, 'metric': 'error', 'current': current['error']})
+            continue
+        if current['wall_s'] > reference['wall_s'] * (1 + time_tolerance):
+            regressions.append({'case': key, 'metric': 'wall_s', 'baseline': reference['wall_s'],
+                                'current': current['wall_s']})
+        if current.get('peak_rss_mb') and reference.get('peak_rss_mb') and \
+                current['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + memory_tolerance):
+            regressions.append({'case': key, 'metric': 'peak_rss_mb', 'baseline': reference['peak_rss_mb'],
+                                'current': current['peak_rss_mb']})
+        for metric, higher_is_better in ACCURACY_DIRECTION.items():
+            old, new = reference.get('accuracy', {}).get(metric), current.get('accuracy', {}).get(metric)
+            if old is None or new is None or not np.isfinite(old) or not np.isfinite(new):
+                continue
+            margin = accuracy_tolerance * max(abs(old), 1e-9)
+            if (higher_is_better and new < old - margin) or (not higher_is_better and new > old + margin):
+                regressions.append({'case': key, 'metric': metric, 'baseline': old, 'current': new})
+    return regressions
+
+
+def environment() -> dict:
+    import sklearn
+    import statsmodels
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'statsmodels': statsmodels.__version__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos métodos de PredictiveAnalysis")
+    parser.add_argument('--cases', nargs='*', default=list(CASES), help="Subconjunto de casos")
+    parser.add_argument('--sizes', nargs='*', default=['small', 'medium'], choices=list(SIZES))
+    parser.add_argument('--recorded', nargs='*', default=[],
+                        help="CSVs gravados com colunas data, valor e opcionalmente serie")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', help="JSON de baseline para detectar regressões")
+    parser.add_argument('--save-baseline', help="Salva os resultados atuais como baseline")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.10)
+    parser.add_argument('--output', help="Arquivo JSON para salvar os resultados")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--size', default='small', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        recorded = args.recorded[0] if args.recorded else None
+        print(json.dumps(run_case(args.run_case, args.size, args.seed, recorded), default=float))
+        return
+
+    jobs = [(name, size, None) for name in args.cases for size in args.sizes]
+    jobs += [(name, 'small', path) for path in args.recorded for name in args.cases if name in RECORDED_CASES]
+
+    results = {}
+    for name, size, path in jobs:
+        key = f"{name}/{size}" if path is None else f"{name}/{os.path.basename(path)}"
+        results[key] = r = run_isolated(name, size, args.seed, path)
+        if 'error' in r:
+            print(f"{key:<40} ERRO: {r['error']}")
+            continue
+        accuracy = ' '.join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                            for k, v in r['accuracy'].items())
+        print(f"{key:<40} {r['wall_s'] * 1000:10.1f}ms pico_rss={r['peak_rss_mb'] or 0:8.1f}MB {accuracy}")
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance,
+                              args.accuracy_tolerance)
+        for r in regressions:
+            print(f"REGRESSÃO {r['case']} {r['metric']}: {r.get('baseline')} -> {r['current']}")
+        print(f"{len(regressions)} regressões em relação ao baseline")
+
+    report = {'config': vars(args), 'environment': environment(), 'results': results,
+              'regressions': regressions}
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
 from .predictive_analysis import PredictiveAnalysis
+from .model_registry import ModelRegistry
+from .anomaly_stream import OnlineAnomalyDetector
+from .rfm import RFMBuilder
+from .memoization import ResultCache
 
-__all__ = ['PredictiveAnalysis']
+__all__ = ['PredictiveAnalysis', 'ModelRegistry', 'OnlineAnomalyDetector', 'RFMBuilder', 'ResultCache']
@@ -0,0 +1,472 @@
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .model_registry import validate_path_component
+
+
+class WelfordMoments:
+    """Média e variância acumuladas pelo algoritmo de Welford (atualização O(1))"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+
+class EWMAMoments:
+    """Média e variância com ponderação exponencial (meia-vida controlada por alpha)"""
+
+    def __init__(self, alpha: float = 0.1, count: int = 0, mean: float = 0.0, var: float = 0.0):
+        self.alpha = alpha
+        self.count = count
+        self.mean = mean
+        self.var = var
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        delta = value - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + delta * increment)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'alpha': self.alpha, 'count': self.count, 'mean': self.mean, 'var': self.var}
+
+
+class RollingMoments:
+    """
+    Média e variância das últimas window observações.
+
+    A entrada de um valor e a saída do mais antigo atualizam média e soma
+    dos quadrados dos desvios pelas fórmulas de Welford/West, numericamente
+    estáveis mesmo para valores grandes com pouca variação.
+    """
+
+    def __init__(self, window: int = 30, values: Optional[List[float]] = None):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        for value in list(values or [])[-window:]:
+            self.update(value)
+
+    def update(self, value: float):
+        if len(self.values) == self.window:
+            # Substituição: o valor mais antigo sai e o novo entra com n constante
+            oldest = self.values[0]
+            previous_mean = self.mean
+            self.mean += (value - oldest) / self.window
+            self.m2 += (value - oldest) * (value - self.mean + oldest - previous_mean)
+        else:
+            delta = value - self.mean
+            self.mean += delta / (len(self.values) + 1)
+            self.m2 += delta * (value - self.mean)
+        self.m2 = max(self.m2, 0.0)
+        self.values.append(value)
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def std(self) -> float:
+        n = len(self.values)
+        return math.sqrt(self.m2 / n) if n > 1 else 0.0
+
+    def quantile(self, p: float) -> float:
+        return float(np.percentile(self.values, p * 100)) if self.values else float('nan')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'window': self.window, 'values': list(self.values)}
+
+
+class P2Quantile:
+    """
+    Estimador de quantil em fluxo pelo algoritmo P² (Jain & Chlamtac, 1985).
+
+    Mantém apenas cinco marcadores, com atualização O(1) e memória constante.
+    """
+
+    def __init__(self, p: float, count: int = 0, heights: Optional[List[float]] = None,
+                 positions: Optional[List[float]] = None, desired: Optional[List[float]] = None):
+        self.p = p
+        self.count = count
+        self.heights = heights or []
+        self.positions = positions or [0.0, 1.0, 2.0, 3.0, 4.0]
+        self.desired = desired or [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update(self, value: float):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if len(q) < 5:
+            q.append(value)
+            q.sort()
+            return
+
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= value < q[i + 1])
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Ajustar os marcadores centrais que se afastaram da posição desejada
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = candidate
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        if not self.heights:
+            return float('nan')
+        if len(self.heights) < 5 or self.count < 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        return self.heights[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'p': self.p, 'count': self.count, 'heights': self.heights,
+                'positions': self.positions, 'desired': self.desired}
+
+
+class _MetricState:
+    """Estado incremental de uma métrica de um tenant"""
+
+    def __init__(self, window: str, alpha: float, window_size: int):
+        if window == 'ewma':
+            self.moments = EWMAMoments(alpha)
+        elif window == 'rolling':
+            self.moments = RollingMoments(window_size)
+        else:
+            self.moments = WelfordMoments()
+        self.q1 = P2Quantile(0.25)
+        self.q3 = P2Quantile(0.75)
+        self.anomalies = 0
+
+    def update(self, value: float):
+        self.moments.update(value)
+        if not isinstance(self.moments, RollingMoments):
+            self.q1.update(value)
+            self.q3.update(value)
+
+    def quartiles(self):
+        if isinstance(self.moments, RollingMoments):
+            return self.moments.quantile(0.25), self.moments.quantile(0.75)
+        return self.q1.value, self.q3.value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'moments': self.moments.to_dict(), 'q1': self.q1.to_dict(),
+                'q3': self.q3.to_dict(), 'anomalies': self.anomalies}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: str, alpha: float,
+                  window_size: int) -> '_MetricState':
+        state = cls(window, alpha, window_size)
+        moments = data['moments']
+        if window == 'ewma':
+            state.moments = EWMAMoments(**moments)
+        elif window == 'rolling':
+            state.moments = RollingMoments(window_size, moments['values'])
+        else:
+            state.moments = WelfordMoments(**moments)
+        state.q1 = P2Quantile(**data['q1'])
+        state.q3 = P2Quantile(**data['q3'])
+        state.anomalies = data.get('anomalies', 0)
+        return state
+
+
+class OnlineAnomalyDetector:
+    """
+    Detector de anomalias incremental por tenant e métrica.
+
+    Cada ponto é pontuado em O(1) contra o estado acumulado da métrica
+    (momentos de Welford, EWMA ou janela móvel e quartis P²) e depois
+    incorporado ao estado, sem reprocessar o histórico. O estado é
+    persistido em data/tenants/<tenant>/models/anomaly_state.json.
+    """
+
+    METHODS = ('std', 'iqr')
+    WINDOWS = ('cumulative', 'ewma', 'rolling')
+
+    def __init__(self, method: str = 'std', threshold: float = 3.0, window: str = 'cumulative',
+                 alpha: float = 0.1, window_size: int = 30, warmup: int = 10,
+                 update_on_anomaly: bool = True, base_dir: Optional[str] = None):
+        """
+        Inicializa o detector.
+
+        Args:
+            method: Método de detecção ('std', 'iqr')
+            threshold: Limiar para considerar anomalia
+            window: Janela das estatísticas ('cumulative', 'ewma', 'rolling'); com 'iqr',
+                os quartis são P² acumulados, exceto em 'rolling', que usa a janela
+            alpha: Fator de suavização da EWMA
+            window_size: Tamanho da janela móvel
+            warmup: Observações mínimas antes de marcar anomalias
+            update_on_anomaly: Incorpora pontos anômalos ao estado
+            base_dir: Diretório base dos tenants (padrão: data/tenants)
+
+        Raises:
+            ValueError: Se o método ou a janela não forem suportados
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Método de detecção de anomalias não suportado: {method}")
+        if window not in self.WINDOWS:
+            raise ValueError(f"Janela não suportada: {window}")
+
+        self.logger = self._setup_logger()
+        self.method = method
+        self.threshold = threshold
+        self.window = window
+        self.alpha = alpha
+        self.window_size = window_size
+        self.warmup = warmup
+        self.update_on_anomaly = update_on_anomaly
+        self.base_dir = base_dir or os.path.join(os.getcwd(), 'data', 'tenants')
+        self.states: Dict[str, Dict[str, _MetricState]] = {}
+        self._lock = threading.Lock()
+
+    def _setup_logger(self):
+        """Configura o logger para o detector de anomalias"""
+        logger = logging.getLogger("PredictiveAnalysis")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _state_path(self, tenant_id: str) -> str:
+        return os.path.join(self.base_dir, validate_path_component(tenant_id, 'tenant_id'),
+                            'models', 'anomaly_state.json')
+
+    def _config(self) -> Dict[str, Any]:
+        # O método não altera o estado acumulado; apenas a janela o define
+        return {'window': self.window, 'alpha': self.alpha, 'window_size': self.window_size}
+
+    def _tenant_states(self, tenant_id: str) -> Dict[str, _MetricState]:
+        """Estados de um tenant, carregados do disco no primeiro acesso (ValueError se o ID for inválido)"""
+        if tenant_id not in self.states:
+            validate_path_component(tenant_id, 'tenant_id')
+            self.states[tenant_id] = self._load_tenant(tenant_id)
+        return self.states[tenant_id]
+
+    def _load_tenant(self, tenant_id: str) -> Dict[str, _MetricState]:
+        path = self._state_path(tenant_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('config') != self._config():
+                self.logger.warning(f"Estado de anomalias de {tenant_id} com outra configuração, ignorando")
+                return {}
+            return {metric: _MetricState.from_dict(state, self.window, self.alpha, self.window_size)
+                    for metric, state in data['metrics'].items()}
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar estado de anomalias de {tenant_id}: {str(e)}")
+            return {}
+
+    def score(self, tenant_id: str, metric: str, value: float) -> Dict[str, Any]:
+        """
+        Pontua um novo valor e o incorpora ao estado da métrica.
+
+        O score é calculado com o estado anterior ao ponto, de modo que o
+        próprio ponto não mascara a anomalia.
+
+        Args:
+            tenant_id: ID do tenant
+            metric: Nome da métrica
+            value: Novo valor observado
+
+        Returns:
+            Dicionário com valor, score, anomalia e as estatísticas usadas
+        """
+        with self._lock:
+            states = self._tenant_states(tenant_id)
+            state = states.get(metric)
+            if state is None:
+                state = states[metric] = _MetricState(self.window, self.alpha, self.window_size)
+
+            result = self._score_value(state, value)
+            if result['anomalia']:
+                state.anomalies += 1
+            if not result['anomalia'] or self.update_on_anomaly:
+                state.update(value)
+            return result
+
+    def _score_value(self, state: _MetricState, value: float) -> Dict[str, Any]:
+        """Score de um valor contra o estado atual, sem atualizá-lo"""
+        result = {'valor': value, 'score': 0.0, 'anomalia': False}
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            result['valor'] = float('nan')
+            return result
+
+        ready = state.moments.count >= self.warmup
+        if self.method == 'std':
+            mean, std = state.moments.mean, state.moments.std
+            result.update({'media': mean, 'desvio': std})
+            if ready and std > 0:
+                result['score'] = abs(value - mean) / std
+                result['anomalia'] = result['score'] > self.threshold
+        else:
+            q1, q3 = state.quartiles()
+            iqr = q3 - q1
+            lower, upper = q1 - self.threshold * iqr, q3 + self.threshold * iqr
+            result.update({'limite_inferior': lower, 'limite_superior': upper})
+            if ready and iqr > 0:
+                result['anomalia'] = value < lower or value > upper
+                result['score'] = max(lower - value, value - upper) / iqr if result['anomalia'] else 0.0
+        return result
+
+    def score_many(self, tenant_id: str, metric: str, values: Iterable[float]) -> pd.DataFrame:
+        """
+        Pontua uma sequência de valores de uma métrica, em ordem.
+
+        Args:
+            tenant_id: ID do tenant
+            metric: Nome da métrica
+            values: Valores em ordem de chegada
+
+        Returns:
+            DataFrame com uma linha por valor
+        """
+        return pd.DataFrame([self.score(tenant_id, metric, value) for value in values])
+
+    def score_frame(self, df: pd.DataFrame, value_column: str,
+                    metric_column: Optional[str] = None, tenant_column: Optional[str] = None,
+                    metric: Optional[str] = None, tenant_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Pontua as linhas de um lote novo (ex: registros recém-sincronizados do ERP).
+
+        Args:
+            df: DataFrame com os novos pontos, em ordem de chegada
+            value_column: Coluna com os valores
+            metric_column: Coluna com o nome da métrica (ou use metric)
+            tenant_column: Coluna com o tenant (ou use tenant_id)
+            metric: Métrica fixa para todas as linhas
+            tenant_id: Tenant fixo para todas as linhas
+
+        Returns:
+            Cópia do DataFrame com as colunas 'anomalia' e 'score'
+        """
+        tenants = df[tenant_column].to_numpy() if tenant_column else [tenant_id] * len(df)
+        metrics = df[metric_column].to_numpy() if metric_column else [metric] * len(df)
+        values = df[value_column].to_numpy(dtype=float)
+
+        scores = [self.score(str(t), str(m), float(v)) for t, m, v in zip(tenants, metrics, values)]
+        result_df = df.copy()
+        result_df['anomalia'] = [s['anomalia'] for s in scores]
+        result_df['score'] = [s['score'] for s in scores]
+
+        self.logger.info(f"Detecção de anomalias em fluxo: {int(result_df['anomalia'].sum())} "
+                         f"anomalias em {len(result_df)} pontos")
+        return result_df
+
+    def get_stats(self, tenant_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Estatísticas atuais das métricas de um tenant.
+
+        Args:
+            tenant_id: ID do tenant
+
+        Returns:
+            Dicionário por métrica com contagem, média, desvio, quartis e anomalias
+        """
+        with self._lock:
+            stats = {}
+            for metric, state in self._tenant_states(tenant_id).items():
+                q1, q3 = state.quartiles()
+                stats[metric] = {'count': state.moments.count, 'media': state.moments.mean,
+                                 'desvio': state.moments.std, 'q1': q1, 'q3': q3,
+                                 'anomalias': state.anomalies}
+            return stats
+
+    def save_state(self, tenant_id: Optional[str] = None) -> bool:
+        """
+        Persiste o estado em disco.
+
+        Args:
+            tenant_id: Tenant a salvar (padrão: todos os carregados)
+
+        Returns:
+            True se salvo com sucesso
+        """
+        try:
+            with self._lock:
+                tenants = [tenant_id] if tenant_id else list(self.states)
+                for tenant in tenants:
+                    path = self._state_path(tenant)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    data = {'config': self._config(),
+                            'metrics': {metric: state.to_dict()
+                                        for metric, state in self.states.get(tenant, {}).items()}}
+                    with open(f"{path}.tmp", 'w') as f:
+                        json.dump(data, f)
+                    os.replace(f"{path}.tmp", path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar estado de anomalias: {str(e)}")
+            return False
+
+    def reset(self, tenant_id: str, metric: Optional[str] = None):
+        """
+        Descarta o estado de uma métrica ou de todas as métricas de um tenant.
+
+        Args:
+            tenant_id: ID do tenant
+            metric: Métrica a descartar (padrão: todas)
+        """
+        with self._lock:
+            if metric is None:
+                self.states[tenant_id] = {}
+            else:
+                self._tenant_states(tenant_id).pop(metric, None)
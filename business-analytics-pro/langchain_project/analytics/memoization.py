@@ -0,0 +1,328 @@
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import joblib
+import pandas as pd
+
+from .model_registry import validate_path_component
+
+# Incrementar quando a forma ou o conteúdo dos resultados memoizados mudar, invalidando o disco
+CACHE_VERSION = 2
+
+GLOBAL_SCOPE = '_global'
+
+
+def data_fingerprint(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> str:
+    """
+    Hash rápido do conteúdo de um DataFrame.
+
+    Combina nomes, dtypes e o hash vetorizado das linhas (hash_pandas_object)
+    das colunas informadas, ou de todas as colunas.
+
+    Args:
+        df: DataFrame de entrada
+        columns: Colunas consideradas (padrão: todas)
+
+    Returns:
+        Digest hexadecimal
+    """
+    data = df if columns is None else df[list(columns)]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(c), str(t)) for c, t in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class _SharedMemoryTier:
+    """
+    LRU em memória dos resultados serializados, compartilhado pelo processo.
+
+    Os resultados ficam como bytes de pickle: cada leitura devolve uma cópia
+    nova, de modo que uma sessão que altere o DataFrame recebido não corrompe
+    o cache das demais, e o limite é aplicado pelo tamanho real em bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._size += len(payload)
+            self._evict()
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def invalidate(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._size -= len(self._entries.pop(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_memory_tier = _SharedMemoryTier()
+
+
+class ResultCache:
+    """
+    Cache de resultados de análises com camada em memória e em disco.
+
+    As entradas são isoladas por tenant: em memória pelo prefixo da chave e
+    em disco em cache/results/<tenant>/<método>/<chave>.pkl. A chave combina
+    o método, os parâmetros e o hash do conteúdo das colunas de entrada, de
+    modo que dados alterados geram uma nova entrada em vez de um resultado
+    desatualizado. Resultados maiores que max_disk_mb ficam apenas em
+    memória: relê-los do disco custaria quase tanto quanto recalculá-los.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, ttl_hours: Optional[float] = 24 * 7,
+                 persist: bool = True, max_disk_mb: Optional[float] = 64):
+        """
+        Inicializa o cache de resultados.
+
+        Args:
+            base_dir: Diretório do cache em disco (padrão: cache/results)
+            ttl_hours: Validade das entradas em disco (None para não expirar)
+            persist: Se False, usa apenas a camada em memória
+            max_disk_mb: Tamanho máximo de um resultado gravado em disco (None sem limite)
+        """
+        self.logger = self._setup_logger()
+        self.base_dir = base_dir or os.path.join(os.getcwd(), 'cache', 'results')
+        self.ttl_hours = ttl_hours
+        self.persist = persist
+        self.max_disk_bytes = None if max_disk_mb is None else int(max_disk_mb * 1024 * 1024)
+        self.memory = _memory_tier
+        self.disk_hits = 0
+
+    def _setup_logger(self):
+        """Configura o logger para o cache de resultados"""
+        logger = logging.getLogger("ResultCache")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    @staticmethod
+    def set_memory_limit(max_mb: float):
+        """Define o tamanho máximo da camada em memória compartilhada pelo processo"""
+        _memory_tier.resize(int(max_mb * 1024 * 1024))
+
+    def _memory_key(self, tenant_id: Optional[str], method: str, key: str) -> str:
+        # Inclui o diretório base para que caches distintos não compartilhem entradas
+        return f"{self.base_dir}|{tenant_id or GLOBAL_SCOPE}|{method}|{key}"
+
+    def _path(self, tenant_id: Optional[str], method: str, key: str) -> str:
+        return os.path.join(self.base_dir, validate_path_component(tenant_id or GLOBAL_SCOPE, 'tenant_id'),
+                            validate_path_component(method, 'método'), f"{key}.pkl")
+
+    def get(self, tenant_id: Optional[str], method: str, key: str) -> Tuple[bool, Any]:
+        """
+        Obtém um resultado memoizado.
+
+        Args:
+            tenant_id: ID do tenant (None para o escopo global)
+            method: Nome do método
+            key: Chave do resultado
+
+        Returns:
+            Tuple (encontrado, resultado)
+        """
+        memory_key = self._memory_key(tenant_id, method, key)
+        payload = self.memory.get(memory_key)
+
+        if payload is None and self.persist:
+            try:
+                path = self._path(tenant_id, method, key)
+                if self.ttl_hours is not None and time.time() - os.path.getmtime(path) > self.ttl_hours * 3600:
+                    os.remove(path)
+                else:
+                    with open(path, 'rb') as f:
+                        payload = f.read()
+                    self.memory.put(memory_key, payload)
+                    self.disk_hits += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                self.logger.warning(f"Erro ao ler resultado em cache {method}/{key}: {str(e)}")
+
+        if payload is None:
+            return False, None
+        try:
+            return True, pickle.loads(payload)
+        except Exception as e:
+            self.logger.warning(f"Resultado em cache inválido {method}/{key}: {str(e)}")
+            return False, None
+
+    def put(self, tenant_id: Optional[str], method: str, key: str, result: Any) -> bool:
+        """
+        Armazena um resultado nas camadas em memória e em disco.
+
+        Args:
+            tenant_id: ID do tenant (None para o escopo global)
+            method: Nome do método
+            key: Chave do resultado
+            result: Resultado serializável com pickle
+
+        Returns:
+            True se armazenado com sucesso
+        """
+        try:
+            # Validar o tenant e o método antes de qualquer camada
+            path = self._path(tenant_id, method, key)
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            self.memory.put(self._memory_key(tenant_id, method, key), payload)
+
+            if self.persist and (self.max_disk_bytes is None or len(payload) <= self.max_disk_bytes):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar resultado em cache {method}/{key}: {str(e)}")
+            return False
+
+    def clear(self, tenant_id: Optional[str] = None) -> bool:
+        """
+        Remove os resultados de um tenant ou de todos.
+
+        Args:
+            tenant_id: ID do tenant (padrão: todos)
+
+        Returns:
+            True se removido com sucesso
+        """
+        try:
+            if tenant_id is None:
+                self.memory.invalidate(f"{self.base_dir}|")
+                target = self.base_dir
+            else:
+                target = os.path.join(self.base_dir, validate_path_component(tenant_id, 'tenant_id'))
+                self.memory.invalidate(f"{self.base_dir}|{tenant_id}|")
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            self.logger.info(f"Cache de resultados removido: {tenant_id or 'todos os tenants'}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao remover cache de resultados: {str(e)}")
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        """Estatísticas da camada em memória e leituras servidas pelo disco"""
+        return {**self.memory.stats(), 'disk_hits': self.disk_hits}
+
+
+def _is_failure(result: Any, data: Any = None) -> bool:
+    """
+    Resultados de erro dos métodos de análise não são memoizados.
+
+    São erros: None, {}, (None, {}) e o próprio DataFrame de entrada, que
+    alguns métodos devolvem sem alterações quando falham.
+    """
+    if result is None or (data is not None and result is data):
+        return True
+    if isinstance(result, dict) and not result:
+        return True
+    return isinstance(result, tuple) and len(result) > 0 and result[0] is None
+
+
+def memoize(data_arg: str = 'df', column_args: Optional[Sequence[str]] = ('date_column', 'value_column')):
+    """
+    Memoiza um método de análise no ResultCache da instância (self.result_cache).
+
+    A chave combina o nome do método, os demais parâmetros e o hash do
+    conteúdo das colunas de entrada. O escopo é o argumento tenant_id: se o
+    método não o declara, ele é aceito como argumento adicional apenas para
+    o cache. Sem result_cache na instância, o método é chamado diretamente.
+
+    Args:
+        data_arg: Nome do parâmetro com o DataFrame de entrada
+        column_args: Parâmetros cujos valores são as colunas usadas do DataFrame
+            (str ou lista); None considera o DataFrame inteiro. Métodos que
+            devolvem todas as colunas de entrada devem memoizar apenas o que
+            calculam (ver customer_segmentation)
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        takes_tenant = 'tenant_id' in signature.parameters
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tenant_id = kwargs.get('tenant_id') if takes_tenant else kwargs.pop('tenant_id', None)
+            cache: Optional[ResultCache] = getattr(self, 'result_cache', None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+
+            try:
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                params = {name: value for name, value in bound.arguments.items()
+                          if name not in ('self', data_arg)}
+                df = bound.arguments[data_arg]
+                columns = None
+                if column_args is not None:
+                    columns = []
+                    for name in column_args:
+                        value = params.get(name)
+                        columns.extend([value] if isinstance(value, str) else list(value or []))
+                key = joblib.hash((CACHE_VERSION, func.__qualname__, params,
+                                   data_fingerprint(df, columns)))
+            except Exception as e:
+                self.logger.warning(f"Não foi possível memoizar {func.__name__}: {str(e)}")
+                return func(self, *args, **kwargs)
+
+            found, result = cache.get(tenant_id, func.__name__, key)
+            if found:
+                self.logger.info(f"Resultado de {func.__name__} obtido do cache")
+                return result
+
+            result = func(self, *args, **kwargs)
+            if not _is_failure(result, df):
+                cache.put(tenant_id, func.__name__, key, result)
+            return result
+
+        return wrapper
+    return decorator
@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+import joblib
+import pandas as pd
+
+VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+
+def validate_path_component(value: str, label: str = 'identificador') -> str:
+    """
+    Valida um identificador usado como nome de diretório ou arquivo.
+
+    Args:
+        value: Identificador (ex: tenant_id, model_id)
+        label: Nome do identificador para a mensagem de erro
+
+    Returns:
+        O próprio identificador
+
+    Raises:
+        ValueError: Se for vazio, '.', '..' ou contiver separadores de caminho
+    """
+    separators = {'/', '\\', '\0', os.sep, os.altsep} - {None}
+    if not isinstance(value, str) or value in ('', '.', '..') or any(sep in value for sep in separators):
+        raise ValueError(f"{label} inválido para uso em caminhos: {value!r}")
+    return value
+
+
+class _SharedModelCache:
+    """
+    Cache LRU de modelos carregados, compartilhado por todo o processo.
+
+    Todas as sessões do Streamlit rodam no mesmo processo; com o cache
+    compartilhado, um modelo carregado por uma sessão é reutilizado pelas
+    demais em vez de ser carregado novamente em cada uma.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[Any, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, Any]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Tuple[Any, Any]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """Lock por chave, para que sessões concorrentes carreguem o modelo uma única vez"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def invalidate(self, path: str):
+        """Remove do cache o caminho informado e tudo abaixo dele"""
+        with self._lock:
+            for key in [k for k in self._entries if k == path or k.startswith(path + os.sep)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_shared_cache = _SharedModelCache()
+
+
+class ModelRegistry:
+    """
+    Registro persistente e versionado de modelos por tenant.
+
+    Cada versão fica em data/tenants/<tenant>/models/<model_id>/v<n>/ com o
+    modelo e o scaler em joblib (sem compressão, para permitir mmap) e um
+    metadata.json com features, métricas e hash dos dados de treino.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, mmap_mode: Optional[str] = 'r'):
+        """
+        Inicializa o registro.
+
+        Args:
+            base_dir: Diretório base dos tenants (padrão: data/tenants)
+            mmap_mode: Modo de mmap do joblib ao carregar arrays grandes (None desativa)
+        """
+        self.logger = self._setup_logger()
+        self.base_dir = base_dir or os.path.join(os.getcwd(), 'data', 'tenants')
+        self.mmap_mode = mmap_mode
+        self.cache = _shared_cache
+
+    def _setup_logger(self):
+        """Configura o logger para o registro de modelos"""
+        logger = logging.getLogger("ModelRegistry")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    @staticmethod
+    def set_cache_size(max_entries: int):
+        """Define o número máximo de modelos mantidos em memória no processo"""
+        _shared_cache.max_entries = max_entries
+
+    @staticmethod
+    def data_hash(df: pd.DataFrame) -> str:
+        """Hash estável do conteúdo de um DataFrame (índice, colunas e valores)"""
+        row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        return joblib.hash((list(map(str, df.columns)), row_hashes))
+
+    def _model_dir(self, tenant_id: str, model_id: str) -> str:
+        """Diretório de um modelo de um tenant (identificadores com separadores são recusados)"""
+        return os.path.join(self.base_dir, validate_path_component(tenant_id, 'tenant_id'), 'models',
+                            validate_path_component(model_id, 'model_id'))
+
+    def list_versions(self, tenant_id: str, model_id: str) -> List[int]:
+        """
+        Lista as versões registradas de um modelo.
+
+        Args:
+            tenant_id: ID do tenant
+            model_id: Identificador do modelo
+
+        Returns:
+            Lista ordenada de versões
+        """
+        model_dir = self._model_dir(tenant_id, model_id)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = []
+        for name in os.listdir(model_dir):
+            match = VERSION_PATTERN.match(name)
+            if match and os.path.exists(os.path.join(model_dir, name, 'metadata.json')):
+                versions.append(int(match.group(1)))
+        return sorted(versions)
+
+    def list_models(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """
+        Lista os modelos de um tenant com os metadados da última versão.
+
+        Args:
+            tenant_id: ID do tenant
+
+        Returns:
+            Lista de metadados
+        """
+        models_dir = os.path.join(self.base_dir, validate_path_component(tenant_id, 'tenant_id'), 'models')
+        if not os.path.isdir(models_dir):
+            return []
+        models = []
+        for model_id in sorted(os.listdir(models_dir)):
+            metadata = self.get_metadata(tenant_id, model_id)
+            if metadata:
+                models.append(metadata)
+        return models
+
+    def get_metadata(self, tenant_id: str, model_id: str,
+                     version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtém os metadados de uma versão (padrão: a mais recente).
+
+        Args:
+            tenant_id: ID do tenant
+            model_id: Identificador do modelo
+            version: Versão desejada
+
+        Returns:
+            Dicionário de metadados ou None se não existir
+        """
+        if version is None:
+            versions = self.list_versions(tenant_id, model_id)
+            if not versions:
+                return None
+            version = versions[-1]
+        path = os.path.join(self._model_dir(tenant_id, model_id), f"v{version}", 'metadata.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def register(self, tenant_id: str, model_id: str, model: Any, scaler: Any = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Registra uma nova versão de um modelo.
+
+        A versão é gravada em um diretório temporário e renomeada ao final, de
+        modo que leitores nunca veem uma versão incompleta.
+
+        Args:
+            tenant_id: ID do tenant
+            model_id: Identificador do modelo
+            model: Modelo treinado
+            scaler: Pré-processador ajustado (opcional)
+            metadata: Metadados adicionais (features, métricas, hash dos dados)
+
+        Returns:
+            Número da versão registrada ou None em caso de erro
+        """
+        try:
+            model_dir = self._model_dir(tenant_id, model_id)
+            os.makedirs(model_dir, exist_ok=True)
+
+            with self.cache.key_lock(model_dir):
+                versions = self.list_versions(tenant_id, model_id)
+                version = versions[-1] + 1 if versions else 1
+                tmp_dir = os.path.join(model_dir, f".v{version}.{os.getpid()}.tmp")
+                os.makedirs(tmp_dir, exist_ok=True)
+
+                joblib.dump(model, os.path.join(tmp_dir, 'model.joblib'))
+                if scaler is not None:
+                    joblib.dump(scaler, os.path.join(tmp_dir, 'scaler.joblib'))
+
+                full_metadata = {
+                    **(metadata or {}),
+                    'tenant_id': tenant_id,
+                    'model_id': model_id,
+                    'version': version,
+                    'model_class': type(model).__name__,
+                    'has_scaler': scaler is not None,
+                    'created_at': datetime.now().isoformat()
+                }
+                with open(os.path.join(tmp_dir, 'metadata.json'), 'w') as f:
+                    json.dump(full_metadata, f, indent=4, default=str)
+
+                os.rename(tmp_dir, os.path.join(model_dir, f"v{version}"))
+
+            # O modelo recém-treinado já fica disponível para as demais sessões
+            self.cache.put(self._cache_key(tenant_id, model_id, version), (model, scaler))
+
+            self.logger.info(f"Modelo registrado: {tenant_id}/{model_id} v{version}")
+            return version
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar modelo {model_id}: {str(e)}")
+            return None
+
+    def _cache_key(self, tenant_id: str, model_id: str, version: int) -> str:
+        return os.path.join(self._model_dir(tenant_id, model_id), f"v{version}")
+
+    def load(self, tenant_id: str, model_id: str,
+             version: Optional[int] = None) -> Optional[Tuple[Any, Any, Dict[str, Any]]]:
+        """
+        Carrega uma versão de um modelo (padrão: a mais recente).
+
+        O modelo é lido com joblib em mmap_mode e mantido no cache LRU do
+        processo, compartilhado entre sessões.
+
+        Args:
+            tenant_id: ID do tenant
+            model_id: Identificador do modelo
+            version: Versão desejada
+
+        Returns:
+            Tuple (modelo, scaler, metadados) ou None se não existir
+        """
+        try:
+            metadata = self.get_metadata(tenant_id, model_id, version)
+            if metadata is None:
+                self.logger.error(f"Modelo não encontrado no registro: {tenant_id}/{model_id}")
+                return None
+
+            key = self._cache_key(tenant_id, model_id, metadata['version'])
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached[0], cached[1], metadata
+
+            with self.cache.key_lock(key):
+                # Outra sessão pode ter carregado o modelo enquanto aguardávamos
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached[0], cached[1], metadata
+
+                model = joblib.load(os.path.join(key, 'model.joblib'), mmap_mode=self.mmap_mode)
+                scaler = None
+                if metadata.get('has_scaler'):
+                    scaler = joblib.load(os.path.join(key, 'scaler.joblib'), mmap_mode=self.mmap_mode)
+                self.cache.put(key, (model, scaler))
+
+            self.logger.info(f"Modelo carregado do registro: {tenant_id}/{model_id} v{metadata['version']}")
+            return model, scaler, metadata
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar modelo {model_id}: {str(e)}")
+            return None
+
+    def delete(self, tenant_id: str, model_id: str, version: Optional[int] = None) -> bool:
+        """
+        Remove uma versão ou todas as versões de um modelo.
+
+        Args:
+            tenant_id: ID do tenant
+            model_id: Identificador do modelo
+            version: Versão a remover (padrão: todas)
+
+        Returns:
+            True se removido com sucesso
+        """
+        try:
+            model_dir = self._model_dir(tenant_id, model_id)
+            target = model_dir if version is None else os.path.join(model_dir, f"v{version}")
+            if not os.path.exists(target):
+                return False
+            shutil.rmtree(target)
+            self.cache.invalidate(target)
+            self.logger.info(f"Modelo removido do registro: {tenant_id}/{model_id}"
+                             + (f" v{version}" if version is not None else ""))
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao remover modelo {model_id}: {str(e)}")
+            return False
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Estatísticas do cache de modelos compartilhado"""
+        return self.cache.stats()
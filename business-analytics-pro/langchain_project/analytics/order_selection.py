@@ -0,0 +1,400 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import adfuller
+
+# Período sazonal padrão por frequência
+SEASONAL_PERIODS = {'H': 24, 'D': 7, 'B': 5, 'W': 52, 'M': 12, 'MS': 12, 'Q': 4, 'QS': 4}
+
+# Número de observações iniciais usadas para detectar reescrita do histórico
+PREFIX_LENGTH = 24
+
+# Pools da busca compartilhados pelo processo, por número de workers
+_search_executors: Dict[int, ProcessPoolExecutor] = {}
+_search_executors_lock = threading.Lock()
+
+
+def _search_executor(workers: int) -> ProcessPoolExecutor:
+    """Pool de processos da busca, criado no primeiro uso e reutilizado"""
+    with _search_executors_lock:
+        executor = _search_executors.get(workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker)
+            _search_executors[workers] = executor
+        return executor
+
+
+def shutdown_search_executors():
+    """Encerra os pools de processos da busca de ordens"""
+    with _search_executors_lock:
+        for executor in _search_executors.values():
+            executor.shutdown()
+        _search_executors.clear()
+
+
+atexit.register(shutdown_search_executors)
+
+
+def seasonal_period_for(frequency: str) -> int:
+    """Obtém o período sazonal padrão de uma frequência ('M' -> 12), ou 0 se não houver"""
+    return SEASONAL_PERIODS.get(frequency.upper().split('-')[0], 0)
+
+
+class ArimaOrderSelector:
+    """
+    Seleção automática das ordens (p,d,q)(P,D,Q,s) de modelos ARIMA/SARIMA.
+
+    As diferenciações d e D são definidas por testes (ADF e força sazonal) e
+    os termos AR/MA são buscados por níveis de complexidade: cada nível só
+    avalia candidatos derivados de um candidato do nível anterior com AIC
+    próximo do melhor, e a busca termina quando um nível não melhora o AIC.
+    Os candidatos de cada nível são ajustados em paralelo.
+
+    As ordens escolhidas ficam em cache por série, em um banco SQLite (modo
+    WAL) gravado registro a registro, seguro entre threads e processos; uma
+    nova chamada para a mesma série reutiliza o resultado, salvo se os dados
+    tiverem mudado de comportamento (deriva) ou crescido muito desde a
+    seleção. O pool de processos da busca é compartilhado pelo processo.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, max_workers: Optional[int] = None,
+                 max_p: int = 3, max_q: int = 3, max_d: int = 2,
+                 max_P: int = 1, max_Q: int = 1, max_D: int = 1,
+                 prune_margin: float = 10.0, drift_threshold: float = 0.5,
+                 max_growth: float = 0.5):
+        """
+        Inicializa o seletor.
+
+        Args:
+            cache_path: Banco SQLite do cache de ordens (padrão: cache/arima_orders.db)
+            max_workers: Processos usados na busca (padrão: número de CPUs; 1 executa sem pool)
+            max_p: Ordem AR máxima
+            max_q: Ordem MA máxima
+            max_d: Número máximo de diferenciações
+            max_P: Ordem AR sazonal máxima
+            max_Q: Ordem MA sazonal máxima
+            max_D: Número máximo de diferenciações sazonais
+            prune_margin: Candidatos com AIC acima do melhor + margem não são expandidos
+            drift_threshold: Variação relativa de média/desvio que invalida o cache
+            max_growth: Crescimento relativo da série que invalida o cache
+        """
+        self.logger = self._setup_logger()
+        self.cache_path = cache_path or os.path.join(os.getcwd(), 'cache', 'arima_orders.db')
+        self.max_workers = max_workers
+        self.max_p = max_p
+        self.max_q = max_q
+        self.max_d = max_d
+        self.max_P = max_P
+        self.max_Q = max_Q
+        self.max_D = max_D
+        self.prune_margin = prune_margin
+        self.drift_threshold = drift_threshold
+        self.max_growth = max_growth
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Conexões SQLite não são enviadas aos processos (ex: lotes de forecast_many)
+        state = self.__dict__.copy()
+        state.pop('_local', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _setup_logger(self):
+        """Configura o logger para a seleção de ordens"""
+        logger = logging.getLogger("PredictiveAnalysis")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def select_order(self, ts: pd.Series, seasonal_period: int = 0,
+                     series_key: Optional[str] = None,
+                     force: bool = False, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Seleciona as ordens do modelo para uma série, usando o cache quando válido.
+
+        Args:
+            ts: Série temporal indexada por data
+            seasonal_period: Período sazonal s (0 ou 1 para ARIMA não sazonal)
+            series_key: Identificador estável da série (padrão: derivado do início da série)
+            force: Ignora o cache e refaz a busca
+            tenant_id: Tenant dono da série, que isola os registros no cache
+
+        Returns:
+            Dicionário com order, seasonal_order, aic, candidates e cached
+        """
+        values = np.asarray(ts, dtype=float)
+        if seasonal_period > 1 and len(values) < 2 * seasonal_period + 4:
+            self.logger.warning(f"Série curta para sazonalidade {seasonal_period}, usando ARIMA não sazonal")
+            seasonal_period = 0
+
+        key = self._cache_key(values, seasonal_period, series_key, tenant_id)
+        fingerprint = self._fingerprint(values)
+
+        if not force:
+            entry = self._get_cached(key)
+            if entry and not self._has_drifted(entry, fingerprint, values, seasonal_period):
+                return {'order': tuple(entry['order']), 'seasonal_order': tuple(entry['seasonal_order']),
+                        'aic': entry['aic'], 'candidates': 0, 'cached': True}
+
+        result = self._search(ts, seasonal_period)
+
+        # As estatísticas de deriva usam a série já diferenciada pelas ordens escolhidas
+        fingerprint.update(self._diff_stats(values, result['order'][1],
+                                            result['seasonal_order'][1], seasonal_period))
+        self._update_cache(key, {
+            'order': list(result['order']),
+            'seasonal_order': list(result['seasonal_order']),
+            'aic': result['aic'],
+            'selected_at': datetime.now().isoformat(),
+            **fingerprint
+        })
+
+        self.logger.info(f"Ordem selecionada para {key}: {result['order']}x{result['seasonal_order']} "
+                         f"(AIC {result['aic']:.2f}, {result['candidates']} candidatos)")
+        return {**result, 'cached': False}
+
+    def _search(self, ts: pd.Series, seasonal_period: int) -> Dict[str, Any]:
+        """
+        Busca por níveis de complexidade com poda por AIC.
+
+        Args:
+            ts: Série temporal
+            seasonal_period: Período sazonal (0 para não sazonal)
+
+        Returns:
+            Dicionário com order, seasonal_order, aic e candidates
+        """
+        values = np.asarray(ts, dtype=float)
+        seasonal = seasonal_period > 1
+        D = self._select_seasonal_d(values, seasonal_period) if seasonal else 0
+        d = self._select_d(values, D, seasonal_period)
+        max_P = self.max_P if seasonal else 0
+        max_Q = self.max_Q if seasonal else 0
+
+        # Candidato = (p, q, P, Q); o nível é a soma dos termos
+        evaluated: Dict[Tuple[int, int, int, int], float] = {}
+        best, best_aic = None, np.inf
+        level = [(0, 0, 0, 0)]
+
+        workers = self.max_workers or os.cpu_count() or 1
+        executor = _search_executor(workers) if workers > 1 else None
+
+        while level:
+            orders = [((p, d, q), (P, D, Q, seasonal_period if seasonal else 0)) for p, q, P, Q in level]
+            if executor is not None and len(level) > 1:
+                aics = list(executor.map(_fit_candidate_aic, [values] * len(orders), orders))
+            else:
+                aics = [_fit_candidate_aic(values, candidate) for candidate in orders]
+
+            level_best = np.inf
+            for candidate, aic in zip(level, aics):
+                evaluated[candidate] = aic
+                level_best = min(level_best, aic)
+                if aic < best_aic:
+                    best, best_aic = candidate, aic
+
+            # Parada antecipada: o nível não melhorou o melhor AIC já encontrado
+            if best is not None and level_best > best_aic and len(evaluated) > 1:
+                break
+
+            # Expandir apenas candidatos próximos do melhor AIC
+            limits = (self.max_p, self.max_q, max_P, max_Q)
+            next_level = set()
+            for candidate in level:
+                if evaluated[candidate] > best_aic + self.prune_margin:
+                    continue
+                for i in range(4):
+                    child = list(candidate)
+                    child[i] += 1
+                    child = tuple(child)
+                    if child[i] <= limits[i] and child not in evaluated:
+                        next_level.add(child)
+            level = sorted(next_level)
+
+        if best is None:
+            raise ValueError("Nenhum candidato ARIMA pôde ser ajustado")
+
+        p, q, P, Q = best
+        return {
+            'order': (p, d, q),
+            'seasonal_order': (P, D, Q, seasonal_period if seasonal else 0),
+            'aic': float(best_aic),
+            'candidates': len(evaluated)
+        }
+
+    def _select_d(self, values: np.ndarray, D: int, seasonal_period: int) -> int:
+        """Escolhe d pelo teste ADF aplicado à série após a diferenciação sazonal"""
+        series = values
+        for _ in range(D):
+            series = series[seasonal_period:] - series[:-seasonal_period]
+
+        for d in range(self.max_d + 1):
+            if len(series) < 8 or np.allclose(series, series[0]):
+                return d
+            try:
+                if adfuller(series, autolag='AIC')[1] < 0.05:
+                    return d
+            except Exception:
+                return d
+            if d < self.max_d:
+                series = np.diff(series)
+        return self.max_d
+
+    def _select_seasonal_d(self, values: np.ndarray, seasonal_period: int) -> int:
+        """Escolhe D pela força sazonal: 1 - Var(resíduo) / Var(sazonal + resíduo)"""
+        if self.max_D < 1:
+            return 0
+        try:
+            from statsmodels.tsa.seasonal import seasonal_decompose
+            decomposition = seasonal_decompose(values, period=seasonal_period,
+                                               extrapolate_trend='freq')
+            remainder = decomposition.resid
+            detrended = decomposition.seasonal + remainder
+            strength = max(0.0, 1 - np.nanvar(remainder) / np.nanvar(detrended))
+            return 1 if strength > 0.64 else 0
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _diff_stats(values: np.ndarray, d: int, D: int, seasonal_period: int) -> Dict[str, float]:
+        """Média e desvio da série diferenciada, base para detectar deriva"""
+        series = values
+        for _ in range(D):
+            series = series[seasonal_period:] - series[:-seasonal_period]
+        if d:
+            series = np.diff(series, n=d)
+        return {'d': d, 'D': D, 'diff_mean': float(np.mean(series)),
+                'diff_std': float(np.std(series))}
+
+    @staticmethod
+    def _fingerprint(values: np.ndarray) -> Dict[str, Any]:
+        """Resumo da série usado para validar o cache"""
+        prefix = np.round(values[:PREFIX_LENGTH], 6).tobytes()
+        return {'n_obs': int(len(values)), 'prefix_hash': hashlib.sha256(prefix).hexdigest()[:16]}
+
+    @staticmethod
+    def _key_prefix(series_key: Optional[str], tenant_id: Optional[str]) -> str:
+        """Prefixo da chave: tenant (quando informado) e identificador da série"""
+        return f"{tenant_id}:{series_key}" if tenant_id else series_key
+
+    def _cache_key(self, values: np.ndarray, seasonal_period: int,
+                   series_key: Optional[str], tenant_id: Optional[str] = None) -> str:
+        """Chave do cache: tenant mais identificador informado ou hash do início da série"""
+        if series_key is None:
+            series_key = self._fingerprint(values)['prefix_hash']
+        return f"{self._key_prefix(series_key, tenant_id)}|s={seasonal_period}"
+
+    def _has_drifted(self, entry: Dict[str, Any], fingerprint: Dict[str, Any],
+                     values: np.ndarray, seasonal_period: int) -> bool:
+        """
+        Verifica se a série mudou desde a seleção das ordens.
+
+        A série é considerada alterada se o histórico inicial foi reescrito,
+        se cresceu mais que max_growth, ou se a média ou o desvio da série
+        diferenciada se afastaram mais que drift_threshold do registrado.
+        """
+        if entry.get('prefix_hash') != fingerprint['prefix_hash']:
+            return True
+        n_obs = fingerprint['n_obs']
+        if n_obs < entry['n_obs'] or n_obs > entry['n_obs'] * (1 + self.max_growth):
+            return True
+
+        stats = self._diff_stats(values, entry['d'], entry['D'], seasonal_period)
+        scale = max(entry['diff_std'], 1e-12)
+        mean_shift = abs(stats['diff_mean'] - entry['diff_mean']) / scale
+        std_ratio = stats['diff_std'] / scale
+        return (mean_shift > self.drift_threshold
+                or not 1 / (1 + self.drift_threshold) <= std_ratio <= 1 + self.drift_threshold)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual com o banco do cache"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            conn = sqlite3.connect(self.cache_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS arima_orders (key TEXT PRIMARY KEY, entry TEXT NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Obtém um registro do cache de ordens"""
+        try:
+            row = self._connection().execute("SELECT entry FROM arima_orders WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Cache de ordens ARIMA inválido, ignorando: {str(e)}")
+            return None
+
+    def _update_cache(self, key: str, entry: Dict[str, Any]):
+        """Grava um registro no cache (upsert de uma linha, sem reescrever as demais séries)"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO arima_orders (key, entry) VALUES (?, ?)",
+                             (key, json.dumps(entry)))
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"Erro ao salvar cache de ordens ARIMA: {str(e)}")
+
+    def clear_cache(self, series_key: Optional[str] = None, tenant_id: Optional[str] = None):
+        """
+        Remove registros do cache.
+
+        Args:
+            series_key: Remove apenas os registros desta série (padrão: todos)
+            tenant_id: Restringe a remoção aos registros do tenant
+        """
+        if series_key is None:
+            prefix = f"{tenant_id}:" if tenant_id else None
+        else:
+            prefix = f"{self._key_prefix(series_key, tenant_id)}|"
+        conn = self._connection()
+        with conn:
+            if prefix is None:
+                conn.execute("DELETE FROM arima_orders")
+            else:
+                conn.execute("DELETE FROM arima_orders WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+def _init_search_worker():
+    """Inicializa processos da busca: uma thread BLAS por processo e sem avisos do statsmodels"""
+    warnings.filterwarnings('ignore')
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _fit_candidate_aic(values: np.ndarray, candidate: Tuple[Tuple[int, int, int],
+                                                              Tuple[int, int, int, int]]) -> float:
+    """Ajusta um candidato e retorna seu AIC (infinito se o ajuste falhar)"""
+    order, seasonal_order = candidate
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fitted = ARIMA(values, order=order, seasonal_order=seasonal_order).fit()
+        aic = float(fitted.aic)
+        return aic if np.isfinite(aic) else np.inf
+    except Exception:
+        return np.inf
@@ -1,24 +1,71 @@
 import pandas as pd
 import numpy as np
+import copy
 import logging
-from typing import Dict, Any, Optional, List, Union, Tuple
+import multiprocessing
+import os
+import pickle
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterable, Iterator
 from datetime import datetime, timedelta
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.seasonal import seasonal_decompose
-from sklearn.ensemble import RandomForestRegressor
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from statsmodels.tsa.forecasting.theta import ThetaModel
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, learning_curve
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+from .memoization import ResultCache, memoize
+from .model_registry import ModelRegistry
+from .order_selection import ArimaOrderSelector, seasonal_period_for
+
+# Modelos estatísticos de ajuste rápido e candidatos padrão de model_type='auto'
+STATISTICAL_MODELS = ('ets', 'seasonal_naive', 'theta')
+FORECAST_MODELS = ('arima', 'sarima') + STATISTICAL_MODELS
+AUTO_CANDIDATES = STATISTICAL_MODELS
+
+
 class PredictiveAnalysis:
     """
     Classe para análise preditiva de dados empresariais.
     """
     
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 order_selector: Optional[ArimaOrderSelector] = None):
+        """
+        Inicializa a análise preditiva.
+        
+        Args:
+            registry: Registro persistente de modelos (padrão: data/tenants, criado no primeiro uso)
+            result_cache: Cache de resultados das análises (padrão: sem memoização);
+                com ele, os métodos memoizados aceitam tenant_id para isolar o cache
+            order_selector: Seletor de ordens ARIMA (padrão: cache em cache/arima_orders.db)
+        """
         self.logger = self._setup_logger()
         self.models = {}
         self.scalers = {}
+        self.fill_values = {}
+        self.order_selector = order_selector or ArimaOrderSelector()
+        self._registry = registry
+        self.result_cache = result_cache
+        
+    @property
+    def registry(self) -> ModelRegistry:
+        """Registro de modelos, criado apenas quando usado"""
+        if self._registry is None:
+            self._registry = ModelRegistry()
+        return self._registry
         
     def _setup_logger(self):
         """Configura o logger para a análise preditiva"""
@@ -31,83 +78,65 @@ class PredictiveAnalysis:
             logger.addHandler(handler)
         return logger
         
+    @memoize()
     def forecast_time_series(self, df: pd.DataFrame, date_column: str, value_column: str, 
                              periods: int = 12, frequency: str = 'M', 
-                             model_type: str = 'arima') -> Tuple[pd.DataFrame, Dict[str, float]]:
+                             model_type: str = 'arima', evaluation: str = 'refit',
+                             backtest_origins: int = 0, 
+                             backtest_horizon: Optional[int] = None,
+                             order: Optional[Union[str, Tuple[int, int, int]]] = None,
+                             seasonal_order: Optional[Union[str, Tuple[int, int, int, int]]] = None,
+                             series_key: Optional[str] = None,
+                             candidates: Optional[List[str]] = None,
+                             max_workers: Optional[int] = None,
+                             tenant_id: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
         """
         Realiza previsão de série temporal.
         
+        Além de ARIMA/SARIMA, aceita modelos estatísticos de ajuste rápido
+        (Holt-Winters/ETS, naive sazonal e Theta). Com model_type='auto', os
+        candidates são avaliados em paralelo por backtest rolling-origin e o
+        de menor MAE é usado na previsão.
+        
         Args:
             df: DataFrame com os dados históricos
             date_column: Nome da coluna de data
             value_column: Nome da coluna de valor a ser previsto
             periods: Número de períodos para previsão
             frequency: Frequência dos dados ('D', 'W', 'M', 'Q', 'Y')
-            model_type: Tipo de modelo ('arima', 'sarima')
+            model_type: Tipo de modelo ('arima', 'sarima', 'ets', 'seasonal_naive',
+                'theta' ou 'auto')
+            evaluation: 'refit' (padrão) reajusta o modelo na série completa para
+                prever; 'reuse' ajusta uma única vez no treino e estende o modelo com
+                os dados de teste, mais rápido, mas com parâmetros estimados sem o
+                trecho final da série
+            backtest_origins: Número de origens para backtest rolling-origin (0 desativa;
+                com 'auto', padrão de 3)
+            backtest_horizon: Horizonte de cada origem do backtest (padrão: periods)
+            order: Ordem (p,d,q) ou 'auto' para seleção automática (padrão: (5,1,0) 
+                para 'arima' e 'auto' para 'sarima')
+            seasonal_order: Ordem sazonal (P,D,Q,s) ou 'auto' (padrão: 'auto' para 'sarima')
+            series_key: Identificador da série no cache de ordens (padrão: derivado dos dados)
+            candidates: Modelos avaliados com 'auto' (padrão: ets, seasonal_naive e theta)
+            max_workers: Threads usadas para avaliar os candidatos com 'auto'
+            tenant_id: Tenant dono da série (isola o cache de ordens e o de resultados)
             
         Returns:
             Tuple contendo DataFrame com os dados históricos e previsões,
             e dicionário com métricas do modelo
         """
         try:
-            # Garantir que a coluna de data seja datetime
-            df = df.copy()
-            df[date_column] = pd.to_datetime(df[date_column])
-            
-            # Ordenar por data
-            df = df.sort_values(date_column)
-            
-            # Criar série temporal
-            ts = df.set_index(date_column)[value_column]
-            
-            # Verificar e lidar com valores faltantes
-            if ts.isnull().any():
-                ts = ts.interpolate(method='linear')
+            ts = self._prepare_series(df, date_column, value_column)
             
             # Escolher e treinar modelo
-            if model_type == 'arima':
-                # Parâmetros simples para ARIMA (p,d,q)
-                model = ARIMA(ts, order=(5, 1, 0))
-                fitted_model = model.fit()
-                
-                # Fazer previsão
-                forecast = fitted_model.forecast(steps=periods)
-                forecast_index = pd.date_range(start=ts.index[-1] + pd.Timedelta(days=1), 
-                                             periods=periods, freq=frequency)
-                forecast_series = pd.Series(forecast, index=forecast_index)
-                
-                # Avaliar modelo com os últimos 20% dos dados
-                train_size = int(len(ts) * 0.8)
-                train, test = ts[:train_size], ts[train_size:]
-                
-                # Treinar modelo de avaliação
-                eval_model = ARIMA(train, order=(5, 1, 0))
-                eval_fitted = eval_model.fit()
-                
-                # Prever período de teste
-                eval_forecast = eval_fitted.forecast(steps=len(test))
-                
-                # Calcular métricas
-                mae = mean_absolute_error(test, eval_forecast)
-                rmse = np.sqrt(mean_squared_error(test, eval_forecast))
-                
-                # Calcular erro percentual médio
-                mape = np.mean(np.abs((test - eval_forecast) / test)) * 100
-                
-                metrics = {
-                    'mae': mae,
-                    'rmse': rmse,
-                    'mape': mape
-                }
+            if model_type in FORECAST_MODELS or model_type == 'auto':
+                result_df, metrics = self._run_forecast(ts, periods, frequency, model_type, evaluation,
+                                                        backtest_origins, backtest_horizon, order,
+                                                        seasonal_order, series_key, candidates,
+                                                        max_workers, tenant_id)
                 
-                # Juntar dados históricos e previsão
-                result_df = pd.DataFrame({
-                    'data': pd.concat([ts.index, forecast_index]),
-                    'valor': pd.concat([ts, forecast_series]),
-                    'tipo': ['histórico'] * len(ts) + ['previsão'] * len(forecast)
-                })
-                
-                self.logger.info(f"Previsão de série temporal concluída: {periods} períodos")
+                self.logger.info(f"Previsão de série temporal concluída: {periods} períodos "
+                                 f"({metrics['model_type']})")
                 return result_df, metrics
                 
             else:
@@ -118,40 +147,633 @@ class PredictiveAnalysis:
             self.logger.error(f"Erro na previsão de série temporal: {str(e)}")
             return None, {}
     
+    def _prepare_series(self, df: pd.DataFrame, date_column: str, value_column: str) -> pd.Series:
+        """
+        Converte o DataFrame em série temporal ordenada e sem lacunas.
+        
+        Args:
+            df: DataFrame com os dados históricos
+            date_column: Nome da coluna de data
+            value_column: Nome da coluna de valor
+            
+        Returns:
+            Série indexada por data
+        """
+        # Garantir que a coluna de data seja datetime
+        df = df.copy()
+        df[date_column] = pd.to_datetime(df[date_column])
+        
+        # Ordenar por data
+        df = df.sort_values(date_column)
+        
+        # Criar série temporal
+        ts = df.set_index(date_column)[value_column]
+        
+        # Verificar e lidar com valores faltantes
+        if ts.isnull().any():
+            ts = ts.interpolate(method='linear')
+            
+        return ts
+    
+    def _run_forecast(self, ts: pd.Series, periods: int, frequency: str, model_type: str,
+                      evaluation: str = 'refit', backtest_origins: int = 0,
+                      backtest_horizon: Optional[int] = None,
+                      order: Optional[Union[str, Tuple[int, int, int]]] = None,
+                      seasonal_order: Optional[Union[str, Tuple[int, int, int, int]]] = None,
+                      series_key: Optional[str] = None, candidates: Optional[List[str]] = None,
+                      max_workers: Optional[int] = None,
+                      tenant_id: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Ajusta o modelo pedido em uma série já preparada.
+        
+        Raises:
+            ValueError: Tipo de modelo não suportado
+            Exception: Erros de ajuste do statsmodels são propagados
+        """
+        if model_type == 'auto':
+            return self._forecast_auto(ts, periods, frequency, candidates or list(AUTO_CANDIDATES),
+                                       evaluation, backtest_origins or 3, backtest_horizon,
+                                       order, seasonal_order, series_key, max_workers, tenant_id)
+        if model_type in ('arima', 'sarima'):
+            order, seasonal_order = self._resolve_orders(ts, model_type, frequency, order,
+                                                         seasonal_order, series_key, tenant_id)
+            result_df, metrics = self._forecast_arima(ts, periods, frequency, evaluation,
+                                                      backtest_origins, backtest_horizon,
+                                                      order, seasonal_order)
+        elif model_type in STATISTICAL_MODELS:
+            result_df, metrics = self._forecast_statistical(ts, periods, frequency, model_type,
+                                                            backtest_origins, backtest_horizon)
+        else:
+            raise ValueError(f"Tipo de modelo não suportado: {model_type}")
+        metrics['model_type'] = model_type
+        return result_df, metrics
+    
+    def _forecast_auto(self, ts: pd.Series, periods: int, frequency: str, candidates: List[str],
+                       evaluation: str, backtest_origins: int, backtest_horizon: Optional[int],
+                       order, seasonal_order, series_key: Optional[str],
+                       max_workers: Optional[int],
+                       tenant_id: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Avalia os candidatos em paralelo e mantém o de menor MAE no backtest.
+        
+        Cada candidato já produz a previsão final, de modo que o vencedor não
+        precisa ser ajustado novamente.
+        """
+        def evaluate(model_type: str):
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    return self._run_forecast(ts, periods, frequency, model_type, evaluation,
+                                              backtest_origins, backtest_horizon, order,
+                                              seasonal_order, series_key, tenant_id=tenant_id)
+            except Exception as e:
+                self.logger.warning(f"Candidato {model_type} descartado: {str(e)}")
+                return None
+                
+        with ThreadPoolExecutor(max_workers=max_workers or len(candidates)) as executor:
+            results = dict(zip(candidates, executor.map(evaluate, candidates)))
+            
+        scores = {name: float(result[1].get('backtest_mae', result[1]['mae']))
+                  for name, result in results.items() if result is not None}
+        scores = {name: score for name, score in scores.items() if np.isfinite(score)}
+        if not scores:
+            raise ValueError("Nenhum modelo candidato pôde ser ajustado")
+            
+        best = min(scores, key=scores.get)
+        result_df, metrics = results[best]
+        metrics['candidates'] = scores
+        return result_df, metrics
+    
+    def _forecast_statistical(self, ts: pd.Series, periods: int, frequency: str, model_type: str,
+                              backtest_origins: int = 0,
+                              backtest_horizon: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Prevê com um modelo estatístico rápido e avalia nos últimos 20% dos dados.
+        
+        Os ajustes custam milissegundos, por isso o backtest reajusta o
+        modelo em cada origem em vez de reaproveitar um ajuste.
+        
+        Args:
+            ts: Série temporal indexada por data
+            periods: Número de períodos para previsão
+            frequency: Frequência dos dados, usada para o período sazonal
+            model_type: 'ets', 'seasonal_naive' ou 'theta'
+            backtest_origins: Número de origens para backtest rolling-origin
+            backtest_horizon: Horizonte de cada origem do backtest
+            
+        Returns:
+            Tuple com DataFrame (histórico + previsão) e métricas do modelo
+        """
+        values = ts.to_numpy(dtype=float)
+        seasonal_period = seasonal_period_for(frequency)
+        train_size = int(len(values) * 0.8)
+        
+        eval_forecast = _statistical_forecast(model_type, values[:train_size],
+                                              len(values) - train_size, seasonal_period)
+        metrics = self._forecast_metrics(values[train_size:], eval_forecast)
+        
+        forecast = _statistical_forecast(model_type, values, periods, seasonal_period)
+        forecast_index = pd.date_range(start=ts.index[-1] + pd.Timedelta(days=1), 
+                                     periods=periods, freq=frequency)
+        
+        if backtest_origins > 0:
+            horizon = max(1, min(backtest_horizon or periods, len(values) - train_size))
+            origin_points = np.unique(np.linspace(train_size, len(values) - horizon,
+                                                  num=backtest_origins).astype(int))
+            errors = [
+                self._forecast_metrics(values[origin:origin + horizon],
+                                       _statistical_forecast(model_type, values[:origin], horizon,
+                                                             seasonal_period))
+                for origin in origin_points
+            ]
+            metrics.update({
+                'backtest_origins': len(origin_points),
+                'backtest_horizon': horizon,
+                'backtest_mae': float(np.mean([e['mae'] for e in errors])),
+                'backtest_rmse': float(np.mean([e['rmse'] for e in errors])),
+                'backtest_mape': float(np.mean([e['mape'] for e in errors]))
+            })
+            
+        result_df = self._forecast_frame(ts, forecast_index, forecast)
+        return result_df, metrics
+    
+    def _resolve_orders(self, ts: pd.Series, model_type: str, frequency: str,
+                        order: Optional[Union[str, Tuple[int, int, int]]],
+                        seasonal_order: Optional[Union[str, Tuple[int, int, int, int]]],
+                        series_key: Optional[str] = None,
+                        tenant_id: Optional[str] = None) -> Tuple[Tuple, Tuple]:
+        """
+        Define as ordens do modelo, executando a seleção automática quando pedida.
+        
+        Args:
+            ts: Série temporal
+            model_type: Tipo de modelo ('arima', 'sarima')
+            frequency: Frequência dos dados, usada para o período sazonal
+            order: Ordem (p,d,q), 'auto' ou None
+            seasonal_order: Ordem sazonal (P,D,Q,s), 'auto' ou None
+            series_key: Identificador da série no cache de ordens
+            tenant_id: Tenant dono da série no cache de ordens
+            
+        Returns:
+            Tuple com order e seasonal_order
+        """
+        if model_type == 'sarima':
+            order = order or 'auto'
+            seasonal_order = seasonal_order or 'auto'
+        else:
+            order = order or (5, 1, 0)
+            seasonal_order = (0, 0, 0, 0)
+            
+        if order != 'auto' and seasonal_order != 'auto':
+            return tuple(order), tuple(seasonal_order)
+            
+        seasonal_period = seasonal_period_for(frequency) if seasonal_order == 'auto' else seasonal_order[3]
+        selection = self.order_selector.select_order(ts, seasonal_period, series_key, tenant_id=tenant_id)
+        
+        if order == 'auto':
+            order = selection['order']
+        if seasonal_order == 'auto':
+            seasonal_order = selection['seasonal_order']
+        return tuple(order), tuple(seasonal_order)
+    
+    def _forecast_arima(self, ts: pd.Series, periods: int, frequency: str,
+                        evaluation: str = 'refit', backtest_origins: int = 0,
+                        backtest_horizon: Optional[int] = None,
+                        order: Tuple[int, int, int] = (5, 1, 0),
+                        seasonal_order: Tuple[int, int, int, int] = (0, 0, 0, 0)) -> Tuple[pd.DataFrame, Dict[str, float]]:
+        """
+        Ajusta ARIMA, prevê os próximos períodos e avalia nos últimos 20% dos dados.
+        
+        No modo 'refit' (padrão) a previsão final vem de um novo ajuste na série
+        completa. No modo 'reuse', opcional, o modelo é ajustado uma única vez no
+        treino e a previsão final usa o mesmo modelo estendido com os dados de
+        teste (append sem reajuste), evitando o segundo ajuste.
+        
+        Args:
+            ts: Série temporal indexada por data
+            periods: Número de períodos para previsão
+            frequency: Frequência dos dados
+            evaluation: Modo de avaliação ('refit' ou 'reuse')
+            backtest_origins: Número de origens para backtest rolling-origin
+            backtest_horizon: Horizonte de cada origem do backtest
+            order: Ordem (p,d,q) do modelo
+            seasonal_order: Ordem sazonal (P,D,Q,s) do modelo
+            
+        Returns:
+            Tuple com DataFrame (histórico + previsão) e métricas do modelo
+            
+        Raises:
+            Exception: Erros de ajuste do statsmodels são propagados
+        """
+        if evaluation not in ('reuse', 'refit'):
+            raise ValueError(f"Modo de avaliação não suportado: {evaluation}")
+            
+        # Avaliar modelo com os últimos 20% dos dados
+        train_size = int(len(ts) * 0.8)
+        train, test = ts[:train_size], ts[train_size:]
+        
+        # Treinar modelo de avaliação
+        eval_model = ARIMA(train, order=order, seasonal_order=seasonal_order)
+        eval_fitted = eval_model.fit()
+        
+        # Prever período de teste
+        eval_forecast = np.asarray(eval_fitted.forecast(steps=len(test)))
+        
+        metrics = self._forecast_metrics(test.values, eval_forecast)
+        metrics['order'] = tuple(order)
+        metrics['seasonal_order'] = tuple(seasonal_order)
+        
+        if evaluation == 'refit':
+            fitted_model = ARIMA(ts, order=order, seasonal_order=seasonal_order).fit()
+        else:
+            # Filtrar os dados de teste com os parâmetros já estimados, sem novo ajuste
+            fitted_model = eval_fitted.append(test, refit=False)
+            
+        # Fazer previsão
+        forecast = np.asarray(fitted_model.forecast(steps=periods))
+        forecast_index = pd.date_range(start=ts.index[-1] + pd.Timedelta(days=1), 
+                                     periods=periods, freq=frequency)
+        
+        if backtest_origins > 0:
+            metrics.update(self._rolling_origin_backtest(
+                fitted_model, ts, train_size, backtest_origins, backtest_horizon or periods
+            ))
+            
+        # Juntar dados históricos e previsão
+        result_df = self._forecast_frame(ts, forecast_index, forecast)
+        return result_df, metrics
+    
+    def _rolling_origin_backtest(self, fitted_model, ts: pd.Series, first_origin: int, 
+                                 origins: int, horizon: int) -> Dict[str, float]:
+        """
+        Backtest rolling-origin por filtragem, sem reajustar o modelo em cada origem.
+        
+        Cada origem usa predição dinâmica a partir do estado filtrado do modelo
+        já ajustado, de modo que o custo por origem é uma passada do filtro de
+        Kalman em vez de um novo ajuste por máxima verossimilhança.
+        
+        Args:
+            fitted_model: Resultado do statsmodels com toda a série filtrada
+            ts: Série temporal completa
+            first_origin: Primeira origem possível (fim do treino)
+            origins: Número de origens
+            horizon: Horizonte de previsão em cada origem
+            
+        Returns:
+            Dicionário com métricas médias do backtest
+        """
+        horizon = max(1, min(horizon, len(ts) - first_origin))
+        last_origin = len(ts) - horizon
+        origin_points = np.unique(np.linspace(first_origin, last_origin, num=origins).astype(int))
+        
+        errors = []
+        for origin in origin_points:
+            predicted = fitted_model.get_prediction(start=origin, end=origin + horizon - 1, 
+                                                    dynamic=True).predicted_mean
+            errors.append(self._forecast_metrics(ts.values[origin:origin + horizon], 
+                                                 np.asarray(predicted)))
+            
+        return {
+            'backtest_origins': len(origin_points),
+            'backtest_horizon': horizon,
+            'backtest_mae': float(np.mean([e['mae'] for e in errors])),
+            'backtest_rmse': float(np.mean([e['rmse'] for e in errors])),
+            'backtest_mape': float(np.mean([e['mape'] for e in errors]))
+        }
+    
+    @staticmethod
+    def _forecast_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+        """Calcula MAE, RMSE e MAPE de uma previsão"""
+        mae = mean_absolute_error(actual, predicted)
+        rmse = np.sqrt(mean_squared_error(actual, predicted))
+        
+        # Calcular erro percentual médio
+        mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+        
+        return {
+            'mae': mae,
+            'rmse': rmse,
+            'mape': mape
+        }
+    
+    @staticmethod
+    def _forecast_frame(ts: pd.Series, forecast_index: pd.DatetimeIndex, 
+                        forecast: np.ndarray) -> pd.DataFrame:
+        """Monta o DataFrame no formato histórico + previsão"""
+        return pd.DataFrame({
+            'data': ts.index.append(forecast_index),
+            'valor': np.concatenate([ts.to_numpy(dtype=float), forecast]),
+            'tipo': ['histórico'] * len(ts) + ['previsão'] * len(forecast)
+        })
+    
+    @memoize(column_args=('id_columns', 'date_column', 'value_column'))
+    def forecast_many(self, df: pd.DataFrame, id_columns: Union[str, List[str]], date_column: str, 
+                      value_column: str, periods: int = 12, frequency: str = 'M',
+                      model_type: str = 'arima', evaluation: str = 'refit',
+                      order: Optional[Union[str, Tuple[int, int, int]]] = None,
+                      seasonal_order: Optional[Union[str, Tuple[int, int, int, int]]] = None,
+                      candidates: Optional[List[str]] = None,
+                      max_workers: Optional[int] = None,
+                      chunk_size: Optional[int] = None, 
+                      min_observations: int = 10,
+                      tenant_id: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Realiza previsão de múltiplas séries temporais em paralelo.
+        
+        As séries são identificadas por id_columns e distribuídas em lotes
+        para um pool de processos, cada processo ajustando os modelos do seu
+        lote sequencialmente.
+        
+        Args:
+            df: DataFrame em formato longo com todas as séries
+            id_columns: Coluna ou colunas que identificam cada série (ex: tenant, produto, filial)
+            date_column: Nome da coluna de data
+            value_column: Nome da coluna de valor a ser previsto
+            periods: Número de períodos para previsão
+            frequency: Frequência dos dados ('D', 'W', 'M', 'Q', 'Y')
+            model_type: Tipo de modelo, ver forecast_time_series
+            evaluation: Modo de avaliação ('refit' ou 'reuse'), ver forecast_time_series
+            order: Ordem (p,d,q) ou 'auto', ver forecast_time_series
+            seasonal_order: Ordem sazonal (P,D,Q,s) ou 'auto', ver forecast_time_series
+            candidates: Modelos avaliados com model_type='auto', ver forecast_time_series
+            max_workers: Número de processos (padrão: número de CPUs; 1 executa sem pool)
+            chunk_size: Séries por lote enviado aos processos (padrão: automático)
+            min_observations: Mínimo de observações para ajustar uma série
+            tenant_id: Tenant dono das séries (isola o cache de ordens e o de resultados)
+            
+        Returns:
+            Tuple com DataFrame longo de histórico + previsões, DataFrame de
+            métricas por série e DataFrame de falhas por série
+        """
+        if isinstance(id_columns, str):
+            id_columns = [id_columns]
+            
+        series = [
+            (key if isinstance(key, tuple) else (key,),
+             group[date_column].to_numpy(), group[value_column].to_numpy(dtype=float))
+            for key, group in df[id_columns + [date_column, value_column]].groupby(
+                id_columns, sort=False, observed=True)
+        ]
+        
+        max_workers = max_workers or os.cpu_count() or 1
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(len(series) / (max_workers * 4))))
+        chunks = [series[i:i + chunk_size] for i in range(0, len(series), chunk_size)]
+        # Os lotes já rodam em paralelo; a busca de ordens de cada série é sequencial
+        selector = copy.copy(self.order_selector)
+        selector.max_workers = 1
+        options = {'periods': periods, 'frequency': frequency, 'model_type': model_type,
+                   'evaluation': evaluation, 'order': order, 'seasonal_order': seasonal_order,
+                   'candidates': candidates, 'value_column': value_column, 'min_observations': min_observations,
+                   'order_selector': selector, 'tenant_id': tenant_id}
+        
+        forecasts, metrics, failures = [], [], []
+        if max_workers == 1 or len(chunks) <= 1:
+            chunk_results = [_forecast_series_chunk(chunk, options) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, 
+                                     initializer=_init_forecast_worker) as executor:
+                chunk_results = list(executor.map(_forecast_series_chunk, chunks, 
+                                                  [options] * len(chunks)))
+                
+        for chunk_forecasts, chunk_metrics, chunk_failures in chunk_results:
+            forecasts.extend(chunk_forecasts)
+            metrics.extend(chunk_metrics)
+            failures.extend(chunk_failures)
+            
+        def with_ids(rows: List[Tuple[Tuple, Any]], columns: List[str]) -> pd.DataFrame:
+            if not rows:
+                return pd.DataFrame(columns=id_columns + columns)
+            frame = pd.DataFrame([values for _, values in rows], columns=columns)
+            ids = pd.DataFrame([key for key, _ in rows], columns=id_columns)
+            return pd.concat([ids, frame], axis=1)
+            
+        metrics_df = with_ids(metrics, ['n_obs', 'mae', 'rmse', 'mape', 'order', 'seasonal_order',
+                                        'model_type'])
+        failures_df = with_ids(failures, ['erro'])
+        
+        if forecasts:
+            result_df = pd.concat(
+                [frame.assign(**dict(zip(id_columns, key))) for key, frame in forecasts],
+                ignore_index=True
+            )[id_columns + ['data', 'valor', 'tipo']]
+        else:
+            result_df = pd.DataFrame(columns=id_columns + ['data', 'valor', 'tipo'])
+            
+        self.logger.info(f"Previsão em lote concluída: {len(metrics_df)} séries, {len(failures_df)} falhas")
+        return result_df, metrics_df, failures_df
+    
+    @memoize(column_args=('hierarchy', 'date_column', 'value_column'))
+    def forecast_hierarchical(self, df: pd.DataFrame, hierarchy: List[str], date_column: str,
+                              value_column: str, periods: int = 12, frequency: str = 'M',
+                              method: str = 'bottom_up', model_type: str = 'ets',
+                              max_workers: Optional[int] = None, tenant_id: Optional[str] = None,
+                              **kwargs) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Realiza previsão hierárquica coerente entre níveis (ex: total, região, produto).
+        
+        As séries do nível mais baixo são agregadas por uma matriz de soma
+        esparsa S (nós x séries da base). Em 'bottom_up' apenas a base é
+        ajustada e os demais níveis são S @ previsões da base. Em 'mint' todos
+        os nós são ajustados e as previsões são reconciliadas por MinT com W
+        diagonal (variância dos erros de teste de cada nó), de modo que os
+        níveis somam exatamente. Os ajustes rodam em paralelo via forecast_many.
+        
+        Args:
+            df: DataFrame em formato longo com as séries da base
+            hierarchy: Colunas da hierarquia, do nível mais alto ao mais baixo
+                (ex: ['regiao', 'produto']); o total é adicionado automaticamente
+            date_column: Nome da coluna de data
+            value_column: Nome da coluna de valor a ser previsto
+            periods: Número de períodos para previsão
+            frequency: Frequência dos dados ('D', 'W', 'M', 'Q', 'Y')
+            method: Reconciliação ('bottom_up' ou 'mint')
+            model_type: Modelo ajustado em cada nó, ver forecast_time_series
+            max_workers: Número de processos do ajuste
+            tenant_id: ID do tenant, repassado a forecast_many (cache de
+                resultados e de ordens ARIMA)
+            **kwargs: Parâmetros adicionais de forecast_many
+            
+        Returns:
+            Tuple com DataFrame longo (colunas da hierarquia, nivel, data, valor,
+            tipo) com histórico e previsões reconciliadas de todos os nós, e
+            DataFrame de métricas dos ajustes por nó
+        """
+        try:
+            if method not in ('bottom_up', 'mint'):
+                self.logger.error(f"Método de reconciliação não suportado: {method}")
+                return None, pd.DataFrame()
+                
+            data = df[hierarchy + [date_column, value_column]].copy()
+            data[date_column] = pd.to_datetime(data[date_column])
+            # Períodos sem registro em uma série da base contam como zero na agregação
+            wide = data.pivot_table(index=date_column, columns=hierarchy, values=value_column,
+                                    aggfunc='sum', fill_value=0, observed=True).sort_index()
+            bottom_keys = wide.columns.to_frame(index=False)
+            n_bottom = len(bottom_keys)
+            
+            # Matriz de soma: uma linha por nó (total, níveis intermediários, base)
+            rows, node_frames, offset = [], [], 0
+            for depth in range(len(hierarchy) + 1):
+                columns = hierarchy[:depth]
+                if columns:
+                    codes = bottom_keys.groupby(columns, sort=False).ngroup().to_numpy()
+                    keys = bottom_keys.loc[~pd.Series(codes).duplicated().to_numpy(), columns]
+                else:
+                    codes = np.zeros(n_bottom, dtype=int)
+                    keys = pd.DataFrame(index=[0])
+                rows.append(offset + codes)
+                node_frames.append(keys.reset_index(drop=True).assign(
+                    nivel=hierarchy[depth - 1] if depth else 'total'))
+                offset += len(keys)
+            nodes = pd.concat(node_frames, ignore_index=True)[hierarchy + ['nivel']]
+            n_nodes = len(nodes)
+            summing = sparse.csr_matrix(
+                (np.ones(n_bottom * (len(hierarchy) + 1)),
+                 (np.concatenate(rows), np.tile(np.arange(n_bottom), len(hierarchy) + 1))),
+                shape=(n_nodes, n_bottom)
+            )
+            
+            history = summing @ wide.to_numpy(dtype=float).T
+            dates = wide.index
+            fitted = np.arange(n_nodes - n_bottom, n_nodes) if method == 'bottom_up' else np.arange(n_nodes)
+            long_df = pd.DataFrame({
+                'no': np.repeat(fitted, len(dates)),
+                'data': np.tile(dates.to_numpy(), len(fitted)),
+                'valor': history[fitted].ravel()
+            })
+            result_df, metrics_df, failures_df = self.forecast_many(
+                long_df, ['no'], 'data', 'valor', periods=periods, frequency=frequency,
+                model_type=model_type, max_workers=max_workers, tenant_id=tenant_id, **kwargs
+            )
+            
+            forecasts = result_df[result_df['tipo'] == 'previsão']
+            forecast_index = pd.date_range(start=dates[-1] + pd.Timedelta(days=1),
+                                           periods=periods, freq=frequency)
+            base = np.full((n_nodes, periods), np.nan)
+            if len(forecasts):
+                base[fitted] = (forecasts.pivot(index='no', columns='data', values='valor')
+                                .reindex(index=fitted).to_numpy())
+            
+            # Nós sem ajuste recebem a previsão naive sazonal
+            failed = fitted[np.isnan(base[fitted]).any(axis=1)]
+            for node in failed:
+                base[node] = _statistical_forecast('seasonal_naive', history[node], periods,
+                                                   seasonal_period_for(frequency))
+            if len(failed):
+                self.logger.warning(f"{len(failed)} nós sem ajuste; usando previsão naive sazonal")
+                
+            if method == 'bottom_up':
+                reconciled = summing @ base[n_nodes - n_bottom:]
+            else:
+                variance = pd.Series(metrics_df['rmse'].to_numpy(dtype=float) ** 2,
+                                     index=metrics_df['no'].to_numpy(dtype=int)).reindex(range(n_nodes))
+                variance = variance.fillna(variance.max()).fillna(1.0).to_numpy()
+                variance = np.maximum(variance, 1e-8 * max(float(variance.max()), 1.0))
+                weights = sparse.diags(1 / variance)
+                # MinT: S (S' W^-1 S)^-1 S' W^-1 ŷ
+                normal = (summing.T @ weights @ summing).tocsc()
+                bottom = spsolve(normal, summing.T @ (weights @ base))
+                reconciled = summing @ np.asarray(bottom).reshape(n_bottom, periods)
+                
+            n_dates = len(dates)
+            history_rows = nodes.loc[np.repeat(np.arange(n_nodes), n_dates)].reset_index(drop=True)
+            forecast_rows = nodes.loc[np.repeat(np.arange(n_nodes), periods)].reset_index(drop=True)
+            hierarchical_df = pd.concat([
+                history_rows.assign(data=np.tile(dates.to_numpy(), n_nodes), valor=history.ravel(),
+                                    tipo='histórico'),
+                forecast_rows.assign(data=np.tile(forecast_index.to_numpy(), n_nodes),
+                                     valor=reconciled.ravel(), tipo='previsão')
+            ], ignore_index=True)
+            
+            node_metrics = nodes.loc[metrics_df['no'].to_numpy(dtype=int)].reset_index(drop=True)
+            node_metrics = pd.concat([node_metrics, metrics_df.drop(columns='no').reset_index(drop=True)],
+                                     axis=1)
+            
+            self.logger.info(f"Previsão hierárquica concluída ({method}): {n_nodes} nós, "
+                             f"{n_bottom} séries na base, {len(failures_df)} falhas")
+            return hierarchical_df, node_metrics
+            
+        except Exception as e:
+            self.logger.error(f"Erro na previsão hierárquica: {str(e)}")
+            return None, pd.DataFrame()
+    
     def train_prediction_model(self, df: pd.DataFrame, target_column: str, 
-                              feature_columns: List[str], model_id: str) -> Dict[str, float]:
+                              feature_columns: List[str], model_id: str,
+                              tenant_id: Optional[str] = None, model_type: str = 'random_forest',
+                              n_jobs: Optional[int] = -1, sample_size: Optional[Union[int, float]] = None,
+                              model_params: Optional[Dict[str, Any]] = None,
+                              track_memory: bool = True, 
+                              compute_learning_curve: bool = False) -> Dict[str, float]:
         """
         Treina modelo preditivo para variável alvo com base em features.
         
+        Com tenant_id, o modelo é registrado como nova versão no registro
+        persistente do tenant em vez de ficar apenas nesta instância. Modelos
+        de árvore são treinados sem StandardScaler, que não altera suas divisões.
+        
         Args:
             df: DataFrame com os dados
             target_column: Nome da coluna alvo
             feature_columns: Lista de colunas de features
             model_id: Identificador único para o modelo
+            tenant_id: ID do tenant para registro persistente (opcional)
+            model_type: Estimador ('random_forest', 'extra_trees', 
+                'hist_gradient_boosting', 'ridge')
+            n_jobs: Núcleos usados no treino (-1 usa todos)
+            sample_size: Subamostra de linhas antes do treino (int = linhas, float = fração)
+            model_params: Parâmetros adicionais repassados ao estimador
+            track_memory: Mede o pico de memória alocada durante o ajuste (alocações
+                Python/numpy rastreadas pelo tracemalloc) e o tamanho serializado do modelo
+            compute_learning_curve: Calcula curva de aprendizado (validação cruzada em 3 folds)
             
         Returns:
-            Dicionário com métricas do modelo
+            Dicionário com métricas do modelo, tempo de treino e pico de memória
         """
         try:
+            if model_type not in MODEL_BACKENDS:
+                self.logger.error(f"Tipo de modelo não suportado: {model_type}")
+                return {}
+                
+            # Subamostrar linhas, se solicitado
+            n_rows_total = len(df)
+            if sample_size is not None:
+                n_sample = int(sample_size * len(df)) if isinstance(sample_size, float) else int(sample_size)
+                if n_sample < len(df):
+                    df = df.sample(n=n_sample, random_state=42)
+                    
             # Preparar dados
             X = df[feature_columns].copy()
             y = df[target_column].copy()
             
-            # Lidar com valores faltantes
-            X = X.fillna(X.mean())
+            # Lidar com valores faltantes; as médias de treino são reutilizadas na previsão
+            fill_values = X.mean()
+            X = X.fillna(fill_values)
             
-            # Normalizar features
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
+            # Normalizar features apenas para modelos sensíveis à escala
+            model, needs_scaling = _build_estimator(model_type, n_jobs, model_params)
+            scaler = StandardScaler() if needs_scaling else None
+            X_values = X.to_numpy(dtype=float)
+            if scaler is not None:
+                X_values = scaler.fit_transform(X_values)
             
             # Dividir em treino e teste
             X_train, X_test, y_train, y_test = train_test_split(
-                X_scaled, y, test_size=0.2, random_state=42
+                X_values, y, test_size=0.2, random_state=42
             )
             
             # Treinar modelo
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
+            if track_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                with _limit_threads(n_jobs):
+                    model.fit(X_train, y_train)
+                training_time = time.perf_counter() - start
+                peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2 if track_memory else None
+            finally:
+                if track_memory:
+                    tracemalloc.stop()
             
             # Avaliar modelo
             y_pred = model.predict(X_test)
@@ -161,21 +783,56 @@ class PredictiveAnalysis:
             rmse = np.sqrt(mean_squared_error(y_test, y_pred))
             r2 = r2_score(y_test, y_pred)
             
-            # Salvar modelo e scaler
-            self.models[model_id] = model
-            self.scalers[model_id] = scaler
-            
             metrics = {
                 'mae': mae,
                 'rmse': rmse,
-                'r2': r2
+                'r2': r2,
+                'model_type': model_type,
+                'n_train': len(X_train),
+                'n_rows_total': n_rows_total,
+                'training_time': training_time,
+                'peak_memory_mb': peak_memory_mb,
+                'model_size_mb': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 ** 2 
+                                 if track_memory else None
             }
             
             # Calcular importância de features
-            feature_importance = dict(zip(feature_columns, model.feature_importances_))
+            feature_importance = dict(zip(feature_columns, self._feature_importance(
+                model, X_test, y_test, n_jobs
+            )))
             metrics['feature_importance'] = feature_importance
             
-            self.logger.info(f"Modelo preditivo treinado: {model_id}")
+            if compute_learning_curve:
+                metrics['learning_curve'] = self._learning_curve(
+                    model_type, model_params, n_jobs, X.to_numpy(dtype=float), y.to_numpy()
+                )
+            
+            # Salvar modelo e scaler
+            if tenant_id:
+                version = self.registry.register(tenant_id, model_id, model, scaler, {
+                    'target': target_column,
+                    'features': feature_columns,
+                    'model_type': model_type,
+                    'model_params': model_params or {},
+                    'metrics': {
+                        'mae': float(mae), 'rmse': float(rmse), 'r2': float(r2),
+                        'training_time': training_time, 'peak_memory_mb': peak_memory_mb,
+                        'feature_importance': {k: float(v) for k, v in feature_importance.items()}
+                    },
+                    'fill_values': {k: float(v) for k, v in fill_values.items()},
+                    'data_hash': self.registry.data_hash(df[feature_columns + [target_column]]),
+                    'n_rows': len(df)
+                })
+                if version is None:
+                    return {}
+                metrics['version'] = version
+            else:
+                self.models[model_id] = model
+                self.scalers[model_id] = scaler
+                self.fill_values[model_id] = fill_values.to_dict()
+            
+            self.logger.info(f"Modelo preditivo treinado: {model_id} ({model_type}, "
+                             f"{training_time:.2f}s)")
             return metrics
             
         except Exception as e:
@@ -183,32 +840,33 @@ class PredictiveAnalysis:
             return {}
     
     def predict(self, df: pd.DataFrame, model_id: str, 
-               feature_columns: List[str]) -> Optional[np.ndarray]:
+               feature_columns: Optional[List[str]] = None,
+               tenant_id: Optional[str] = None, version: Optional[int] = None) -> Optional[np.ndarray]:
         """
         Faz previsões usando modelo treinado.
         
         Args:
             df: DataFrame com os dados de entrada
             model_id: Identificador do modelo
-            feature_columns: Lista de colunas de features
+            feature_columns: Lista de colunas de features (padrão: as do registro)
+            tenant_id: ID do tenant para carregar o modelo do registro persistente
+            version: Versão do modelo no registro (padrão: a mais recente)
             
         Returns:
             Array com as previsões ou None em caso de erro
         """
         try:
-            if model_id not in self.models or model_id not in self.scalers:
+            model, scaler, info = self._get_model(model_id, tenant_id, version)
+            if model is None:
                 self.logger.error(f"Modelo não encontrado: {model_id}")
                 return None
                 
-            # Preparar dados
-            X = df[feature_columns].copy()
-            X = X.fillna(X.mean())
-            
-            # Normalizar features
-            X_scaled = self.scalers[model_id].transform(X)
-            
-            # Fazer previsão
-            predictions = self.models[model_id].predict(X_scaled)
+            feature_columns = feature_columns or info.get('features')
+            if not feature_columns:
+                self.logger.error(f"Features não informadas para o modelo: {model_id}")
+                return None
+                
+            predictions = _score_frame(model, scaler, info.get('fill_values'), df, feature_columns)
             
             self.logger.info(f"Previsões realizadas com modelo {model_id}: {len(predictions)} registros")
             return predictions
@@ -217,56 +875,298 @@ class PredictiveAnalysis:
             self.logger.error(f"Erro ao fazer previsões: {str(e)}")
             return None
     
+    @staticmethod
+    def _feature_importance(model, X_test: np.ndarray, y_test: pd.Series, 
+                            n_jobs: Optional[int]) -> np.ndarray:
+        """
+        Importância das features: nativa das árvores, coeficientes absolutos dos
+        modelos lineares ou, na falta de ambas, permutação em até 2000 linhas de teste.
+        """
+        if hasattr(model, 'feature_importances_'):
+            return model.feature_importances_
+        if hasattr(model, 'coef_'):
+            coef = np.abs(np.ravel(model.coef_))
+            return coef / coef.sum() if coef.sum() > 0 else coef
+        
+        n = min(len(X_test), 2000)
+        result = permutation_importance(model, X_test[:n], np.asarray(y_test)[:n], 
+                                        n_repeats=3, random_state=42, n_jobs=n_jobs)
+        return result.importances_mean
+    
+    def _learning_curve(self, model_type: str, model_params: Optional[Dict[str, Any]], 
+                        n_jobs: Optional[int], X: np.ndarray, y: np.ndarray) -> Dict[str, List[float]]:
+        """
+        Calcula a curva de aprendizado (erro e tempo de ajuste por tamanho de treino).
+        
+        Args:
+            model_type: Estimador
+            model_params: Parâmetros adicionais do estimador
+            n_jobs: Núcleos usados pelo estimador
+            X: Features
+            y: Alvo
+            
+        Returns:
+            Dicionário com tamanhos de treino, MAE de treino/validação e tempos de ajuste
+        """
+        estimator, needs_scaling = _build_estimator(model_type, n_jobs, model_params)
+        if needs_scaling:
+            estimator = make_pipeline(StandardScaler(), estimator)
+            
+        with _limit_threads(n_jobs):
+            sizes, train_scores, test_scores, fit_times, _ = learning_curve(
+                estimator, X, y, train_sizes=[0.1, 0.25, 0.5, 0.75, 1.0], cv=3,
+                scoring='neg_mean_absolute_error', shuffle=True, random_state=42,
+                return_times=True
+            )
+            
+        return {
+            'train_sizes': sizes.tolist(),
+            'train_mae': (-train_scores.mean(axis=1)).tolist(),
+            'validation_mae': (-test_scores.mean(axis=1)).tolist(),
+            'fit_time': fit_times.mean(axis=1).tolist()
+        }
+    
+    def predict_stream(self, source: Union[str, Iterable[pd.DataFrame]], model_id: str,
+                       feature_columns: Optional[List[str]] = None,
+                       tenant_id: Optional[str] = None, version: Optional[int] = None,
+                       id_columns: Optional[List[str]] = None, chunk_size: int = 100_000,
+                       max_workers: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Faz previsões em lotes sobre uma fonte maior que a memória.
+        
+        Os lotes são lidos sob demanda e pontuados em paralelo por threads que
+        compartilham o mesmo modelo; no máximo 2 * max_workers lotes ficam em
+        memória ao mesmo tempo. Os resultados saem na ordem da fonte. Valores
+        faltantes são preenchidos com as médias de treino, de modo que a
+        previsão de uma linha não depende do lote em que ela está.
+        
+        Args:
+            source: Caminho de arquivo Parquet/CSV ou iterável de DataFrames
+            model_id: Identificador do modelo
+            feature_columns: Lista de colunas de features (padrão: as do treino)
+            tenant_id: ID do tenant para carregar o modelo do registro persistente
+            version: Versão do modelo no registro (padrão: a mais recente)
+            id_columns: Colunas copiadas da fonte para a saída (ex: id do cliente)
+            chunk_size: Linhas por lote ao ler arquivos
+            max_workers: Threads de pontuação (padrão: número de CPUs)
+            
+        Returns:
+            Iterador de DataFrames com id_columns e a coluna 'previsao'
+            
+        Raises:
+            Exception: Erros de leitura ou pontuação são registrados e propagados
+        """
+        model, scaler, info = self._get_model(model_id, tenant_id, version)
+        if model is None:
+            self.logger.error(f"Modelo não encontrado: {model_id}")
+            return
+            
+        feature_columns = feature_columns or info.get('features')
+        if not feature_columns:
+            self.logger.error(f"Features não informadas para o modelo: {model_id}")
+            return
+            
+        id_columns = id_columns or []
+        fill_values = info.get('fill_values')
+        if fill_values is None:
+            self.logger.warning(f"Modelo {model_id} sem médias de treino; usando a média de cada lote")
+            
+        chunks = _iter_chunks(source, feature_columns + id_columns, chunk_size)
+        
+        def score(chunk: pd.DataFrame) -> pd.DataFrame:
+            result = chunk[id_columns].reset_index(drop=True) if id_columns else pd.DataFrame(index=range(len(chunk)))
+            result['previsao'] = _score_frame(model, scaler, fill_values, chunk, feature_columns)
+            return result
+            
+        max_workers = max_workers or os.cpu_count() or 1
+        total = 0
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = []
+                for chunk in chunks:
+                    pending.append(executor.submit(score, chunk))
+                    if len(pending) >= 2 * max_workers:
+                        result = pending.pop(0).result()
+                        total += len(result)
+                        yield result
+                for future in pending:
+                    result = future.result()
+                    total += len(result)
+                    yield result
+        except Exception as e:
+            # Um fluxo interrompido não pode ser confundido com um fluxo completo
+            self.logger.error(f"Erro nas previsões em lote após {total} registros: {str(e)}")
+            raise
+        
+        self.logger.info(f"Previsões em lote realizadas com modelo {model_id}: {total} registros")
+    
+    def predict_to_parquet(self, source: Union[str, Iterable[pd.DataFrame]], output_path: str,
+                           model_id: str, **kwargs) -> int:
+        """
+        Grava as previsões de predict_stream em um arquivo Parquet, lote a lote.
+        
+        Args:
+            source: Caminho de arquivo Parquet/CSV ou iterável de DataFrames
+            output_path: Arquivo Parquet de saída
+            model_id: Identificador do modelo
+            **kwargs: Demais parâmetros de predict_stream
+            
+        Returns:
+            Número de registros gravados, ou -1 em caso de erro
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        writer = None
+        total = 0
+        try:
+            for result in self.predict_stream(source, model_id, **kwargs):
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                total += len(result)
+            return total
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar previsões em {output_path}: {str(e)}")
+            return -1
+        finally:
+            if writer is not None:
+                writer.close()
+    
+    def _get_model(self, model_id: str, tenant_id: Optional[str] = None,
+                   version: Optional[int] = None) -> Tuple[Any, Any, Dict[str, Any]]:
+        """
+        Obtém modelo e scaler desta instância ou do registro persistente do tenant.
+        
+        Args:
+            model_id: Identificador do modelo
+            tenant_id: ID do tenant (None usa apenas os modelos desta instância)
+            version: Versão do modelo no registro
+            
+        Returns:
+            Tuple (modelo, scaler, informações de treino com features e 
+            fill_values), ou (None, None, {}) se não encontrado
+        """
+        if tenant_id:
+            loaded = self.registry.load(tenant_id, model_id, version)
+            if loaded is None:
+                return None, None, {}
+            return loaded
+            
+        if model_id not in self.models or model_id not in self.scalers:
+            return None, None, {}
+        fill_values = self.fill_values.get(model_id)
+        return self.models[model_id], self.scalers[model_id], {
+            'features': list(fill_values) if fill_values else None,
+            'fill_values': fill_values
+        }
+    
     def detect_anomalies(self, df: pd.DataFrame, column: str, 
-                        method: str = 'std', threshold: float = 3.0) -> pd.DataFrame:
+                        method: str = 'std', threshold: float = 3.0,
+                        group_columns: Optional[List[str]] = None,
+                        date_column: Optional[str] = None, window: int = 12) -> pd.DataFrame:
         """
         Detecta anomalias em uma série de dados.
         
+        Com group_columns, cada combinação (ex: tenant, filial, KPI) é tratada
+        como uma série independente e as estatísticas de todas as séries são
+        calculadas em uma única passada vetorizada (groupby-transform).
+        
         Args:
             df: DataFrame com os dados
             column: Nome da coluna para analisar
-            method: Método de detecção ('std', 'iqr')
+            method: Método de detecção ('std', 'iqr', 'rolling_z', 'mad')
             threshold: Limiar para considerar anomalia
+            group_columns: Colunas que identificam cada série (opcional)
+            date_column: Coluna de data que ordena cada série ('rolling_z')
+            window: Tamanho da janela móvel ('rolling_z')
             
         Returns:
             DataFrame com flag de anomalia
         """
         try:
             result_df = df.copy()
-            values = result_df[column].values
+            values = result_df[column].astype(float).reset_index(drop=True)
+            
+            # Sem grupos, toda a coluna é uma única série
+            if group_columns:
+                keys = [result_df[c].reset_index(drop=True) for c in group_columns]
+            else:
+                keys = [pd.Series(np.zeros(len(values), dtype=np.int8))]
+            grouped = values.groupby(keys, sort=False, observed=True)
             
             if method == 'std':
                 # Método de desvio padrão
-                mean = np.mean(values)
-                std = np.std(values)
+                mean = grouped.transform('mean')
+                std = grouped.transform('std', ddof=0)
                 
                 # Marcar anomalias
-                result_df['anomalia'] = (np.abs(values - mean) > threshold * std)
-                result_df['score'] = np.abs(values - mean) / std
+                deviation = (values - mean).abs()
+                anomalies = deviation > threshold * std
+                scores = _safe_ratio(deviation, std)
                 
             elif method == 'iqr':
                 # Método de amplitude interquartil
-                q1 = np.percentile(values, 25)
-                q3 = np.percentile(values, 75)
+                q1 = grouped.transform('quantile', 0.25)
+                q3 = grouped.transform('quantile', 0.75)
                 iqr = q3 - q1
                 
                 lower_bound = q1 - threshold * iqr
                 upper_bound = q3 + threshold * iqr
                 
                 # Marcar anomalias
-                result_df['anomalia'] = (values < lower_bound) | (values > upper_bound)
+                anomalies = (values < lower_bound) | (values > upper_bound)
                 
                 # Calcular score normalizado
                 distance = np.maximum(lower_bound - values, values - upper_bound)
-                result_df['score'] = np.where(result_df['anomalia'], distance / iqr, 0)
+                scores = _safe_ratio(distance, iqr).where(anomalies, 0.0)
+                
+            elif method == 'rolling_z':
+                # Z-score contra a janela anterior de cada série (o ponto não entra na própria janela)
+                order = (np.argsort(result_df[date_column].to_numpy(), kind='stable')
+                         if date_column else np.arange(len(values)))
+                sorted_values = values.iloc[order].reset_index(drop=True)
+                sorted_keys = [k.iloc[order].reset_index(drop=True) for k in keys]
+                
+                previous = sorted_values.groupby(sorted_keys, sort=False, observed=True).shift(1)
+                rolling = previous.groupby(sorted_keys, sort=False, observed=True).rolling(
+                    window, min_periods=max(2, window // 2)
+                )
+                mean = rolling.mean().reset_index(level=list(range(len(keys))), drop=True).sort_index()
+                std = rolling.std(ddof=0).reset_index(level=list(range(len(keys))), drop=True).sort_index()
+                
+                deviation = (sorted_values - mean).abs()
+                sorted_scores = _safe_ratio(deviation, std)
+                
+                # Voltar para a ordem original
+                scores = pd.Series(np.empty(len(values)))
+                scores.iloc[order] = sorted_scores.to_numpy()
+                anomalies = scores > threshold
+                
+            elif method == 'mad':
+                # Z-score modificado pela mediana e desvio absoluto mediano (robusto a outliers)
+                median = grouped.transform('median')
+                deviation = (values - median).abs()
+                mad = deviation.groupby(keys, sort=False, observed=True).transform('median')
+                
+                scores = 0.6745 * _safe_ratio(deviation, mad)
+                anomalies = scores > threshold
                 
             else:
                 self.logger.error(f"Método de detecção de anomalias não suportado: {method}")
                 return df
                 
+            result_df['anomalia'] = anomalies.to_numpy()
+            result_df['score'] = scores.to_numpy()
+                
             # Contar anomalias
             anomaly_count = result_df['anomalia'].sum()
-            self.logger.info(f"Detecção de anomalias concluída: {anomaly_count} anomalias encontradas")
+            if group_columns:
+                self.logger.info(f"Detecção de anomalias concluída: {anomaly_count} anomalias encontradas "
+                                 f"em {grouped.ngroups} séries")
+            else:
+                self.logger.info(f"Detecção de anomalias concluída: {anomaly_count} anomalias encontradas")
             
             return result_df
             
@@ -274,6 +1174,7 @@ class PredictiveAnalysis:
             self.logger.error(f"Erro na detecção de anomalias: {str(e)}")
             return df
     
+    @memoize()
     def analyze_trend(self, df: pd.DataFrame, date_column: str, 
                     value_column: str, frequency: str = 'M') -> Dict[str, Any]:
         """
@@ -353,67 +1254,219 @@ class PredictiveAnalysis:
             self.logger.error(f"Erro na análise de tendência: {str(e)}")
             return {}
     
+    @memoize(column_args=('id_columns', 'date_column', 'value_column'))
+    def analyze_trend_many(self, df: pd.DataFrame, id_columns: List[str], date_column: str,
+                           value_column: str, frequency: str = 'M', window: int = 6,
+                           recent_periods: int = 3, decompose: bool = True,
+                           max_workers: Optional[int] = None,
+                           chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Analisa tendência de múltiplas séries temporais de uma vez.
+        
+        Crescimento, CAGR, direção e médias móveis são calculados para todas
+        as séries com operações vetorizadas sobre o painel regularizado. A
+        decomposição sazonal roda apenas nas séries com pelo menos dois ciclos
+        completos, em lotes distribuídos para um pool de processos.
+        
+        Os resultados por período ficam em arrays do painel: os pontos da
+        série i são values[offsets[i]:offsets[i + 1]], na ordem de summary.
+        
+        Args:
+            df: DataFrame em formato longo com todas as séries
+            id_columns: Colunas que identificam cada série
+            date_column: Nome da coluna de data
+            value_column: Nome da coluna de valor
+            frequency: Frequência dos dados ('D', 'W', 'M', 'Q', 'Y')
+            window: Janela da média móvel (limitada ao tamanho da série)
+            recent_periods: Períodos finais usados para a direção da tendência
+            decompose: Se True, realiza a decomposição sazonal
+            max_workers: Número de processos da decomposição (1 executa sem pool)
+            chunk_size: Séries por lote enviado aos processos (padrão: automático)
+            
+        Returns:
+            Dicionário com summary (DataFrame por série), offsets, dates, values,
+            rolling_mean e seasonality (arrays trend/seasonal/resid, NaN onde não
+            há decomposição)
+        """
+        try:
+            data = df[id_columns + [date_column, value_column]]
+            periods = pd.PeriodIndex(pd.to_datetime(data[date_column]), freq=frequency).asi8
+            # Com sort=False os códigos seguem a ordem da primeira ocorrência de cada série
+            codes = data.groupby(id_columns, sort=False, observed=True).ngroup().to_numpy()
+            keys = data.loc[~pd.Series(codes).duplicated().to_numpy(), id_columns].reset_index(drop=True)
+            n_series = len(keys)
+            
+            # Painel regular: cada série ocupa do seu primeiro ao último período, como asfreq
+            start = np.full(n_series, np.iinfo(np.int64).max)
+            end = np.full(n_series, np.iinfo(np.int64).min)
+            np.minimum.at(start, codes, periods)
+            np.maximum.at(end, codes, periods)
+            lengths = end - start + 1
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            series_of = np.repeat(np.arange(n_series), lengths)
+            position = np.arange(offsets[-1]) - offsets[series_of]
+            
+            values = np.full(offsets[-1], np.nan)
+            values[offsets[codes] + periods - start[codes]] = data[value_column].to_numpy(dtype=float)
+            values = _interpolate_panel(values, series_of)
+            dates = pd.PeriodIndex(pd.arrays.PeriodArray(start[series_of] + position,
+                                                         dtype=pd.PeriodDtype(frequency)))
+            dates = dates.to_timestamp(how='end').normalize().to_numpy()
+            
+            first = values[offsets[:-1]]
+            last = values[offsets[1:] - 1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = last / first
+                total_growth = np.where(lengths > 1, (ratio - 1) * 100, 0.0)
+                avg_growth = np.where(lengths > 1, (np.power(ratio, 1 / np.maximum(lengths - 1, 1)) - 1) * 100, 0.0)
+                
+            recent_start = values[offsets[1:] - np.minimum(recent_periods, lengths)]
+            direction = np.select(
+                [lengths < 2, last > recent_start, last < recent_start],
+                ['indeterminado', 'crescente', 'decrescente'], default='estável'
+            )
+            
+            # Média móvel por somas acumuladas; NaN até completar a janela da série
+            series_window = np.minimum(window, lengths)[series_of]
+            cumsum = np.concatenate([[0.0], np.cumsum(np.nan_to_num(values))])
+            valid = np.concatenate([[0], np.cumsum(~np.isnan(values))])
+            index = np.arange(len(values))
+            lower = np.maximum(index + 1 - series_window, 0)
+            complete = (position + 1 >= series_window) & (valid[index + 1] - valid[lower] == series_window)
+            rolling_mean = np.where(complete, (cumsum[index + 1] - cumsum[lower]) / series_window, np.nan)
+            
+            period = seasonal_period_for(frequency)
+            eligible = np.flatnonzero(lengths >= 2 * period) if decompose and period >= 2 else np.array([], dtype=int)
+            seasonality = None
+            decomposed_mask = np.zeros(n_series, dtype=bool)
+            if decompose:
+                seasonality = {name: np.full(len(values), np.nan) for name in ('trend', 'seasonal', 'resid')}
+                for i, components in self._decompose_panel(values, offsets, eligible, period,
+                                                           max_workers, chunk_size):
+                    decomposed_mask[i] = True
+                    for name, component in components.items():
+                        seasonality[name][offsets[i]:offsets[i + 1]] = component
+                
+            summary = keys.assign(
+                n_obs=lengths,
+                total_growth_pct=total_growth,
+                avg_growth_rate_pct=avg_growth,
+                trend_direction=pd.Categorical(direction),
+                decomposicao=decomposed_mask
+            )
+            
+            self.logger.info(f"Análise de tendência em lote concluída: {n_series} séries, "
+                             f"{int(decomposed_mask.sum())} com decomposição sazonal")
+            return {
+                'summary': summary,
+                'offsets': offsets,
+                'dates': dates,
+                'values': values,
+                'rolling_mean': rolling_mean,
+                'seasonality': seasonality
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Erro na análise de tendência em lote: {str(e)}")
+            return {}
+    
+    def _decompose_panel(self, values: np.ndarray, offsets: np.ndarray, series: np.ndarray,
+                         period: int, max_workers: Optional[int],
+                         chunk_size: Optional[int]) -> List[Tuple[int, Dict[str, np.ndarray]]]:
+        """Decompõe as séries indicadas do painel, em paralelo quando há mais de um lote"""
+        tasks = [(int(i), values[offsets[i]:offsets[i + 1]]) for i in series]
+        if not tasks:
+            return []
+        max_workers = max_workers or os.cpu_count() or 1
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(len(tasks) / (max_workers * 4))))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        
+        if max_workers == 1 or len(chunks) <= 1:
+            chunk_results = [_decompose_chunk(chunk, period) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     initializer=_init_forecast_worker) as executor:
+                chunk_results = list(executor.map(_decompose_chunk, chunks, [period] * len(chunks)))
+                
+        decomposed = [item for chunk_result in chunk_results for item in chunk_result]
+        if len(decomposed) < len(tasks):
+            self.logger.warning(f"Decomposição sazonal não realizada em {len(tasks) - len(decomposed)} séries")
+        return decomposed
+    
+    @memoize(data_arg='transactions', column_args=('item_column', 'transaction_column'))
     def market_basket_analysis(self, transactions: pd.DataFrame, 
                               item_column: str, transaction_column: str, 
-                              min_support: float = 0.01) -> Dict[str, Any]:
+                              min_support: float = 0.01, algorithm: str = 'fpgrowth',
+                              max_len: Optional[int] = None) -> Dict[str, Any]:
         """
         Realiza análise de cesta de compras (MBA).
         
+        As transações são codificadas diretamente da tabela longa em uma
+        matriz esparsa CSR (transações x itens), descartando antes os itens
+        abaixo do suporte mínimo, que não podem participar de nenhum conjunto
+        frequente.
+        
         Args:
             transactions: DataFrame com as transações
             item_column: Nome da coluna de itens
             transaction_column: Nome da coluna de ID da transação
             min_support: Suporte mínimo para regras de associação
+            algorithm: Minerador de conjuntos frequentes ('fpgrowth', 'fpmax', 'apriori');
+                'fpmax' retorna apenas os conjuntos maximais, sem regras
+            max_len: Tamanho máximo dos conjuntos frequentes (opcional)
             
         Returns:
             Dicionário com regras de associação e métricas
         """
         try:
-            from mlxtend.frequent_patterns import apriori, association_rules
-            from mlxtend.preprocessing import TransactionEncoder
-            
-            # Agrupar itens por transação
-            grouped = transactions.groupby(transaction_column)[item_column].apply(list).reset_index()
-            transactions_list = grouped[item_column].tolist()
+            from mlxtend.frequent_patterns import apriori, fpgrowth, fpmax, association_rules
             
-            # Codificar transações
-            te = TransactionEncoder()
-            te_ary = te.fit_transform(transactions_list)
-            df_encoded = pd.DataFrame(te_ary, columns=te.columns_)
+            miners = {'fpgrowth': fpgrowth, 'fpmax': fpmax, 'apriori': apriori}
+            if algorithm not in miners:
+                self.logger.error(f"Algoritmo de cesta de compras não suportado: {algorithm}")
+                return {}
+                
+            # Codificar transações em matriz esparsa
+            encoded, items = self._encode_transactions(transactions, item_column, 
+                                                       transaction_column, min_support)
             
             # Gerar conjuntos frequentes
-            frequent_itemsets = apriori(df_encoded, min_support=min_support, use_colnames=True)
-            
-            # Gerar regras de associação
-            rules = association_rules(frequent_itemsets, metric="lift", min_threshold=1.0)
-            
-            # Converter para formato mais amigável
-            results = []
-            for _, row in rules.iterrows():
-                antecedents = list(row['antecedents'])
-                consequents = list(row['consequents'])
-                
-                rule_result = {
-                    'antecedentes': antecedents,
-                    'consequentes': consequents,
-                    'suporte': row['support'],
-                    'confiança': row['confidence'],
-                    'lift': row['lift']
-                }
-                results.append(rule_result)
+            frequent_itemsets = miners[algorithm](encoded, min_support=min_support, 
+                                                  use_colnames=True, max_len=max_len)
             
-            # Ordenar por lift (mais relevantes primeiro)
-            results = sorted(results, key=lambda x: x['lift'], reverse=True)
+            itemsets = pd.DataFrame({
+                'itens': [items[sorted(itemset)].tolist() for itemset in frequent_itemsets['itemsets']],
+                'suporte': frequent_itemsets['support'].to_numpy()
+            }).sort_values('suporte', ascending=False)
+            
+            # Gerar regras de associação (conjuntos maximais não têm o suporte dos subconjuntos)
+            if algorithm != 'fpmax' and not frequent_itemsets.empty:
+                rules = association_rules(frequent_itemsets, metric="lift", min_threshold=1.0)
+            else:
+                rules = pd.DataFrame(columns=['antecedents', 'consequents', 'support', 'confidence', 'lift'])
+            
+            # Converter para formato mais amigável, ordenando por lift (mais relevantes primeiro)
+            rules = rules.sort_values('lift', ascending=False, kind='stable')
+            results = pd.DataFrame({
+                'antecedentes': [items[sorted(itemset)].tolist() for itemset in rules['antecedents']],
+                'consequentes': [items[sorted(itemset)].tolist() for itemset in rules['consequents']],
+                'suporte': rules['support'].to_numpy(dtype=float),
+                'confiança': rules['confidence'].to_numpy(dtype=float),
+                'lift': rules['lift'].to_numpy(dtype=float)
+            }).to_dict('records')
             
             # Resumo
             summary = {
                 'total_rules': len(results),
+                'total_itemsets': len(itemsets),
                 'avg_lift': rules['lift'].mean() if not rules.empty else 0,
                 'top_associations': results[:10] if len(results) >= 10 else results
             }
             
-            self.logger.info(f"Análise de cesta de compras concluída: {len(results)} regras encontradas")
-            return {'rules': results, 'summary': summary}
+            self.logger.info(f"Análise de cesta de compras concluída ({algorithm}): "
+                             f"{len(itemsets)} conjuntos frequentes, {len(results)} regras encontradas")
+            return {'rules': results, 'itemsets': itemsets.to_dict('records'), 'summary': summary}
             
         except ImportError:
             self.logger.error("Pacote mlxtend não instalado, necessário para análise de cesta de compras")
@@ -422,57 +1475,202 @@ class PredictiveAnalysis:
             self.logger.error(f"Erro na análise de cesta de compras: {str(e)}")
             return {}
     
+    @staticmethod
+    def _encode_transactions(transactions: pd.DataFrame, item_column: str, 
+                             transaction_column: str, 
+                             min_support: float) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Codifica a tabela longa de transações em um DataFrame esparso booleano.
+        
+        Args:
+            transactions: DataFrame com uma linha por (transação, item)
+            item_column: Nome da coluna de itens
+            transaction_column: Nome da coluna de ID da transação
+            min_support: Suporte mínimo; itens abaixo dele são descartados
+            
+        Returns:
+            Tuple com DataFrame esparso (colunas 0..n-1) e array com o item de cada coluna
+        """
+        tx_codes, tx_labels = pd.factorize(transactions[transaction_column], sort=False)
+        item_codes, item_labels = pd.factorize(transactions[item_column], sort=False)
+        valid = (tx_codes >= 0) & (item_codes >= 0)
+        tx_codes, item_codes = tx_codes[valid], item_codes[valid]
+        n_transactions = len(tx_labels)
+        
+        # Remover pares repetidos (mesmo item mais de uma vez na transação)
+        pairs = np.unique(tx_codes.astype(np.int64) * len(item_labels) + item_codes)
+        tx_codes, item_codes = pairs // len(item_labels), pairs % len(item_labels)
+        
+        # Descartar itens infrequentes antes de montar a matriz
+        item_support = np.bincount(item_codes, minlength=len(item_labels)) / max(1, n_transactions)
+        frequent = np.flatnonzero(item_support >= min_support)
+        column_of = np.full(len(item_labels), -1, dtype=np.int64)
+        column_of[frequent] = np.arange(len(frequent))
+        keep = column_of[item_codes] >= 0
+        
+        matrix = sparse.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=bool), (tx_codes[keep], column_of[item_codes[keep]])),
+            shape=(n_transactions, len(frequent))
+        )
+        with warnings.catch_warnings():
+            # O pandas avisa sobre o fill_value 0 em SparseDtype[bool]; equivale a False
+            warnings.simplefilter('ignore', FutureWarning)
+            encoded = pd.DataFrame.sparse.from_spmatrix(matrix, columns=range(len(frequent)))
+        return encoded, np.asarray(item_labels)[frequent]
+    
     def customer_segmentation(self, df: pd.DataFrame, 
-                             features: List[str], n_clusters: int = 3) -> pd.DataFrame:
+                             features: List[str], n_clusters: Union[int, str] = 3,
+                             method: str = 'auto', batch_size: int = 4096, n_epochs: int = 2,
+                             k_range: Optional[List[int]] = None, sample_size: int = 10000,
+                             max_workers: Optional[int] = None,
+                             tenant_id: Optional[str] = None) -> pd.DataFrame:
         """
         Realiza segmentação de clientes utilizando clustering.
         
+        No modo 'minibatch' os dados são normalizados e agrupados em lotes
+        (partial_fit), sem materializar a matriz completa de features, o que
+        permite segmentar dezenas de milhões de clientes. O perfil dos
+        segmentos e a escolha de k ficam em result_df.attrs['segmentacao'].
+        
+        Apenas os rótulos são memoizados, pelo conteúdo das colunas de
+        features: alterar as demais colunas não invalida o cache nem as
+        copia para ele.
+        
         Args:
             df: DataFrame com dados dos clientes
             features: Lista de features para segmentação
-            n_clusters: Número de segmentos desejados
+            n_clusters: Número de segmentos desejados ou 'auto' para escolher
+                por silhouette em uma amostra
+            method: 'kmeans' (lote completo), 'minibatch' ou 'auto' (minibatch
+                acima de 50 mil clientes)
+            batch_size: Linhas por lote no modo minibatch
+            n_epochs: Passadas sobre os dados no modo minibatch
+            k_range: Valores de k avaliados com n_clusters='auto' (padrão: 2 a 8)
+            sample_size: Tamanho da amostra para o silhouette
+            max_workers: Threads usadas para avaliar os valores de k
+            tenant_id: ID do tenant para o escopo do cache de resultados
             
         Returns:
-            DataFrame original com coluna de segmento adicionada
+            Cópia do DataFrame com coluna de segmento adicionada; em caso de
+            erro, o próprio DataFrame de entrada
+        """
+        segments = self._segment_customers(df, features, n_clusters=n_clusters, method=method,
+                                           batch_size=batch_size, n_epochs=n_epochs, k_range=k_range,
+                                           sample_size=sample_size, max_workers=max_workers,
+                                           tenant_id=tenant_id)
+        if segments is None:
+            return df
+        
+        result_df = df.copy()
+        result_df['segmento'] = segments['segmento']
+        result_df['segmento_nome'] = segments['segmento_nome']
+        result_df.attrs['segmentacao'] = segments['segmentacao']
+        return result_df
+    
+    @memoize(column_args=('features',))
+    def _segment_customers(self, df: pd.DataFrame, features: List[str], n_clusters: Union[int, str],
+                           method: str, batch_size: int, n_epochs: int, k_range: Optional[List[int]],
+                           sample_size: int, max_workers: Optional[int],
+                           tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Calcula os rótulos de segmento de customer_segmentation.
+        
+        Args:
+            df: DataFrame com dados dos clientes
+            features: Lista de features para segmentação
+            n_clusters, method, batch_size, n_epochs, k_range, sample_size,
+            max_workers: Parâmetros de customer_segmentation
+            tenant_id: ID do tenant para o escopo do cache de resultados
+            
+        Returns:
+            Dicionário com os arrays 'segmento' e 'segmento_nome' (na ordem das
+            linhas de df) e o resumo 'segmentacao', ou None em caso de erro
         """
         try:
-            from sklearn.cluster import KMeans
+            from sklearn.cluster import KMeans, MiniBatchKMeans
             from sklearn.preprocessing import StandardScaler
             
-            # Copiar DataFrame original
-            result_df = df.copy()
-            
-            # Selecionar features
-            X = result_df[features].copy()
+            if method == 'auto':
+                method = 'minibatch' if len(df) > 50000 else 'kmeans'
+            if method not in ('kmeans', 'minibatch'):
+                self.logger.error(f"Método de segmentação não suportado: {method}")
+                return None
+                
+            # Apenas as features; as demais colunas são reanexadas por customer_segmentation
+            result_df = df[features].copy()
             
-            # Lidar com valores faltantes
-            X = X.fillna(X.mean())
+            # Lidar com valores faltantes com as médias globais, aplicadas lote a lote
+            fill_values = result_df[features].mean()
             
+            def feature_chunks(size: int):
+                for start in range(0, len(result_df), size):
+                    yield result_df[features].iloc[start:start + size].fillna(fill_values).to_numpy(dtype=float)
+                    
             # Normalizar dados
             scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
+            for chunk in feature_chunks(max(batch_size, 100000)):
+                scaler.partial_fit(chunk)
+                
+            silhouettes = None
+            if n_clusters == 'auto':
+                n_clusters, silhouettes = self._select_n_clusters(
+                    result_df, features, fill_values, scaler, k_range or list(range(2, 9)),
+                    sample_size, max_workers
+                )
+                
+            if method == 'kmeans':
+                # Aplicar K-means
+                kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+                X = result_df[features].fillna(fill_values).to_numpy(dtype=float)
+                result_df['segmento'] = kmeans.fit_predict(scaler.transform(X))
+            else:
+                # Aplicar MiniBatchKMeans em lotes, com ordem de lotes embaralhada por época
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=batch_size,
+                                         n_init=3)
+                rng = np.random.default_rng(42)
+                # Inicializar os centróides com uma amostra aleatória: o primeiro lote
+                # contíguo pode cobrir só parte dos segmentos em dados ordenados
+                init_rows = np.sort(rng.choice(len(result_df), replace=False,
+                                               size=min(len(result_df), max(batch_size, 3 * n_clusters))))
+                init_sample = result_df[features].iloc[init_rows].fillna(fill_values).to_numpy(dtype=float)
+                kmeans.partial_fit(scaler.transform(init_sample))
+                for epoch in range(n_epochs):
+                    # Blocos grandes convertidos uma vez, percorridos em lotes de batch_size
+                    for block in feature_chunks(max(batch_size, 200000)):
+                        block = scaler.transform(block)
+                        starts = np.arange(0, len(block), batch_size)
+                        for start in (starts if epoch == 0 else rng.permutation(starts)):
+                            batch = block[start:start + batch_size]
+                            # Lotes menores que n_clusters (o último) não inicializam os centróides
+                            if len(batch) >= n_clusters:
+                                kmeans.partial_fit(batch)
+                            
+                labels = np.empty(len(result_df), dtype=np.int32)
+                start = 0
+                for chunk in feature_chunks(200000):
+                    labels[start:start + len(chunk)] = kmeans.predict(scaler.transform(chunk))
+                    start += len(chunk)
+                result_df['segmento'] = labels
             
-            # Aplicar K-means
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            result_df['segmento'] = kmeans.fit_predict(X_scaled)
+            # Calcular características de cada segmento em uma única agregação
+            stats = result_df.groupby('segmento')[features].agg(['mean', 'median', 'min', 'max'])
+            sizes = result_df['segmento'].value_counts()
             
-            # Calcular características de cada segmento
             segment_profiles = {}
             for i in range(n_clusters):
-                segment_df = result_df[result_df['segmento'] == i]
-                profile = {}
-                
-                for feature in features:
-                    profile[feature] = {
-                        'media': segment_df[feature].mean(),
-                        'mediana': segment_df[feature].median(),
-                        'min': segment_df[feature].min(),
-                        'max': segment_df[feature].max()
+                size = int(sizes.get(i, 0))
+                profile = {
+                    feature: {
+                        'media': stats.at[i, (feature, 'mean')] if i in stats.index else np.nan,
+                        'mediana': stats.at[i, (feature, 'median')] if i in stats.index else np.nan,
+                        'min': stats.at[i, (feature, 'min')] if i in stats.index else np.nan,
+                        'max': stats.at[i, (feature, 'max')] if i in stats.index else np.nan
                     }
-                
+                    for feature in features
+                }
                 segment_profiles[f'segmento_{i}'] = {
-                    'tamanho': len(segment_df),
-                    'percentual': len(segment_df) / len(result_df) * 100,
+                    'tamanho': size,
+                    'percentual': size / len(result_df) * 100,
                     'perfil': profile
                 }
             
@@ -480,21 +1678,117 @@ class PredictiveAnalysis:
             segment_names = self._assign_segment_names(segment_profiles, features)
             
             # Mapear números para nomes
-            segment_map = {i: name for i, name in enumerate(segment_names)}
+            segment_map = {i: segment_names[f'segmento_{i}'] for i in range(n_clusters)}
             result_df['segmento_nome'] = result_df['segmento'].map(segment_map)
             
             self.logger.info(f"Segmentação de clientes concluída: {n_clusters} segmentos identificados")
-            return result_df
+            return {
+                'segmento': result_df['segmento'].to_numpy(),
+                'segmento_nome': pd.Categorical(result_df['segmento_nome']),
+                'segmentacao': {
+                    'metodo': method,
+                    'n_clusters': n_clusters,
+                    'silhouette': silhouettes,
+                    'perfis': segment_profiles
+                }
+            }
             
         except ImportError:
             self.logger.error("Pacote sklearn não instalado, necessário para segmentação de clientes")
-            return df
+            return None
         except Exception as e:
             self.logger.error(f"Erro na segmentação de clientes: {str(e)}")
-            return df
+            return None
+    
+    def rfm_segmentation(self, transactions: Union[str, pd.DataFrame],
+                         customer_column: str = 'cliente_id', date_column: str = 'data',
+                         value_column: str = 'valor', transaction_column: Optional[str] = None,
+                         reference_date: Optional[Union[str, datetime]] = None,
+                         tenant_id: Optional[str] = None, incremental: bool = False,
+                         n_clusters: Union[int, str] = 4, **kwargs) -> pd.DataFrame:
+        """
+        Calcula RFM a partir de transações e segmenta os clientes.
+        
+        Com tenant_id e incremental=True, o estado RFM salvo do tenant é
+        atualizado apenas com as transações informadas.
+        
+        Args:
+            transactions: DataFrame de transações, caminho Parquet ou tabela DuckDB
+            customer_column: Coluna de identificação do cliente
+            date_column: Coluna de data da transação
+            value_column: Coluna de valor da transação
+            transaction_column: Coluna de ID da transação (opcional)
+            reference_date: Data de referência da recência
+            tenant_id: ID do tenant para persistir o estado RFM
+            incremental: Se True, atualiza o estado salvo do tenant com as novas transações
+            n_clusters: Número de segmentos ou 'auto'
+            **kwargs: Parâmetros adicionais de customer_segmentation
+            
+        Returns:
+            DataFrame por cliente com recencia, frequencia, valor, scores RFM e segmento
+        """
+        try:
+            from .rfm import RFMBuilder
+            
+            builder = RFMBuilder(customer_column, date_column, value_column, transaction_column)
+            if incremental and tenant_id and builder.load_state(tenant_id):
+                builder.update(transactions)
+            else:
+                builder.fit(transactions)
+            if tenant_id:
+                builder.save(tenant_id)
+                
+            rfm = builder.scores(reference_date).reset_index()
+            return self.customer_segmentation(rfm, ['recencia', 'frequencia', 'valor'],
+                                              n_clusters=n_clusters, tenant_id=tenant_id, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Erro na segmentação RFM: {str(e)}")
+            return pd.DataFrame()
+    
+    def _select_n_clusters(self, df: pd.DataFrame, features: List[str], fill_values: pd.Series,
+                           scaler, k_range: List[int], sample_size: int,
+                           max_workers: Optional[int] = None) -> Tuple[int, Dict[int, float]]:
+        """
+        Escolhe o número de segmentos pelo maior silhouette em uma amostra.
+        
+        Cada valor de k é ajustado e avaliado na mesma amostra, em paralelo.
+        
+        Args:
+            df: DataFrame com dados dos clientes
+            features: Lista de features para segmentação
+            fill_values: Valores para preencher faltantes
+            scaler: StandardScaler já ajustado
+            k_range: Valores de k avaliados
+            sample_size: Tamanho da amostra
+            max_workers: Threads usadas na avaliação
+            
+        Returns:
+            Tuple com o k escolhido e o silhouette de cada k
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.metrics import silhouette_score
+        
+        sample = df[features].sample(n=min(sample_size, len(df)), random_state=42).fillna(fill_values)
+        X_sample = scaler.transform(sample.to_numpy(dtype=float))
+        candidates = [k for k in k_range if 2 <= k < len(X_sample)]
+        
+        def evaluate(k: int) -> float:
+            labels = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3,
+                                     batch_size=min(4096, len(X_sample))).fit_predict(X_sample)
+            if len(np.unique(labels)) < 2:
+                return -1.0
+            return float(silhouette_score(X_sample, labels, random_state=42))
+            
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+            scores = dict(zip(candidates, executor.map(evaluate, candidates)))
+            
+        best_k = max(scores, key=scores.get)
+        self.logger.info(f"Número de segmentos escolhido por silhouette: {best_k} "
+                         f"({scores[best_k]:.3f})")
+        return best_k, scores
     
     def _assign_segment_names(self, segment_profiles: Dict[str, Dict], 
-                             features: List[str]) -> List[str]:
+                             features: List[str]) -> Dict[str, str]:
         """
         Atribui nomes descritivos aos segmentos com base nos perfis.
         
@@ -503,12 +1797,13 @@ class PredictiveAnalysis:
             features: Lista de features utilizadas
             
         Returns:
-            Lista de nomes descritivos para os segmentos
+            Dicionário com o nome descritivo de cada segmento (mesmas chaves
+            de segment_profiles)
         """
         # Esta é uma implementação simplificada
         # Em um caso real, a lógica seria mais complexa e adaptada ao domínio
         
-        names = []
+        names = {}
         segments = list(segment_profiles.keys())
         
         # Ordenar segmentos por tamanho (do maior para o menor)
@@ -526,15 +1821,263 @@ class PredictiveAnalysis:
                 valor = profile['valor']['media']
                 
                 if frequencia > 10 and valor > 1000:
-                    names.append("Clientes VIP")
+                    names[segment] = "Clientes VIP"
                 elif frequencia > 5 and valor > 500:
-                    names.append("Clientes Regulares")
+                    names[segment] = "Clientes Regulares"
                 elif recencia < 30:  # menos de 30 dias
-                    names.append("Clientes Recentes")
+                    names[segment] = "Clientes Recentes"
                 else:
-                    names.append("Clientes Ocasionais")
+                    names[segment] = "Clientes Ocasionais"
             else:
                 # Nomes genéricos se não for RFM
-                names.append(f"Segmento {i+1}")
+                names[segment] = f"Segmento {i+1}"
         
         return names
+
+
+def _safe_ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Divisão elemento a elemento com 0 onde o denominador é zero ou indefinido"""
+    valid = denominator.notna() & (denominator > 0)
+    return (numerator / denominator.where(valid)).where(valid, 0.0)
+
+
+def _score_frame(model, scaler, fill_values: Optional[Dict[str, float]], 
+                 df: pd.DataFrame, feature_columns: List[str]) -> np.ndarray:
+    """Prepara as features de um lote e retorna as previsões do modelo"""
+    X = df[feature_columns]
+    if X.isnull().values.any():
+        # Médias de treino; modelos antigos sem elas usam a média do lote
+        X = X.fillna(fill_values if fill_values is not None else X.mean())
+        
+    # Normalizar features (modelos de árvore não usam scaler)
+    X_values = X.to_numpy(dtype=float)
+    if scaler is not None:
+        X_values = scaler.transform(X_values)
+    return model.predict(X_values)
+
+
+def _iter_chunks(source: Union[str, Iterable[pd.DataFrame]], columns: List[str], 
+                 chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Lê a fonte em lotes: arquivo Parquet (por row groups), CSV ou iterável de DataFrames"""
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith('.csv'):
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+            return
+            
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+        
+    yield from source
+
+
+# Estimadores disponíveis: (fábrica, precisa de StandardScaler)
+MODEL_BACKENDS = {
+    'random_forest': (lambda n_jobs, params: RandomForestRegressor(
+        **{'n_estimators': 100, 'random_state': 42, 'n_jobs': n_jobs, **params}), False),
+    'extra_trees': (lambda n_jobs, params: ExtraTreesRegressor(
+        **{'n_estimators': 100, 'random_state': 42, 'n_jobs': n_jobs, **params}), False),
+    'hist_gradient_boosting': (lambda n_jobs, params: HistGradientBoostingRegressor(
+        **{'random_state': 42, **params}), False),
+    'ridge': (lambda n_jobs, params: Ridge(**params), True)
+}
+
+
+def _interpolate_panel(values: np.ndarray, series_of: np.ndarray) -> np.ndarray:
+    """
+    Interpola linearmente os valores faltantes de cada série do painel.
+    
+    Equivale a Series.interpolate(method='linear') por série: lacunas
+    internas são interpoladas, o final é preenchido com o último valor e o
+    início sem valor anterior permanece NaN.
+    """
+    known = ~np.isnan(values)
+    if known.all() or not known.any():
+        return values
+    index = np.arange(len(values))
+    previous = np.maximum.accumulate(np.where(known, index, -1))
+    following = np.minimum.accumulate(np.where(known, index, len(values))[::-1])[::-1]
+    
+    has_previous = previous >= 0
+    has_previous[has_previous] &= series_of[previous[has_previous]] == series_of[has_previous]
+    has_following = following < len(values)
+    has_following[has_following] &= series_of[following[has_following]] == series_of[has_following]
+    
+    interpolated = np.interp(index, index[known], values[known])
+    result = np.where(has_previous & has_following, interpolated, np.nan)
+    result = np.where(has_previous & ~has_following, values[np.maximum(previous, 0)], result)
+    return np.where(known, values, result)
+
+
+def _decompose_chunk(chunk: List[Tuple[int, np.ndarray]], 
+                     period: int) -> List[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    Decompõe as séries de um lote (executado nos processos do pool).
+    
+    Args:
+        chunk: Lista de (posição da série, valores regularizados)
+        period: Período sazonal
+        
+    Returns:
+        Lista de (posição da série, componentes trend/seasonal/resid); séries
+        com falha são omitidas
+    """
+    decomposed = []
+    for i, values in chunk:
+        try:
+            result = seasonal_decompose(values, model='additive', period=period)
+            decomposed.append((i, {'trend': result.trend, 'seasonal': result.seasonal,
+                                   'resid': result.resid}))
+        except Exception:
+            continue
+    return decomposed
+
+
+def _statistical_forecast(model_type: str, values: np.ndarray, steps: int,
+                          seasonal_period: int) -> np.ndarray:
+    """
+    Ajusta um modelo estatístico rápido e prevê os próximos passos.
+    
+    A componente sazonal só é usada com pelo menos dois ciclos completos;
+    em séries mais curtas os modelos recaem na versão sem sazonalidade.
+    
+    Args:
+        model_type: 'ets' (Holt-Winters amortecido), 'seasonal_naive' ou 'theta'
+        values: Valores da série
+        steps: Passos a prever
+        seasonal_period: Período sazonal (0 sem sazonalidade)
+        
+    Returns:
+        Array com a previsão
+    """
+    seasonal = seasonal_period >= 2 and len(values) >= 2 * seasonal_period
+    
+    if model_type == 'seasonal_naive':
+        # Repete o último ciclo (ou o último valor, sem ciclo completo)
+        season = seasonal_period if seasonal_period >= 2 and len(values) >= seasonal_period else 1
+        return np.resize(values[-season:], steps).astype(float)
+        
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if model_type == 'ets':
+            trend = 'add' if len(values) >= 4 else None
+            model = ExponentialSmoothing(values, trend=trend, damped_trend=trend is not None,
+                                         seasonal='add' if seasonal else None,
+                                         seasonal_periods=seasonal_period if seasonal else None,
+                                         initialization_method='estimated')
+            return np.asarray(model.fit().forecast(steps), dtype=float)
+            
+        if model_type == 'theta':
+            model = ThetaModel(values, period=seasonal_period if seasonal else 1,
+                               deseasonalize=seasonal)
+            return np.asarray(model.fit().forecast(steps), dtype=float)
+            
+    raise ValueError(f"Tipo de modelo não suportado: {model_type}")
+
+
+def _build_estimator(model_type: str, n_jobs: Optional[int], 
+                     params: Optional[Dict[str, Any]] = None) -> Tuple[Any, bool]:
+    """Cria o estimador de um tipo de modelo e indica se ele precisa de normalização"""
+    factory, needs_scaling = MODEL_BACKENDS[model_type]
+    return factory(n_jobs, params or {}), needs_scaling
+
+
+class _limit_threads:
+    """
+    Limita as threads OpenMP/BLAS ao valor de n_jobs.
+    
+    HistGradientBoosting não recebe n_jobs e usa todas as threads OpenMP;
+    o limite é aplicado via threadpoolctl quando disponível.
+    """
+    
+    def __init__(self, n_jobs: Optional[int]):
+        self.n_jobs = n_jobs
+        self._limits = None
+        
+    def __enter__(self):
+        if self.n_jobs is not None and self.n_jobs > 0:
+            try:
+                from threadpoolctl import threadpool_limits
+                self._limits = threadpool_limits(self.n_jobs)
+            except ImportError:
+                pass
+        return self
+        
+    def __exit__(self, *exc):
+        if self._limits is not None:
+            self._limits.restore_original_limits()
+        return False
+
+
+def _init_forecast_worker():
+    """Inicializa processos do pool: uma thread BLAS por processo e sem avisos do statsmodels"""
+    warnings.filterwarnings('ignore')
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+_worker_analysis: Optional[PredictiveAnalysis] = None
+
+
+def _forecast_worker(order_selector: ArimaOrderSelector) -> PredictiveAnalysis:
+    """
+    Instância de ajuste reutilizada pelos lotes do processo.
+    
+    Criada uma única vez por processo, sem registro de modelos nem cache de
+    resultados; apenas o seletor de ordens enviado com o lote é trocado.
+    """
+    global _worker_analysis
+    if _worker_analysis is None:
+        _worker_analysis = PredictiveAnalysis(order_selector=order_selector)
+        if multiprocessing.parent_process() is not None:
+            # Nos processos do pool, registrar apenas avisos e erros
+            _worker_analysis.logger.setLevel(logging.WARNING)
+    _worker_analysis.order_selector = order_selector
+    return _worker_analysis
+
+
+def _forecast_series_chunk(chunk: List[Tuple[Tuple, np.ndarray, np.ndarray]], 
+                           options: Dict[str, Any]) -> Tuple[List, List, List]:
+    """
+    Ajusta as séries de um lote (executado nos processos do pool).
+    
+    Args:
+        chunk: Lista de (chave da série, datas, valores)
+        options: Parâmetros de previsão
+        
+    Returns:
+        Tuple com listas de (chave, previsão), (chave, métricas) e (chave, erro)
+    """
+    analysis = _forecast_worker(options['order_selector'])
+    forecasts, metrics, failures = [], [], []
+    
+    for key, dates, values in chunk:
+        try:
+            if len(values) < options['min_observations']:
+                raise ValueError(f"Série com {len(values)} observações (mínimo {options['min_observations']})")
+            ts = analysis._prepare_series(pd.DataFrame({'data': dates, 'valor': values}), 'data', 'valor')
+            series_key = '/'.join([options['value_column']] + [str(k) for k in key])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                # Os lotes já rodam em paralelo; os candidatos de 'auto' são avaliados em sequência
+                result_df, series_metrics = analysis._run_forecast(
+                    ts, options['periods'], options['frequency'], options['model_type'],
+                    options['evaluation'], order=options['order'],
+                    seasonal_order=options['seasonal_order'], series_key=series_key,
+                    candidates=options['candidates'], max_workers=1, tenant_id=options['tenant_id']
+                )
+                
+            forecasts.append((key, result_df))
+            metrics.append((key, [len(ts), series_metrics['mae'], series_metrics['rmse'], series_metrics['mape'],
+                                  series_metrics.get('order'), series_metrics.get('seasonal_order'),
+                                  series_metrics['model_type']]))
+        except Exception as e:
+            failures.append((key, [str(e)]))
+            
+    return forecasts, metrics, failures
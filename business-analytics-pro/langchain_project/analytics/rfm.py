@@ -0,0 +1,297 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .model_registry import validate_path_component
+
+
+class RFMBuilder:
+    """
+    Cálculo de Recência, Frequência e Valor (RFM) por cliente.
+
+    O estado agregado por cliente (primeira e última compra, número de
+    compras e valor total) é calculado em uma única agregação vetorizada e
+    pode ser atualizado incrementalmente com novas transações. A recência e
+    os scores por quantil são derivados do estado na data de referência, em
+    colunas 'recencia', 'frequencia' e 'valor' compatíveis com
+    PredictiveAnalysis.customer_segmentation.
+    """
+
+    def __init__(self, customer_column: str = 'cliente_id', date_column: str = 'data',
+                 value_column: str = 'valor', transaction_column: Optional[str] = None,
+                 n_bins: int = 5, base_dir: Optional[str] = None):
+        """
+        Inicializa o construtor de RFM.
+
+        Args:
+            customer_column: Coluna de identificação do cliente
+            date_column: Coluna de data da transação
+            value_column: Coluna de valor da transação
+            transaction_column: Coluna de ID da transação; se informada, a frequência
+                conta transações distintas, senão conta linhas
+            n_bins: Número de faixas dos scores R, F e M
+            base_dir: Diretório base dos tenants (padrão: data/tenants)
+        """
+        self.customer_column = customer_column
+        self.date_column = date_column
+        self.value_column = value_column
+        self.transaction_column = transaction_column
+        self.n_bins = n_bins
+        self.base_dir = base_dir or os.path.join(os.getcwd(), 'data', 'tenants')
+        self.state: Optional[pd.DataFrame] = None
+        self.logger = self._setup_logger()
+
+    def _setup_logger(self):
+        """Configura o logger para o cálculo de RFM"""
+        logger = logging.getLogger("PredictiveAnalysis")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _columns(self):
+        columns = [self.customer_column, self.date_column, self.value_column]
+        if self.transaction_column:
+            columns.append(self.transaction_column)
+        return columns
+
+    def aggregate(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Agrega transações por cliente em uma única passada.
+
+        Args:
+            transactions: DataFrame com as transações
+
+        Returns:
+            DataFrame indexado por cliente com as colunas de estado
+        """
+        df = transactions[self._columns()]
+        dates = df[self.date_column]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            df = df.assign(**{self.date_column: pd.to_datetime(dates)})
+
+        frequency = ((self.transaction_column, 'nunique') if self.transaction_column
+                     else (self.date_column, 'size'))
+        state = df.groupby(self.customer_column, sort=False, observed=True).agg(
+            primeira_compra=(self.date_column, 'min'),
+            ultima_compra=(self.date_column, 'max'),
+            frequencia=frequency,
+            valor=(self.value_column, 'sum')
+        )
+        state.index.name = self.customer_column
+        return state
+
+    def aggregate_duckdb(self, source: str, connection: Any = None) -> pd.DataFrame:
+        """
+        Agrega transações no DuckDB, sem carregar as linhas no pandas.
+
+        Args:
+            source: Caminho Parquet (aceita glob, ex: 'vendas/*.parquet') ou nome de
+                tabela/view da conexão
+            connection: Conexão DuckDB (padrão: conexão em memória)
+
+        Returns:
+            DataFrame indexado por cliente com as colunas de estado
+
+        Raises:
+            ImportError: Se o duckdb (dependência opcional) não estiver instalado
+        """
+        import duckdb
+
+        def quote(name: str) -> str:
+            return '"' + name.replace('"', '""') + '"'
+
+        if source.endswith('.parquet') or os.path.exists(source):
+            relation = f"read_parquet('{source.replace(chr(39), chr(39) * 2)}')"
+        else:
+            relation = quote(source)
+
+        frequency = (f"COUNT(DISTINCT {quote(self.transaction_column)})" if self.transaction_column
+                     else "COUNT(*)")
+        query = f"""
+            SELECT {quote(self.customer_column)} AS {quote(self.customer_column)},
+                   MIN(CAST({quote(self.date_column)} AS TIMESTAMP)) AS primeira_compra,
+                   MAX(CAST({quote(self.date_column)} AS TIMESTAMP)) AS ultima_compra,
+                   {frequency} AS frequencia,
+                   SUM({quote(self.value_column)}) AS valor
+            FROM {relation}
+            GROUP BY 1
+        """
+        connection = connection or duckdb.connect()
+        return connection.execute(query).df().set_index(self.customer_column)
+
+    def load(self, source: Union[str, pd.DataFrame], connection: Any = None) -> pd.DataFrame:
+        """
+        Agrega uma fonte de transações: DataFrame, Parquet ou tabela DuckDB.
+
+        Fontes em arquivo são agregadas no DuckDB quando disponível; sem
+        DuckDB, apenas as colunas necessárias do Parquet são lidas.
+
+        Args:
+            source: DataFrame, caminho Parquet ou tabela da conexão DuckDB
+            connection: Conexão DuckDB (opcional)
+
+        Returns:
+            DataFrame indexado por cliente com as colunas de estado
+        """
+        if isinstance(source, pd.DataFrame):
+            return self.aggregate(source)
+        try:
+            return self.aggregate_duckdb(source, connection)
+        except ImportError:
+            if connection is not None:
+                raise
+            return self.aggregate(pd.read_parquet(source, columns=self._columns()))
+
+    def fit(self, source: Union[str, pd.DataFrame], connection: Any = None) -> 'RFMBuilder':
+        """
+        Calcula o estado RFM a partir de todo o histórico de transações.
+
+        Args:
+            source: DataFrame, caminho Parquet ou tabela da conexão DuckDB
+            connection: Conexão DuckDB (opcional)
+
+        Returns:
+            O próprio construtor
+        """
+        self.state = self.load(source, connection)
+        self.logger.info(f"RFM calculado para {len(self.state)} clientes")
+        return self
+
+    def update(self, source: Union[str, pd.DataFrame], connection: Any = None) -> 'RFMBuilder':
+        """
+        Incorpora novas transações ao estado sem reprocessar o histórico.
+
+        As novas transações não devem repetir transações já incorporadas:
+        frequência e valor são somados ao estado existente.
+
+        Args:
+            source: Novas transações (DataFrame, Parquet ou tabela DuckDB)
+            connection: Conexão DuckDB (opcional)
+
+        Returns:
+            O próprio construtor
+        """
+        delta = self.load(source, connection)
+        if self.state is None or self.state.empty:
+            self.state = delta
+            return self
+
+        state, aligned = self.state.align(delta, join='outer', axis=0)
+        self.state = pd.DataFrame({
+            'primeira_compra': state['primeira_compra'].where(
+                state['primeira_compra'] <= aligned['primeira_compra'], aligned['primeira_compra']
+            ).fillna(state['primeira_compra']),
+            'ultima_compra': state['ultima_compra'].where(
+                state['ultima_compra'] >= aligned['ultima_compra'], aligned['ultima_compra']
+            ).fillna(state['ultima_compra']),
+            'frequencia': state['frequencia'].fillna(0).add(aligned['frequencia'].fillna(0)).astype('int64'),
+            'valor': state['valor'].fillna(0).add(aligned['valor'].fillna(0))
+        })
+        self.logger.info(f"RFM atualizado: {len(delta)} clientes com novas transações, "
+                         f"{len(self.state)} no total")
+        return self
+
+    def _score(self, values: pd.Series, ascending: bool) -> pd.Series:
+        """Score de 1 a n_bins pelo percentil; valores empatados recebem o mesmo score"""
+        percentile = values.rank(method='average', ascending=ascending, pct=True)
+        return np.ceil(percentile * self.n_bins).clip(1, self.n_bins).astype('int8')
+
+    def scores(self, reference_date: Optional[Union[str, datetime]] = None) -> pd.DataFrame:
+        """
+        Calcula recência e scores RFM na data de referência.
+
+        Args:
+            reference_date: Data de referência (padrão: dia seguinte à última compra)
+
+        Returns:
+            DataFrame com recencia (dias), frequencia, valor, r_score, f_score,
+            m_score, rfm_score (ex: '545') e rfm_total
+        """
+        if self.state is None:
+            raise ValueError("RFM não calculado; chame fit antes de scores")
+
+        state = self.state
+        if reference_date is None:
+            reference_date = state['ultima_compra'].max() + pd.Timedelta(days=1)
+        reference_date = pd.Timestamp(reference_date)
+
+        result = pd.DataFrame({
+            'recencia': (reference_date - state['ultima_compra']).dt.days.astype('int32'),
+            'frequencia': state['frequencia'].astype('int64'),
+            'valor': state['valor'].astype(float)
+        }, index=state.index)
+        if result.empty:
+            return result
+
+        # Recência menor é melhor, por isso o ranking é decrescente
+        result['r_score'] = self._score(result['recencia'], ascending=False)
+        result['f_score'] = self._score(result['frequencia'], ascending=True)
+        result['m_score'] = self._score(result['valor'], ascending=True)
+        result['rfm_score'] = (result['r_score'].astype(str) + result['f_score'].astype(str)
+                               + result['m_score'].astype(str))
+        result['rfm_total'] = (result['r_score'].astype('int16') + result['f_score']
+                               + result['m_score'])
+        return result
+
+    def _state_path(self, tenant_id: str) -> str:
+        return os.path.join(self.base_dir, validate_path_component(tenant_id, 'tenant_id'),
+                            'models', 'rfm_state.pkl')
+
+    def save(self, tenant_id: str) -> bool:
+        """
+        Persiste o estado agregado do tenant, para atualizações incrementais futuras.
+
+        Args:
+            tenant_id: ID do tenant
+
+        Returns:
+            True se salvo com sucesso
+        """
+        try:
+            path = self._state_path(tenant_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            self.state.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar estado RFM de {tenant_id}: {str(e)}")
+            return False
+
+    def load_state(self, tenant_id: str) -> bool:
+        """
+        Carrega o estado agregado salvo do tenant.
+
+        Args:
+            tenant_id: ID do tenant
+
+        Returns:
+            True se carregado com sucesso
+        """
+        try:
+            path = self._state_path(tenant_id)
+            if not os.path.exists(path):
+                return False
+            self.state = pd.read_pickle(path)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar estado RFM de {tenant_id}: {str(e)}")
+            return False
+
+    def summary(self, scores: pd.DataFrame) -> Dict[str, Any]:
+        """Resumo das métricas RFM por score R, F e M"""
+        return {
+            'clientes': len(scores),
+            'recencia_media': float(scores['recencia'].mean()),
+            'frequencia_media': float(scores['frequencia'].mean()),
+            'valor_medio': float(scores['valor'].mean()),
+            'distribuicao_rfm': scores['rfm_total'].value_counts().sort_index().to_dict()
+        }
@@ -1,3 +1,4 @@
 from .integration_manager import IntegrationManager
+from .rate_limiter import AdaptiveRateLimiter, CircuitBreaker, CircuitOpenError, RateLimitExceeded
 
-__all__ = ['IntegrationManager']
+__all__ = ['IntegrationManager', 'AdaptiveRateLimiter', 'CircuitBreaker', 'CircuitOpenError', 'RateLimitExceeded']
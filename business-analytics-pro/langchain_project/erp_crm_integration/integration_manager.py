@@ -4,17 +4,34 @@ import logging
 from typing import Dict, Any, Optional, List, Union
 import json
 import os
+import time
 from datetime import datetime, timedelta
 
+from .schema import normalize_frame, get_schema
+from .rate_limiter import (
+    AdaptiveRateLimiter, CircuitBreaker, CircuitOpenError, RateLimitExceeded,
+    DEFAULT_RATE_LIMITS, parse_retry_after
+)
+
 class IntegrationManager:
     """
     Gerenciador de integrações com sistemas ERP e CRM populares.
     """
     
-    def __init__(self):
+    def __init__(self, tenant_id: Optional[str] = None, fallback_cache: bool = False):
+        """
+        Args:
+            tenant_id: Tenant padrão das consultas (isola o cache de fallback)
+            fallback_cache: Se True, guarda cada busca bem-sucedida em cache para
+                servir dados (marcados como desatualizados) quando a fonte falhar
+        """
         self.logger = self._setup_logger()
         self.integrations = {}
         self.credentials = {}
+        self.rate_limiters = {}
+        self.circuit_breakers = {}
+        self.tenant_id = tenant_id
+        self.fallback_cache = fallback_cache
         
     def _setup_logger(self):
         """Configura o logger para o gerenciador de integrações"""
@@ -27,6 +44,175 @@ class IntegrationManager:
             logger.addHandler(handler)
         return logger
         
+    def configure_rate_limit(self, system: str, rate: float, capacity: float,
+                             failure_threshold: int = 5, recovery_timeout: float = 60.0,
+                             max_wait: float = 30.0):
+        """
+        Configura limitador de taxa e circuit breaker de uma integração.
+        
+        Args:
+            system: Nome do sistema ('salesforce', 'sap', 'totvs')
+            rate: Requisições por segundo permitidas
+            capacity: Tamanho máximo da rajada
+            failure_threshold: Falhas consecutivas para abrir o circuito
+            recovery_timeout: Segundos até uma nova tentativa com o circuito aberto
+            max_wait: Tempo máximo de espera por requisição antes de desistir
+        """
+        self.rate_limiters[system] = AdaptiveRateLimiter(rate, capacity, max_wait=max_wait)
+        self.circuit_breakers[system] = CircuitBreaker(failure_threshold, recovery_timeout)
+        
+    def _get_rate_limiter(self, system: str) -> AdaptiveRateLimiter:
+        """Obtém (ou cria com valores padrão) o limitador de uma integração"""
+        if system not in self.rate_limiters:
+            limits = DEFAULT_RATE_LIMITS.get(system, {'rate': 5.0, 'capacity': 10})
+            self.configure_rate_limit(system, limits['rate'], limits['capacity'])
+        return self.rate_limiters[system]
+        
+    def _get_circuit_breaker(self, system: str) -> CircuitBreaker:
+        """Obtém (ou cria com valores padrão) o circuit breaker de uma integração"""
+        self._get_rate_limiter(system)
+        return self.circuit_breakers[system]
+        
+    def _request(self, system: str, method: str, url: str, 
+                 session: Optional[requests.Session] = None, 
+                 max_retries: int = 2, backoff_seconds: float = 1.0, **kwargs) -> requests.Response:
+        """
+        Executa requisição HTTP respeitando o limitador e o circuit breaker.
+        
+        Respostas 429/503 reduzem a taxa do limitador e são repetidas até
+        max_retries vezes, respeitando o cabeçalho Retry-After ou, sem ele,
+        com espera exponencial. Respostas 429 indicam apenas limitação e não
+        contam como falha do circuito. Toda chamada liberada pelo circuito
+        termina registrando sucesso, falha ou devolvendo a chamada de teste.
+        
+        Args:
+            system: Nome do sistema de destino
+            method: Método HTTP
+            url: URL da requisição
+            session: Sessão requests opcional (ex: SAP)
+            max_retries: Número máximo de novas tentativas após 429/503
+            backoff_seconds: Espera inicial entre tentativas sem Retry-After
+            **kwargs: Argumentos repassados para requests
+            
+        Returns:
+            Resposta HTTP bem-sucedida
+            
+        Raises:
+            CircuitOpenError: Se o circuito da integração estiver aberto
+            RateLimitExceeded: Se a espera pelo limitador exceder o máximo
+        """
+        limiter = self._get_rate_limiter(system)
+        breaker = self._get_circuit_breaker(system)
+        client = session or requests
+        
+        for attempt in range(max_retries + 1):
+            if not breaker.allow_request():
+                limiter.metrics.short_circuited += 1
+                raise CircuitOpenError(f"Circuito aberto para {system}")
+                
+            outcome = None
+            try:
+                limiter.acquire()
+                
+                start = time.monotonic()
+                try:
+                    response = client.request(method, url, **kwargs)
+                except requests.RequestException:
+                    outcome = 'failure'
+                    raise
+                finally:
+                    limiter.record_work(time.monotonic() - start)
+                    
+                if response.status_code >= 500:
+                    outcome = 'failure'
+                elif response.status_code != 429:
+                    outcome = 'success'
+                limiter.update_from_response(response.status_code, response.headers)
+            finally:
+                if outcome == 'failure':
+                    breaker.record_failure()
+                elif outcome == 'success':
+                    breaker.record_success()
+                else:
+                    # 429 ou desistência antes da resposta: devolver a chamada de teste
+                    breaker.release()
+                    
+            if response.status_code in (429, 503) and attempt < max_retries:
+                if parse_retry_after(response.headers.get('Retry-After')) is None:
+                    limiter.pause(backoff_seconds * 2 ** attempt)
+                self.logger.warning(f"{system} limitou requisições (HTTP {response.status_code}), aguardando")
+                continue
+                
+            response.raise_for_status()
+            return response
+            
+        response.raise_for_status()
+        return response
+        
+    def get_throttling_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna métricas de limitação por integração.
+        
+        Returns:
+            Dicionário com tempo limitado versus trabalhando, taxa atual e
+            estado do circuito de cada integração
+        """
+        metrics = {}
+        for system, limiter in self.rate_limiters.items():
+            system_metrics = limiter.metrics.to_dict()
+            system_metrics['current_rate'] = limiter.rate
+            system_metrics['api_usage'] = limiter.api_usage
+            system_metrics['circuit_state'] = self.circuit_breakers[system].state
+            metrics[system] = system_metrics
+        return metrics
+        
+    def _fallback_cache_id(self, tenant_id: Optional[str], source: str, dataset: str,
+                           start_date: str, end_date: str) -> str:
+        """Identificador do cache de fallback, isolado por tenant"""
+        tenant = tenant_id or self.tenant_id or 'default'
+        return f"{tenant}_{source}_{dataset}_{start_date}_{end_date}"
+        
+    def _fetch_with_fallback(self, source: str, data_id: str, fetch) -> Optional[pd.DataFrame]:
+        """
+        Executa uma busca protegida pelo circuit breaker com fallback para o cache.
+        
+        Com o fallback habilitado, cada busca bem-sucedida é guardada em cache e,
+        com o circuito aberto ou se a busca falhar, os últimos dados em cache são
+        retornados mesmo que expirados, com df.attrs['stale'] = True.
+        
+        Args:
+            source: Sistema de origem
+            data_id: Identificador dos dados no cache
+            fetch: Função sem argumentos que obtém os dados do sistema
+            
+        Returns:
+            DataFrame obtido do sistema ou do cache, ou None
+        """
+        if self._get_circuit_breaker(source).is_open():
+            self.logger.warning(f"Circuito aberto para {source}, usando dados em cache: {data_id}")
+            return self._load_stale(data_id)
+            
+        df = fetch()
+        
+        if df is None:
+            self.logger.warning(f"Falha ao obter dados de {source}, tentando cache: {data_id}")
+            return self._load_stale(data_id)
+            
+        df.attrs['stale'] = False
+        if self.fallback_cache and not df.empty:
+            self.save_to_cache(data_id, df)
+        return df
+        
+    def _load_stale(self, data_id: str) -> Optional[pd.DataFrame]:
+        """Carrega o cache de fallback marcando os dados como desatualizados"""
+        if not self.fallback_cache:
+            return None
+            
+        df = self.load_from_cache(data_id, allow_expired=True)
+        if df is not None:
+            df.attrs['stale'] = True
+        return df
+        
     def load_credentials(self, credentials_path: str) -> bool:
         """
         Carrega credenciais de autenticação de sistemas externos.
@@ -47,7 +233,8 @@ class IntegrationManager:
             return False
             
     def configure_salesforce(self, client_id: str, client_secret: str, 
-                           username: str, password: str, security_token: str) -> bool:
+                           username: str, password: str, security_token: str,
+                           login_url: str = "https://login.salesforce.com") -> bool:
         """
         Configura integração com Salesforce.
         
@@ -57,13 +244,14 @@ class IntegrationManager:
             username: Nome de usuário Salesforce
             password: Senha Salesforce
             security_token: Token de segurança
+            login_url: URL do servidor de autenticação (ex: sandbox ou simulador)
             
         Returns:
             bool: True se configurado com sucesso, False caso contrário
         """
         try:
             # Autenticação com Salesforce
-            auth_url = "https://login.salesforce.com/services/oauth2/token"
+            auth_url = f"{login_url.rstrip('/')}/services/oauth2/token"
             payload = {
                 'grant_type': 'password',
                 'client_id': client_id,
@@ -72,8 +260,7 @@ class IntegrationManager:
                 'password': password + security_token
             }
             
-            response = requests.post(auth_url, data=payload)
-            response.raise_for_status()
+            response = self._request('salesforce', 'POST', auth_url, data=payload)
             
             auth_data = response.json()
             
@@ -90,7 +277,8 @@ class IntegrationManager:
                 'client_secret': client_secret,
                 'username': username,
                 'password': '********',  # Não armazenar senha em texto plano
-                'security_token': '********'  # Não armazenar token em texto plano
+                'security_token': '********',  # Não armazenar token em texto plano
+                'login_url': login_url
             }
             
             self.logger.info("Integração com Salesforce configurada com sucesso")
@@ -124,8 +312,8 @@ class IntegrationManager:
                 'sap-client': client
             })
             
-            response = session.get(f"{base_url.rstrip('/')}/csrf-token", headers=headers)
-            response.raise_for_status()
+            response = self._request('sap', 'GET', f"{base_url.rstrip('/')}/csrf-token", 
+                                     session=session, headers=headers)
             
             csrf_token = response.headers.get('x-csrf-token')
             
@@ -177,8 +365,7 @@ class IntegrationManager:
                 'password': password
             }
             
-            response = requests.post(auth_url, headers=headers, json=payload)
-            response.raise_for_status()
+            response = self._request('totvs', 'POST', auth_url, headers=headers, json=payload)
             
             auth_data = response.json()
             
@@ -206,8 +393,28 @@ class IntegrationManager:
             self.logger.error(f"Erro ao configurar TOTVS: {str(e)}")
             return False
             
+    def _get_salesforce_integration(self) -> Dict[str, Any]:
+        """Retorna a integração Salesforce, renovando o token se expirado"""
+        integration = self.integrations['salesforce']
+        
+        # Verificar se o token expirou
+        if datetime.now() >= integration['expires_at']:
+            self.logger.info("Token do Salesforce expirado, renovando...")
+            salesforce_creds = self.credentials['salesforce']
+            self.configure_salesforce(
+                salesforce_creds['client_id'],
+                salesforce_creds['client_secret'],
+                salesforce_creds['username'],
+                '********',  # Senha não está armazenada em texto plano
+                '********',  # Token não está armazenado em texto plano
+                salesforce_creds.get('login_url', "https://login.salesforce.com")
+            )
+            integration = self.integrations['salesforce']
+            
+        return integration
+        
     def get_salesforce_data(self, object_name: str, fields: List[str] = None, 
-                           filters: str = None, limit: int = 100) -> Optional[pd.DataFrame]:
+                           filters: str = None, limit: Optional[int] = 100) -> Optional[pd.DataFrame]:
         """
         Obtém dados do Salesforce.
         
@@ -215,7 +422,7 @@ class IntegrationManager:
             object_name: Nome do objeto (Lead, Account, etc)
             fields: Lista de campos a serem retornados
             filters: Condições de filtro (WHERE)
-            limit: Limite de registros
+            limit: Limite de registros (None para todos)
             
         Returns:
             DataFrame com os dados ou None em caso de erro
@@ -225,20 +432,7 @@ class IntegrationManager:
             return None
             
         try:
-            integration = self.integrations['salesforce']
-            
-            # Verificar se o token expirou
-            if datetime.now() >= integration['expires_at']:
-                self.logger.info("Token do Salesforce expirado, renovando...")
-                salesforce_creds = self.credentials['salesforce']
-                self.configure_salesforce(
-                    salesforce_creds['client_id'],
-                    salesforce_creds['client_secret'],
-                    salesforce_creds['username'],
-                    '********',  # Senha não está armazenada em texto plano
-                    '********'   # Token não está armazenado em texto plano
-                )
-                integration = self.integrations['salesforce']
+            integration = self._get_salesforce_integration()
             
             # Construir consulta SOQL
             fields_str = ", ".join(fields) if fields else "Id, Name, CreatedDate"
@@ -247,7 +441,8 @@ class IntegrationManager:
             if filters:
                 query += f" WHERE {filters}"
                 
-            query += f" LIMIT {limit}"
+            if limit:
+                query += f" LIMIT {limit}"
             
             # Codificar a consulta para URL
             import urllib.parse
@@ -260,13 +455,21 @@ class IntegrationManager:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
+            response = self._request('salesforce', 'GET', url, headers=headers)
             
             data = response.json()
             
             if 'records' in data:
-                df = pd.DataFrame(data['records'])
+                # Seguir a paginação (nextRecordsUrl) até o fim do resultado
+                records = list(data['records'])
+                while not data.get('done', True) and data.get('nextRecordsUrl'):
+                    response = self._request('salesforce', 'GET', 
+                                             f"{integration['instance_url']}{data['nextRecordsUrl']}", 
+                                             headers=headers)
+                    data = response.json()
+                    records.extend(data.get('records', []))
+                    
+                df = pd.DataFrame(records)
                 if 'attributes' in df.columns:
                     df = df.drop('attributes', axis=1)
                 self.logger.info(f"Dados obtidos do Salesforce: {len(df)} registros de {object_name}")
@@ -279,15 +482,168 @@ class IntegrationManager:
             self.logger.error(f"Erro ao obter dados do Salesforce: {str(e)}")
             return None
             
+    def get_salesforce_deleted(self, object_name: str, start: datetime, 
+                               end: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Obtém registros excluídos no Salesforce em um intervalo (getDeleted).
+        
+        Args:
+            object_name: Nome do objeto (Lead, Account, etc)
+            start: Início do intervalo (UTC)
+            end: Fim do intervalo (UTC)
+            
+        Returns:
+            Resposta com 'deletedRecords', 'earliestDateAvailable' e
+            'latestDateCovered', ou None em caso de erro
+        """
+        if 'salesforce' not in self.integrations:
+            self.logger.error("Integração com Salesforce não configurada")
+            return None
+            
+        try:
+            integration = self._get_salesforce_integration()
+            url = f"{integration['instance_url']}/services/data/v52.0/sobjects/{object_name}/deleted/"
+            headers = {
+                'Authorization': f"{integration['token_type']} {integration['access_token']}",
+                'Content-Type': 'application/json'
+            }
+            params = {
+                'start': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'end': end.strftime('%Y-%m-%dT%H:%M:%SZ')
+            }
+            
+            response = self._request('salesforce', 'GET', url, headers=headers, params=params)
+            return response.json()
+        except Exception as e:
+            self.logger.error(f"Erro ao obter registros excluídos do Salesforce: {str(e)}")
+            return None
+            
+    @staticmethod
+    def _watermark_path(snapshot_id: str) -> str:
+        """Arquivo da marca d'água, ao lado do snapshot em cache"""
+        return os.path.join(os.getcwd(), 'cache', f"{snapshot_id}.watermark.json")
+        
+    def _load_watermark(self, snapshot_id: str) -> Dict[str, Any]:
+        """Carrega a marca d'água de sincronização de um snapshot do Salesforce"""
+        path = self._watermark_path(snapshot_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+            
+    def _save_watermark(self, snapshot_id: str, state: Dict[str, Any]):
+        """Persiste a marca d'água de sincronização de um snapshot do Salesforce"""
+        path = self._watermark_path(snapshot_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(f"{path}.tmp", path)
+        
+    @staticmethod
+    def _to_utc_naive(value: Any) -> pd.Timestamp:
+        """Converte um instante (com ou sem fuso) para Timestamp UTC sem fuso"""
+        timestamp = pd.Timestamp(value)
+        return timestamp.tz_convert(None) if timestamp.tzinfo else timestamp
+        
+    def sync_salesforce_object(self, object_name: str, fields: List[str], 
+                               snapshot_id: Optional[str] = None,
+                               full_refresh: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Sincroniza incrementalmente um objeto do Salesforce com um snapshot local.
+        
+        Mantém uma marca d'água de SystemModstamp por snapshot, gravada ao lado
+        dele no cache: cada execução consulta apenas registros alterados desde
+        a marca, obtém as exclusões via getDeleted e aplica ambos ao snapshot.
+        Uma carga completa é feita na primeira execução, quando o snapshot não
+        existe, quando o objeto ou os campos mudaram ou quando a marca d'água
+        de exclusões é anterior à janela retida pelo Salesforce. Use um
+        snapshot_id distinto por tenant.
+        
+        Args:
+            object_name: Nome do objeto (ex: Opportunity)
+            fields: Campos a manter no snapshot (Id é sempre incluído)
+            snapshot_id: Identificador do snapshot no cache (padrão: sf_<objeto>)
+            full_refresh: Força uma carga completa
+            
+        Returns:
+            DataFrame com o snapshot atualizado ou None em caso de erro
+        """
+        snapshot_id = snapshot_id or f"sf_{object_name}"
+        query_fields = list(dict.fromkeys(['Id', *fields, 'SystemModstamp']))
+        
+        try:
+            state = {} if full_refresh else self._load_watermark(snapshot_id)
+            if state.get('object_name') != object_name or state.get('fields') != query_fields:
+                state = {}
+            snapshot = None if not state else self.load_from_cache(snapshot_id, allow_expired=True)
+            sync_started = datetime.utcnow()
+            
+            if snapshot is not None and state.get('system_modstamp') and state.get('deleted_until'):
+                deleted_since = datetime.fromisoformat(state['deleted_until'])
+                deleted = self.get_salesforce_deleted(object_name, deleted_since, sync_started)
+                if deleted is None:
+                    return None
+                    
+                earliest = deleted.get('earliestDateAvailable')
+                if earliest and self._to_utc_naive(earliest) > pd.Timestamp(deleted_since):
+                    self.logger.warning(f"Marca d'água de {object_name} fora da janela de exclusões, recarregando")
+                    return self.sync_salesforce_object(object_name, fields, snapshot_id, full_refresh=True)
+                    
+                # '>=' com deduplicação por Id evita perder alterações no mesmo segundo da marca
+                changed = self.get_salesforce_data(
+                    object_name, query_fields,
+                    filters=f"SystemModstamp >= {state['system_modstamp']}",
+                    limit=None
+                )
+                if changed is None:
+                    return None
+                    
+                deleted_ids = [record['id'] for record in deleted.get('deletedRecords', [])]
+                stale_ids = pd.Index(deleted_ids).append(pd.Index(changed.get('Id', [])))
+                snapshot = snapshot.set_index('Id').drop(index=stale_ids, errors='ignore').reset_index()
+                if not changed.empty:
+                    snapshot = pd.concat([snapshot, changed[snapshot.columns.intersection(changed.columns)]], 
+                                         ignore_index=True)
+                    
+                deleted_until = deleted.get('latestDateCovered') or sync_started.isoformat()
+                self.logger.info(f"Sincronização incremental de {object_name}: {len(changed)} alterados, "
+                                 f"{len(deleted_ids)} excluídos")
+            else:
+                changed = self.get_salesforce_data(object_name, query_fields, limit=None)
+                if changed is None:
+                    return None
+                snapshot = changed
+                deleted_until = sync_started.isoformat()
+                self.logger.info(f"Carga completa de {object_name}: {len(snapshot)} registros")
+                
+            if not changed.empty and 'SystemModstamp' in changed.columns:
+                latest = pd.to_datetime(changed['SystemModstamp'], utc=True).max()
+                state['system_modstamp'] = latest.strftime('%Y-%m-%dT%H:%M:%SZ')
+            state.setdefault('system_modstamp', sync_started.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            state['deleted_until'] = self._to_utc_naive(deleted_until).isoformat()
+            state['rows'] = len(snapshot)
+            state['object_name'] = object_name
+            state['fields'] = query_fields
+            
+            # Persistir snapshot antes da marca d'água para nunca avançar a marca sem os dados
+            if not self.save_to_cache(snapshot_id, snapshot, expiry_hours=24 * 365):
+                return None
+            self._save_watermark(snapshot_id, state)
+            
+            return snapshot
+        except Exception as e:
+            self.logger.error(f"Erro na sincronização incremental do Salesforce: {str(e)}")
+            return None
+            
     def get_sap_data(self, entity: str, filters: Dict[str, Any] = None, 
-                    top: int = 100) -> Optional[pd.DataFrame]:
+                    top: Optional[int] = 100) -> Optional[pd.DataFrame]:
         """
         Obtém dados do SAP via OData.
         
         Args:
             entity: Nome da entidade (ex: SalesOrderSet)
             filters: Dicionário com filtros
-            top: Número máximo de registros
+            top: Número máximo de registros (None para todos)
             
         Returns:
             DataFrame com os dados ou None em caso de erro
@@ -303,16 +659,18 @@ class IntegrationManager:
             # Construir URL
             url = f"{integration['base_url'].rstrip('/')}/{entity}"
             
-            params = {
-                '$top': top,
-                '$format': 'json'
-            }
+            params = {'$format': 'json'}
+            if top:
+                params['$top'] = top
             
             # Adicionar filtros se existirem
             if filters:
                 filter_parts = []
                 for key, value in filters.items():
-                    if isinstance(value, str):
+                    if isinstance(value, str) and value.split(' ', 1)[0] in ('eq', 'ne', 'gt', 'ge', 'lt', 'le'):
+                        # Expressão com operador (ex: "ge datetime'2024-01-01T00:00:00'")
+                        filter_parts.append(f"{key} {value}")
+                    elif isinstance(value, str):
                         filter_parts.append(f"{key} eq '{value}'")
                     else:
                         filter_parts.append(f"{key} eq {value}")
@@ -321,13 +679,19 @@ class IntegrationManager:
                     params['$filter'] = " and ".join(filter_parts)
             
             # Fazer a requisição
-            response = session.get(url, params=params)
-            response.raise_for_status()
+            response = self._request('sap', 'GET', url, session=session, params=params)
             
             data = response.json()
             
             if 'd' in data and 'results' in data['d']:
-                df = pd.DataFrame(data['d']['results'])
+                # Seguir a paginação OData (__next) até o fim do resultado
+                results = list(data['d']['results'])
+                while data['d'].get('__next'):
+                    response = self._request('sap', 'GET', data['d']['__next'], session=session)
+                    data = response.json()
+                    results.extend(data['d'].get('results', []))
+                    
+                df = pd.DataFrame(results)
                 self.logger.info(f"Dados obtidos do SAP: {len(df)} registros de {entity}")
                 return df
             else:
@@ -383,8 +747,7 @@ class IntegrationManager:
             request_params['branch'] = integration['branch_id']
             
             # Fazer a requisição
-            response = requests.get(url, headers=headers, params=request_params)
-            response.raise_for_status()
+            response = self._request('totvs', 'GET', url, headers=headers, params=request_params)
             
             data = response.json()
             
@@ -393,7 +756,17 @@ class IntegrationManager:
                 self.logger.info(f"Dados obtidos do TOTVS: {len(df)} registros de {endpoint}")
                 return df
             elif isinstance(data, dict) and 'items' in data:
-                df = pd.DataFrame(data['items'])
+                # Seguir a paginação (hasNext/page) até o fim do resultado
+                items = list(data['items'])
+                page = int(request_params.get('page', 1))
+                while data.get('hasNext'):
+                    page += 1
+                    request_params['page'] = page
+                    response = self._request('totvs', 'GET', url, headers=headers, params=request_params)
+                    data = response.json()
+                    items.extend(data.get('items', []))
+                    
+                df = pd.DataFrame(items)
                 self.logger.info(f"Dados obtidos do TOTVS: {len(df)} registros de {endpoint}")
                 return df
             else:
@@ -404,7 +777,16 @@ class IntegrationManager:
             self.logger.error(f"Erro ao obter dados do TOTVS: {str(e)}")
             return None
             
-    def get_financial_data(self, source: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    @classmethod
+    def _modified_since_utc(cls, modified_since: Optional[datetime]) -> Optional[str]:
+        """Formata o instante de corte incremental em UTC (instantes sem fuso são tratados como UTC)"""
+        if modified_since is None:
+            return None
+        return cls._to_utc_naive(modified_since).strftime('%Y-%m-%dT%H:%M:%SZ')
+        
+    def get_financial_data(self, source: str, start_date: str, end_date: str,
+                       tenant_id: Optional[str] = None,
+                       modified_since: Optional[datetime] = None) -> Optional[pd.DataFrame]:
         """
         Obtém dados financeiros padronizados independente da fonte.
         
@@ -412,71 +794,66 @@ class IntegrationManager:
             source: Fonte de dados ('salesforce', 'sap', 'totvs')
             start_date: Data inicial (formato: 'YYYY-MM-DD')
             end_date: Data final (formato: 'YYYY-MM-DD')
+            tenant_id: Tenant dos dados (padrão: tenant do gerenciador)
+            modified_since: Se informado, retorna apenas registros alterados desde
+                esse instante (SystemModstamp/LastChangeDateTime), para cargas incrementais
             
         Returns:
-            DataFrame com os dados financeiros padronizados ou None em caso de erro
+            DataFrame com os dados financeiros padronizados ou None em caso de erro.
+            Dados servidos do cache de fallback têm df.attrs['stale'] = True
         """
         try:
+            data_id = self._fallback_cache_id(tenant_id, source, 'financial', start_date, end_date)
+            modified = self._modified_since_utc(modified_since)
+            
             if source == 'salesforce':
                 # Obter dados de oportunidades do Salesforce
-                df = self.get_salesforce_data(
+                df = self._fetch_with_fallback(source, data_id, lambda: self.get_salesforce_data(
                     object_name='Opportunity',
                     fields=['Id', 'Name', 'Amount', 'CloseDate', 'StageName', 'Type'],
-                    filters=f"CloseDate >= {start_date} AND CloseDate <= {end_date}",
-                    limit=1000
-                )
+                    filters=f"CloseDate >= {start_date} AND CloseDate <= {end_date}" + (
+                        f" AND SystemModstamp >= {modified}" if modified else ""
+                    ),
+                    limit=None
+                ))
                 
                 if df is not None and not df.empty:
-                    # Padronizar colunas
-                    df = df.rename(columns={
-                        'Amount': 'Receita',
-                        'CloseDate': 'Data',
-                        'StageName': 'Status',
-                        'Type': 'Tipo'
-                    })
-                    df['Fonte'] = 'Salesforce'
+                    # Padronizar colunas, datas, decimais e categorias em uma passada
+                    df = normalize_frame(df, get_schema(source, 'financial'))
                     
                     return df
                     
             elif source == 'sap':
                 # Obter dados financeiros do SAP
-                df = self.get_sap_data(
+                df = self._fetch_with_fallback(source, data_id, lambda: self.get_sap_data(
                     entity='SalesOrderSet',
                     filters={
-                        'CreationDate': f"ge datetime'{start_date}T00:00:00' and le datetime'{end_date}T23:59:59'"
+                        'CreationDate': f"ge datetime'{start_date}T00:00:00' and CreationDate le datetime'{end_date}T23:59:59'",
+                        **({'LastChangeDateTime': f"ge datetimeoffset'{modified}'"} if modified else {})
                     },
-                    top=1000
-                )
+                    top=None
+                ))
                 
                 if df is not None and not df.empty:
-                    # Padronizar colunas
-                    df = df.rename(columns={
-                        'GrossAmount': 'Receita',
-                        'CreationDate': 'Data',
-                        'Status': 'Status'
-                    })
-                    df['Fonte'] = 'SAP'
+                    # Padronizar colunas, datas, decimais e categorias em uma passada
+                    df = normalize_frame(df, get_schema(source, 'financial'))
                     
                     return df
                     
             elif source == 'totvs':
                 # Obter dados financeiros do TOTVS
-                df = self.get_totvs_data(
+                df = self._fetch_with_fallback(source, data_id, lambda: self.get_totvs_data(
                     endpoint='api/financial/v1/invoices',
                     params={
                         'dateFrom': start_date,
-                        'dateTo': end_date
+                        'dateTo': end_date,
+                        **({'modifiedSince': modified} if modified else {})
                     }
-                )
+                ))
                 
                 if df is not None and not df.empty:
-                    # Padronizar colunas
-                    df = df.rename(columns={
-                        'grossValue': 'Receita',
-                        'issueDate': 'Data',
-                        'status': 'Status'
-                    })
-                    df['Fonte'] = 'TOTVS'
+                    # Padronizar colunas, datas, decimais e categorias em uma passada
+                    df = normalize_frame(df, get_schema(source, 'financial'))
                     
                     return df
             
@@ -501,7 +878,9 @@ class IntegrationManager:
         # Implementação semelhante ao get_financial_data, adaptada para dados de vendas
         pass
         
-    def get_operational_data(self, source: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    def get_operational_data(self, source: str, start_date: str, end_date: str,
+                       tenant_id: Optional[str] = None,
+                       modified_since: Optional[datetime] = None) -> Optional[pd.DataFrame]:
         """
         Obtém dados operacionais padronizados independente da fonte.
         
@@ -509,52 +888,49 @@ class IntegrationManager:
             source: Fonte de dados ('salesforce', 'sap', 'totvs')
             start_date: Data inicial (formato: 'YYYY-MM-DD')
             end_date: Data final (formato: 'YYYY-MM-DD')
+            tenant_id: Tenant dos dados (padrão: tenant do gerenciador)
+            modified_since: Se informado, retorna apenas registros alterados desde
+                esse instante (SystemModstamp/LastChangeDateTime), para cargas incrementais
             
         Returns:
-            DataFrame com os dados operacionais padronizados ou None em caso de erro
+            DataFrame com os dados operacionais padronizados ou None em caso de erro.
+            Dados servidos do cache de fallback têm df.attrs['stale'] = True
         """
         try:
+            data_id = self._fallback_cache_id(tenant_id, source, 'operational', start_date, end_date)
+            modified = self._modified_since_utc(modified_since)
+            
             if source == 'sap':
                 # Obter dados de produção do SAP
-                df = self.get_sap_data(
+                df = self._fetch_with_fallback(source, data_id, lambda: self.get_sap_data(
                     entity='ProductionOrderSet',
                     filters={
-                        'CreationDate': f"ge datetime'{start_date}T00:00:00' and le datetime'{end_date}T23:59:59'"
+                        'CreationDate': f"ge datetime'{start_date}T00:00:00' and CreationDate le datetime'{end_date}T23:59:59'",
+                        **({'LastChangeDateTime': f"ge datetimeoffset'{modified}'"} if modified else {})
                     },
-                    top=1000
-                )
+                    top=None
+                ))
                 
                 if df is not None and not df.empty:
-                    # Padronizar colunas
-                    df = df.rename(columns={
-                        'Quantity': 'Produção',
-                        'CreationDate': 'Data',
-                        'Status': 'Status',
-                        'Efficiency': 'Eficiência'
-                    })
-                    df['Fonte'] = 'SAP'
+                    # Padronizar colunas, datas, decimais e categorias em uma passada
+                    df = normalize_frame(df, get_schema(source, 'operational'))
                     
                     return df
                     
             elif source == 'totvs':
                 # Obter dados operacionais do TOTVS
-                df = self.get_totvs_data(
+                df = self._fetch_with_fallback(source, data_id, lambda: self.get_totvs_data(
                     endpoint='api/manufacturing/v1/production',
                     params={
                         'dateFrom': start_date,
-                        'dateTo': end_date
+                        'dateTo': end_date,
+                        **({'modifiedSince': modified} if modified else {})
                     }
-                )
+                ))
                 
                 if df is not None and not df.empty:
-                    # Padronizar colunas
-                    df = df.rename(columns={
-                        'quantity': 'Produção',
-                        'date': 'Data',
-                        'status': 'Status',
-                        'efficiency': 'Eficiência'
-                    })
-                    df['Fonte'] = 'TOTVS'
+                    # Padronizar colunas, datas, decimais e categorias em uma passada
+                    df = normalize_frame(df, get_schema(source, 'operational'))
                     
                     return df
             
@@ -603,12 +979,70 @@ class IntegrationManager:
             self.logger.error(f"Erro ao salvar dados em cache: {str(e)}")
             return False
             
-    def load_from_cache(self, data_id: str) -> Optional[pd.DataFrame]:
+    def has_cached_data(self, data_id: str) -> bool:
+        """
+        Verifica se existem dados em cache (válidos ou não) para o identificador.
+        
+        Args:
+            data_id: Identificador único dos dados
+            
+        Returns:
+            bool: True se o cache e seus metadados existem
+        """
+        cache_file = os.path.join(os.getcwd(), 'cache', f"{data_id}.pkl")
+        return os.path.exists(cache_file) and os.path.exists(f"{cache_file}.meta")
+        
+    @staticmethod
+    def dataset_cache_id(tenant_id: str, dataset: str, source: str) -> str:
+        """
+        Identificador do snapshot mantido pelo agendador de atualizações.
+        
+        Args:
+            tenant_id: ID do tenant
+            dataset: Tipo de dados ('financial', 'operational')
+            source: Fonte de dados ('salesforce', 'sap', 'totvs')
+            
+        Returns:
+            Identificador para uso com save_to_cache/load_from_cache
+        """
+        return f"{tenant_id}_{dataset}_{source}"
+        
+    def get_cached_dataset(self, tenant_id: str, dataset: str, source: str,
+                           start_date: Optional[str] = None, 
+                           end_date: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        Lê o snapshot local pré-aquecido pelo agendador, sem acessar o sistema externo.
+        
+        Args:
+            tenant_id: ID do tenant
+            dataset: Tipo de dados ('financial', 'operational')
+            source: Fonte de dados ('salesforce', 'sap', 'totvs')
+            start_date: Data inicial opcional para filtrar (formato: 'YYYY-MM-DD')
+            end_date: Data final opcional para filtrar (formato: 'YYYY-MM-DD')
+            
+        Returns:
+            DataFrame com os dados do snapshot ou None se ainda não existir
+        """
+        df = self.load_from_cache(self.dataset_cache_id(tenant_id, dataset, source), allow_expired=True)
+        
+        if df is None or 'Data' not in df.columns or not (start_date or end_date):
+            return df
+            
+        dates = pd.to_datetime(df['Data'], errors='coerce')
+        mask = pd.Series(True, index=df.index)
+        if start_date:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= dates < pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        return df[mask]
+        
+    def load_from_cache(self, data_id: str, allow_expired: bool = False) -> Optional[pd.DataFrame]:
         """
         Carrega dados do cache se ainda forem válidos.
         
         Args:
             data_id: Identificador único dos dados
+            allow_expired: Se True, retorna os dados mesmo após a expiração
             
         Returns:
             DataFrame ou None se expirado ou não encontrado
@@ -627,7 +1061,7 @@ class IntegrationManager:
                 metadata = json.load(f)
                 
             expires_at = datetime.fromisoformat(metadata['expires_at'])
-            if datetime.now() > expires_at:
+            if datetime.now() > expires_at and not allow_expired:
                 self.logger.info(f"Cache expirado para: {data_id}")
                 return None
                 
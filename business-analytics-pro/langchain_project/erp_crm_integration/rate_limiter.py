@@ -0,0 +1,251 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+
+class CircuitOpenError(Exception):
+    """Erro levantado quando o circuito de uma integração está aberto."""
+
+
+class RateLimitExceeded(Exception):
+    """Erro levantado quando a espera pelo limitador excede o máximo permitido."""
+
+
+# Limites padrão por sistema (requisições por segundo e rajada máxima)
+DEFAULT_RATE_LIMITS = {
+    'salesforce': {'rate': 5.0, 'capacity': 10},
+    'sap': {'rate': 10.0, 'capacity': 20},
+    'totvs': {'rate': 10.0, 'capacity': 20}
+}
+
+# Formato do cabeçalho Sforce-Limit-Info: "api-usage=18/15000"
+SFORCE_LIMIT_PATTERN = re.compile(r'api-usage=(\d+)/(\d+)')
+
+
+@dataclass
+class ThrottleMetrics:
+    """Métricas de tempo gasto aguardando o limitador versus trabalhando"""
+    requests: int = 0
+    throttled_requests: int = 0
+    throttled_seconds: float = 0.0
+    working_seconds: float = 0.0
+    rate_limited_responses: int = 0
+    short_circuited: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte as métricas em dicionário, incluindo a fração de tempo limitada"""
+        data = asdict(self)
+        total = self.throttled_seconds + self.working_seconds
+        data['throttled_ratio'] = self.throttled_seconds / total if total > 0 else 0.0
+        return data
+
+
+class AdaptiveRateLimiter:
+    """
+    Limitador token-bucket que ajusta a taxa conforme as respostas do sistema.
+
+    A taxa é reduzida multiplicativamente em respostas 429/503 ou quando o
+    consumo informado em Sforce-Limit-Info se aproxima do limite diário, e
+    recuperada aditivamente a cada resposta bem-sucedida.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.1,
+                 usage_threshold: float = 0.8, max_wait: float = 30.0):
+        """
+        Inicializa o limitador.
+
+        Args:
+            rate: Taxa máxima de requisições por segundo
+            capacity: Tamanho máximo da rajada
+            min_rate: Taxa mínima após reduções adaptativas
+            usage_threshold: Fração do limite de API a partir da qual a taxa é reduzida
+            max_wait: Tempo máximo (segundos) que uma chamada aguarda por tokens
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.usage_threshold = usage_threshold
+        self.max_wait = max_wait
+        self.tokens = capacity
+        self.paused_until = 0.0
+        self.api_usage = None
+        self.metrics = ThrottleMetrics()
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Repõe tokens proporcionalmente ao tempo decorrido"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Consome tokens, aguardando se necessário.
+
+        Args:
+            tokens: Quantidade de tokens a consumir
+
+        Returns:
+            Tempo aguardado em segundos
+
+        Raises:
+            RateLimitExceeded: Se a espera necessária exceder max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.paused_until - now)
+            deficit = tokens - self.tokens
+            if deficit > 0:
+                wait = max(wait, deficit / self.rate)
+
+            if wait > self.max_wait:
+                self.metrics.short_circuited += 1
+                raise RateLimitExceeded(f"Espera de {wait:.1f}s excede o máximo de {self.max_wait:.1f}s")
+
+            # Reservar os tokens antes de liberar o lock para não haver disputa
+            self.tokens -= tokens
+            self.metrics.requests += 1
+            if wait > 0:
+                self.metrics.throttled_requests += 1
+                self.metrics.throttled_seconds += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_work(self, seconds: float):
+        """Registra tempo gasto efetivamente em chamadas ao sistema externo"""
+        with self._lock:
+            self.metrics.working_seconds += seconds
+
+    def pause(self, seconds: float):
+        """Suspende novas requisições pelo período informado (ex: Retry-After)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_response(self, status_code: int, headers: Dict[str, str]):
+        """
+        Ajusta a taxa com base na resposta recebida.
+
+        Args:
+            status_code: Código HTTP da resposta
+            headers: Cabeçalhos da resposta
+        """
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        limit_info = headers.get('Sforce-Limit-Info')
+
+        with self._lock:
+            if limit_info:
+                match = SFORCE_LIMIT_PATTERN.search(limit_info)
+                if match:
+                    used, limit = int(match.group(1)), int(match.group(2))
+                    self.api_usage = used / limit if limit else None
+
+            if status_code in (429, 503):
+                self.metrics.rate_limited_responses += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif self.api_usage is not None and self.api_usage >= self.usage_threshold:
+                # Reduzir a taxa proporcionalmente ao limite restante
+                remaining = max(0.0, 1.0 - self.api_usage) / (1.0 - self.usage_threshold)
+                self.rate = max(self.min_rate, self.max_rate * remaining)
+            elif status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+        if retry_after:
+            self.pause(retry_after)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estados fechado, aberto e semiaberto.
+
+    Após failure_threshold falhas consecutivas o circuito abre e as chamadas
+    são rejeitadas até recovery_timeout segundos depois, quando uma única
+    chamada de teste é liberada. Toda chamada liberada deve terminar em
+    record_success, record_failure ou release.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0):
+        """
+        Inicializa o circuit breaker.
+
+        Args:
+            failure_threshold: Falhas consecutivas para abrir o circuito
+            recovery_timeout: Segundos até permitir uma chamada de teste
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Indica se uma nova chamada pode ser realizada"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """Indica se o circuito está aberto e ainda dentro do tempo de recuperação"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def record_success(self):
+        """Registra chamada bem-sucedida e fecha o circuito"""
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def release(self):
+        """Devolve a chamada de teste sem registrar resultado (ex: desistência no limitador)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # opened_at é mantido: a próxima chamada pode testar o sistema de imediato
+                self.state = self.OPEN
+
+    def record_failure(self):
+        """Registra falha e abre o circuito se o limiar for atingido"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos.
+
+    Args:
+        value: Valor do cabeçalho
+
+    Returns:
+        Segundos a aguardar ou None se ausente/inválido
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,478 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Set, Union, Iterable
+
+import pandas as pd
+
+from .integration_manager import IntegrationManager
+from .schema import SOURCE_SCHEMAS, normalize_frame, get_schema
+
+
+class CronSpec:
+    """
+    Expressão cron de 5 campos (minuto hora dia mês dia-da-semana).
+
+    Suporta '*', listas ('1,15'), intervalos ('1-5') e passos ('*/15', '0-30/10').
+    O dia da semana segue a convenção cron (0 = domingo).
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression: str):
+        """
+        Inicializa a especificação.
+
+        Args:
+            expression: Expressão cron (ex: '*/30 6-20 * * 1-5')
+        """
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Expressão cron inválida: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELD_RANGES)
+        ]
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(value: str, low: int, high: int) -> Set[int]:
+        """Converte um campo cron no conjunto de valores aceitos"""
+        result = set()
+        for part in value.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/')
+                step = int(step_str)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-'))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high:
+                raise ValueError(f"Valor fora do intervalo {low}-{high}: {value}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _day_matches(self, dt: datetime) -> bool:
+        """Aplica a regra cron de dia do mês OU dia da semana"""
+        weekday = (dt.weekday() + 1) % 7
+        if self._any_day:
+            return weekday in self.weekdays
+        if self._any_weekday:
+            return dt.day in self.days
+        return dt.day in self.days or weekday in self.weekdays
+
+    def matches(self, dt: datetime) -> bool:
+        """Indica se o instante (com precisão de minuto) satisfaz a expressão"""
+        return (dt.minute in self.minutes and dt.hour in self.hours and
+                dt.month in self.months and self._day_matches(dt))
+
+    def next_after(self, dt: datetime) -> datetime:
+        """
+        Calcula a próxima execução estritamente após o instante informado.
+
+        Args:
+            dt: Instante de referência
+
+        Returns:
+            Próximo instante que satisfaz a expressão
+        """
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Expressão cron sem execuções futuras: {self.expression}")
+
+
+@dataclass
+class RefreshJob:
+    """
+    Job de atualização de um dataset de integração para um tenant.
+
+    key_column identifica cada registro na mesclagem incremental; quando
+    omitido, usa a chave declarada no esquema da fonte.
+    """
+    tenant_id: str
+    dataset: str
+    source: str
+    schedule: str
+    lookback_days: int = 90
+    overlap_days: int = 1
+    expiry_hours: int = 24
+    key_column: Optional[str] = None
+    enabled: bool = True
+    job_id: str = field(default='')
+
+    def __post_init__(self):
+        if not self.job_id:
+            self.job_id = f"{self.tenant_id}_{self.dataset}_{self.source}"
+        if not self.key_column:
+            mapping = SOURCE_SCHEMAS.get((self.source, self.dataset))
+            self.key_column = mapping.key_column if mapping else None
+        if not self.key_column:
+            raise ValueError(f"Job {self.job_id} sem key_column para mesclagem incremental")
+        self.cron = CronSpec(self.schedule)
+
+
+class RefreshScheduler:
+    """
+    Agendador de atualizações de datasets fora das sessões do Streamlit.
+
+    Cada job mantém um snapshot por tenant/dataset/fonte no cache do
+    IntegrationManager do seu tenant. A primeira execução carrega a janela
+    completa (lookback_days); as seguintes buscam apenas os registros da
+    janela alterados na fonte desde a última execução bem-sucedida (menos
+    overlap_days) e mesclam o resultado ao snapshot. Dados servidos do cache
+    de fallback contam como falha. Estatísticas das execuções são
+    persistidas em JSON.
+    """
+
+    DATASET_FETCHERS = {
+        'financial': 'get_financial_data',
+        'operational': 'get_operational_data'
+    }
+
+    def __init__(self, integration_managers: Union[IntegrationManager, Dict[str, IntegrationManager]],
+                 jobs: List[RefreshJob], state_path: Optional[str] = None):
+        """
+        Inicializa o agendador.
+
+        Args:
+            integration_managers: Gerenciadores já configurados por tenant
+                (ver build_tenant_managers) ou um único gerenciador para todos
+            jobs: Lista de jobs de atualização
+            state_path: Caminho do arquivo JSON com estatísticas das execuções
+        """
+        self.logger = self._setup_logger()
+        self.integration_managers = integration_managers
+        self.jobs = {job.job_id: job for job in jobs}
+        self.state_path = state_path or os.path.join(os.getcwd(), 'data', 'scheduler', 'job_runs.json')
+        self.state = self._load_state()
+        self.next_runs = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _setup_logger(self):
+        """Configura o logger para o agendador"""
+        logger = logging.getLogger("RefreshScheduler")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        """Carrega estatísticas de execuções anteriores"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar estado do agendador: {str(e)}")
+        return {}
+
+    def _save_state(self):
+        """Persiste estatísticas das execuções de forma atômica"""
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f, indent=4)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar estado do agendador: {str(e)}")
+
+    def _manager_for(self, job: RefreshJob) -> IntegrationManager:
+        """Obtém o gerenciador de integrações do tenant do job"""
+        if isinstance(self.integration_managers, IntegrationManager):
+            return self.integration_managers
+        if job.tenant_id not in self.integration_managers:
+            raise ValueError(f"Integrações não configuradas para o tenant {job.tenant_id}")
+        return self.integration_managers[job.tenant_id]
+
+    def _refresh_window(self, job: RefreshJob, manager: IntegrationManager,
+                        now: datetime) -> Dict[str, Optional[str]]:
+        """
+        Calcula a janela a buscar.
+
+        A janela de datas de negócio é sempre a do snapshot (lookback_days);
+        em execuções incrementais, modified_since limita a busca aos registros
+        alterados na fonte desde a última execução bem-sucedida.
+        """
+        job_state = self.state.get(job.job_id, {})
+        last_success = job_state.get('last_success_at')
+        snapshot_id = IntegrationManager.dataset_cache_id(job.tenant_id, job.dataset, job.source)
+
+        modified_since = None
+        if last_success and manager.has_cached_data(snapshot_id):
+            modified_since = (datetime.fromisoformat(last_success) - timedelta(days=job.overlap_days)).isoformat()
+
+        start = now - timedelta(days=job.lookback_days)
+        return {'start_date': start.strftime('%Y-%m-%d'), 'end_date': now.strftime('%Y-%m-%d'),
+                'modified_since': modified_since}
+
+    def _merge_snapshot(self, job: RefreshJob, snapshot: Optional[pd.DataFrame],
+                        delta: pd.DataFrame, now: datetime) -> pd.DataFrame:
+        """Mescla novos registros ao snapshot, descartando versões antigas e fora da janela"""
+        if not delta.empty and job.key_column not in delta.columns:
+            raise ValueError(f"Coluna chave {job.key_column} ausente nos dados de {job.source}")
+
+        if snapshot is None or snapshot.empty:
+            merged = delta if delta.empty else delta.drop_duplicates(subset=[job.key_column], keep='last')
+        elif delta.empty:
+            merged = snapshot
+        else:
+            merged = pd.concat([snapshot, delta], ignore_index=True)
+            merged = merged.drop_duplicates(subset=[job.key_column], keep='last')
+            # Categorias com domínios diferentes viram object no concat; restaurar tipos
+            merged = normalize_frame(merged, get_schema(job.source, job.dataset))
+
+        if 'Data' in merged.columns:
+            cutoff = pd.Timestamp(now - timedelta(days=job.lookback_days))
+            dates = pd.to_datetime(merged['Data'], errors='coerce')
+            merged = merged[dates.isna() | (dates >= cutoff)]
+
+        return merged.reset_index(drop=True)
+
+    def run_job(self, job: RefreshJob, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Executa um job imediatamente e registra suas estatísticas.
+
+        Args:
+            job: Job a executar
+            now: Instante de referência (padrão: agora)
+
+        Returns:
+            Dicionário com estatísticas da execução
+        """
+        now = now or datetime.now()
+        started = time.monotonic()
+        job_state = self.state.setdefault(job.job_id, {'runs': 0, 'failures': 0})
+        job_state['runs'] += 1
+        job_state['last_run_at'] = now.isoformat()
+
+        try:
+            fetcher_name = self.DATASET_FETCHERS.get(job.dataset)
+            if not fetcher_name:
+                raise ValueError(f"Dataset não suportado: {job.dataset}")
+
+            manager = self._manager_for(job)
+            window = self._refresh_window(job, manager, now)
+            modified_since = window['modified_since']
+            delta = getattr(manager, fetcher_name)(
+                job.source, window['start_date'], window['end_date'], tenant_id=job.tenant_id,
+                modified_since=datetime.fromisoformat(modified_since) if modified_since else None
+            )
+            if delta is None:
+                raise RuntimeError(f"Falha ao obter {job.dataset} de {job.source}")
+            if delta.attrs.get('stale'):
+                raise RuntimeError(f"{job.source} indisponível: apenas dados desatualizados do cache de fallback")
+
+            snapshot_id = IntegrationManager.dataset_cache_id(job.tenant_id, job.dataset, job.source)
+            snapshot = manager.load_from_cache(snapshot_id, allow_expired=True)
+            merged = self._merge_snapshot(job, snapshot, delta, now)
+
+            if not manager.save_to_cache(snapshot_id, merged, job.expiry_hours):
+                raise RuntimeError(f"Falha ao salvar snapshot {snapshot_id}")
+
+            job_state.update({
+                'last_status': 'success',
+                'last_success_at': now.isoformat(),
+                'last_error': None,
+                'last_window': window,
+                'last_fetched_rows': len(delta),
+                'snapshot_rows': len(merged)
+            })
+            self.logger.info(f"Job {job.job_id} concluído: {len(delta)} registros novos, snapshot com {len(merged)}")
+        except Exception as e:
+            job_state['failures'] += 1
+            job_state.update({'last_status': 'failure', 'last_error': str(e)})
+            self.logger.error(f"Erro no job {job.job_id}: {str(e)}")
+
+        job_state['last_duration_s'] = time.monotonic() - started
+        self._save_state()
+        return dict(job_state)
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Executa os jobs cujo horário agendado já chegou.
+
+        Args:
+            now: Instante de referência (padrão: agora)
+
+        Returns:
+            Lista de IDs dos jobs executados
+        """
+        now = now or datetime.now()
+        executed = []
+        for job_id, job in self.jobs.items():
+            if not job.enabled:
+                continue
+            if job_id not in self.next_runs:
+                self.next_runs[job_id] = job.cron.next_after(now - timedelta(minutes=1))
+            if self.next_runs[job_id] <= now:
+                self.run_job(job, now)
+                self.next_runs[job_id] = job.cron.next_after(now)
+                executed.append(job_id)
+        return executed
+
+    def run_forever(self, poll_seconds: float = 30.0):
+        """
+        Executa o laço do agendador até stop() ser chamado.
+
+        Args:
+            poll_seconds: Intervalo máximo entre verificações
+        """
+        self.logger.info(f"Agendador iniciado com {len(self.jobs)} jobs")
+        while not self._stop_event.is_set():
+            self.run_pending()
+            upcoming = list(self.next_runs.values())
+            wait = poll_seconds
+            if upcoming:
+                wait = min(poll_seconds, max(1.0, (min(upcoming) - datetime.now()).total_seconds()))
+            self._stop_event.wait(wait)
+        self.logger.info("Agendador finalizado")
+
+    def start(self, poll_seconds: float = 30.0) -> threading.Thread:
+        """Inicia o agendador em uma thread de segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, args=(poll_seconds,),
+                                        name="RefreshScheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Sinaliza o fim do laço e aguarda a thread terminar"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_job_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Retorna estatísticas das execuções e o próximo horário de cada job"""
+        stats = {}
+        for job_id in self.jobs:
+            job_stats = dict(self.state.get(job_id, {}))
+            if job_id in self.next_runs:
+                job_stats['next_run_at'] = self.next_runs[job_id].isoformat()
+            stats[job_id] = job_stats
+        return stats
+
+
+def load_jobs(jobs_path: str) -> List[RefreshJob]:
+    """
+    Carrega definições de jobs de um arquivo JSON.
+
+    Args:
+        jobs_path: Caminho para o arquivo (lista de objetos RefreshJob)
+
+    Returns:
+        Lista de jobs
+    """
+    with open(jobs_path, 'r') as f:
+        return [RefreshJob(**job) for job in json.load(f)]
+
+
+def configure_from_credentials(manager: IntegrationManager, credentials_path: str) -> List[str]:
+    """
+    Configura as integrações de um tenant a partir do seu arquivo de credenciais.
+
+    Args:
+        manager: Gerenciador de integrações do tenant
+        credentials_path: Arquivo JSON com credenciais por sistema
+
+    Returns:
+        Lista de sistemas configurados com sucesso
+    """
+    with open(credentials_path, 'r') as f:
+        credentials = json.load(f)
+
+    configurators = {
+        'salesforce': manager.configure_salesforce,
+        'sap': manager.configure_sap,
+        'totvs': manager.configure_totvs
+    }
+    configured = []
+    for system, params in credentials.items():
+        if system in configurators and configurators[system](**params):
+            configured.append(system)
+    return configured
+
+
+def build_tenant_managers(tenant_ids: Iterable[str], credentials_template: str) -> Dict[str, IntegrationManager]:
+    """
+    Cria um gerenciador de integrações por tenant, com as credenciais do próprio tenant.
+
+    Args:
+        tenant_ids: IDs dos tenants com jobs
+        credentials_template: Caminho do arquivo de credenciais de cada tenant,
+            com o marcador {tenant_id}
+
+    Returns:
+        Dicionário tenant_id -> gerenciador configurado
+    """
+    logger = logging.getLogger("RefreshScheduler")
+    managers = {}
+    for tenant_id in sorted(set(tenant_ids)):
+        manager = IntegrationManager(tenant_id=tenant_id)
+        credentials_path = credentials_template.format(tenant_id=tenant_id)
+        if os.path.exists(credentials_path):
+            configured = configure_from_credentials(manager, credentials_path)
+            logger.info(f"Tenant {tenant_id}: integrações configuradas {configured}")
+        else:
+            logger.warning(f"Credenciais não encontradas para o tenant {tenant_id}: {credentials_path}")
+        managers[tenant_id] = manager
+    return managers
+
+
+def main():
+    """Ponto de entrada do processo agendador"""
+    parser = argparse.ArgumentParser(description="Agendador de atualização de integrações")
+    parser.add_argument('--jobs', default=os.path.join('config', 'refresh_jobs.json'))
+    parser.add_argument('--credentials', default=os.environ.get(
+        'INTEGRATION_CREDENTIALS_FILE', os.path.join('data', 'tenants', '{tenant_id}', 'integration_credentials.json')
+    ), help="Arquivo de credenciais de cada tenant, com o marcador {tenant_id}")
+    parser.add_argument('--poll-seconds', type=float, default=30.0)
+    parser.add_argument('--once', action='store_true', help="Executa todos os jobs uma vez e sai")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.jobs)
+    managers = build_tenant_managers((job.tenant_id for job in jobs), args.credentials)
+
+    scheduler = RefreshScheduler(managers, jobs)
+    if args.once:
+        for job in scheduler.jobs.values():
+            if job.enabled:
+                scheduler.run_job(job)
+    else:
+        scheduler.run_forever(args.poll_seconds)
+
+
+if __name__ == '__main__':
+    main()
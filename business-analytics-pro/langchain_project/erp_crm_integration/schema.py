@@ -0,0 +1,215 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("IntegrationManager")
+
+
+@dataclass(frozen=True)
+class SchemaMapping:
+    """Mapeamento declarativo do payload de uma fonte para o esquema padronizado"""
+    source_label: str
+    rename: Dict[str, str]
+    date_columns: Tuple[str, ...] = ('Data',)
+    decimal_columns: Tuple[str, ...] = ()
+    integer_columns: Tuple[str, ...] = ()
+    float32_columns: Tuple[str, ...] = ()
+    categorical_columns: Tuple[str, ...] = ('Status', 'Tipo')
+    required_columns: Tuple[str, ...] = ('Data',)
+    key_column: Optional[str] = None
+
+
+SOURCE_SCHEMAS = {
+    ('salesforce', 'financial'): SchemaMapping(
+        source_label='Salesforce',
+        rename={'Amount': 'Receita', 'CloseDate': 'Data', 'StageName': 'Status', 'Type': 'Tipo'},
+        decimal_columns=('Receita',),
+        required_columns=('Data', 'Receita'),
+        key_column='Id'
+    ),
+    ('sap', 'financial'): SchemaMapping(
+        source_label='SAP',
+        rename={'GrossAmount': 'Receita', 'CreationDate': 'Data', 'Status': 'Status'},
+        decimal_columns=('Receita',),
+        required_columns=('Data', 'Receita'),
+        key_column='SalesOrder'
+    ),
+    ('totvs', 'financial'): SchemaMapping(
+        source_label='TOTVS',
+        rename={'grossValue': 'Receita', 'issueDate': 'Data', 'status': 'Status'},
+        decimal_columns=('Receita',),
+        required_columns=('Data', 'Receita'),
+        key_column='invoiceId'
+    ),
+    ('sap', 'operational'): SchemaMapping(
+        source_label='SAP',
+        rename={'Quantity': 'Produção', 'CreationDate': 'Data', 'Status': 'Status',
+                'Efficiency': 'Eficiência'},
+        float32_columns=('Eficiência',),
+        integer_columns=('Produção',),
+        required_columns=('Data', 'Produção'),
+        key_column='ProductionOrder'
+    ),
+    ('totvs', 'operational'): SchemaMapping(
+        source_label='TOTVS',
+        rename={'quantity': 'Produção', 'date': 'Data', 'status': 'Status',
+                'efficiency': 'Eficiência'},
+        float32_columns=('Eficiência',),
+        integer_columns=('Produção',),
+        required_columns=('Data', 'Produção'),
+        key_column='orderId'
+    )
+}
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Converte datas ISO e o formato OData v2 do SAP ('/Date(1700000000000)/').
+
+    Datas com fuso são normalizadas para UTC e retornadas sem fuso.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if getattr(values.dt, 'tz', None) is not None:
+            return values.dt.tz_convert(None)
+        return values
+
+    text = values.astype('string')
+    odata_ms = text.str.extract(r'/Date\((-?\d+)', expand=False)
+    parsed = pd.to_datetime(text.where(odata_ms.isna()), errors='coerce', utc=True, format='ISO8601')
+
+    has_odata = odata_ms.notna()
+    if has_odata.any():
+        parsed = parsed.where(~has_odata, pd.to_datetime(
+            pd.to_numeric(odata_ms, errors='coerce'), unit='ms', utc=True
+        ))
+
+    return parsed.dt.tz_convert(None)
+
+
+def _parse_decimals(values: pd.Series) -> pd.Series:
+    """
+    Converte valores decimais nos formatos brasileiro ('1.234,56') e americano ('1,234.56').
+
+    O formato é detectado uma vez para a coluna inteira e aplicado a todos
+    os valores: valores com vírgula decimal ('1.234,56', '12,5') ou pontos
+    repetidos ('1.234.567') indicam o formato brasileiro; ponto decimal após
+    vírgula ('1,234.56') ou vírgulas repetidas ('1,234,567') indicam o
+    americano. Prevalece o formato com mais evidências, de modo que em uma
+    coluna brasileira '1.234' vale 1234. Sem vírgulas nem pontos repetidos,
+    os valores são lidos diretamente.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_numeric(values, errors='coerce')
+
+    text = values.astype('string').str.strip()
+    commas = text.str.count(',')
+    dots = text.str.count(r'\.')
+    comma_last = text.str.rfind(',') > text.str.rfind('.')
+
+    brazilian_votes = int(((comma_last & commas.eq(1)) | dots.gt(1)).fillna(False).sum())
+    american_votes = int(((~comma_last & commas.gt(0)) | commas.gt(1)).fillna(False).sum())
+
+    if brazilian_votes > american_votes:
+        text = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    elif american_votes:
+        text = text.str.replace(',', '', regex=False)
+    # Voltar para float64 padrão (NaN) para que o downcast verifique perda de precisão
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def _downcast_float(values: pd.Series, lossless: bool = True) -> pd.Series:
+    """Converte para float32 quando não há perda (ou sempre, se lossless=False)"""
+    narrow = values.astype('float32')
+    if not lossless or np.array_equal(narrow.to_numpy(dtype='float64'), values.to_numpy(), equal_nan=True):
+        return narrow
+    return values
+
+
+def normalize_frame(df: pd.DataFrame, mapping: SchemaMapping) -> pd.DataFrame:
+    """
+    Padroniza um payload de ERP/CRM em uma única passada vetorizada.
+
+    Renomeia colunas, converte datas e decimais, reduz os tipos numéricos
+    sem perda de precisão (exceto em float32_columns, onde float32 é
+    aceitável), converte colunas de baixa cardinalidade em categorias e
+    valida colunas obrigatórias e valores não convertidos. O relatório de
+    validação fica em df.attrs['schema_report'].
+
+    Args:
+        df: DataFrame bruto retornado pela fonte
+        mapping: Mapeamento declarativo da fonte
+
+    Returns:
+        DataFrame padronizado
+    """
+    df = df.rename(columns=mapping.rename)
+    converted = {}
+    coercion_errors = {}
+
+    def track(column: str, original: pd.Series, parsed: pd.Series):
+        lost = int(original.notna().sum() - parsed.notna().sum())
+        if lost:
+            coercion_errors[column] = lost
+        converted[column] = parsed
+
+    for column in mapping.date_columns:
+        if column in df.columns:
+            track(column, df[column], _parse_dates(df[column]))
+
+    for column in mapping.decimal_columns:
+        if column in df.columns:
+            track(column, df[column], _downcast_float(_parse_decimals(df[column])))
+
+    for column in mapping.float32_columns:
+        if column in df.columns:
+            track(column, df[column], _downcast_float(_parse_decimals(df[column]), lossless=False))
+
+    for column in mapping.integer_columns:
+        if column in df.columns:
+            parsed = _parse_decimals(df[column])
+            if parsed.notna().all() and (parsed % 1 == 0).all():
+                parsed = pd.to_numeric(parsed, downcast='integer')
+            else:
+                parsed = _downcast_float(parsed)
+            track(column, df[column], parsed)
+
+    for column in mapping.categorical_columns:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            converted[column] = df[column].astype('category')
+
+    # Fonte constante: categoria com um único código, sem materializar strings
+    converted['Fonte'] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype=np.int8), categories=[mapping.source_label]
+    )
+
+    df = df.assign(**converted)
+
+    missing = [column for column in mapping.required_columns if column not in df.columns]
+    report = {'missing_columns': missing, 'coercion_errors': coercion_errors}
+    if missing:
+        logger.warning(f"Colunas obrigatórias ausentes em {mapping.source_label}: {missing}")
+    if coercion_errors:
+        logger.warning(f"Valores não convertidos em {mapping.source_label}: {coercion_errors}")
+
+    df.attrs['schema_report'] = report
+    return df
+
+
+def get_schema(source: str, dataset: str) -> SchemaMapping:
+    """
+    Obtém o mapeamento de uma fonte para um tipo de dados.
+
+    Args:
+        source: Fonte de dados ('salesforce', 'sap', 'totvs')
+        dataset: Tipo de dados ('financial', 'operational')
+
+    Returns:
+        Mapeamento declarativo
+
+    Raises:
+        KeyError: Se a combinação não for suportada
+    """
+    return SOURCE_SCHEMAS[(source, dataset)]
@@ -0,0 +1,424 @@
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, List, Tuple
+
+
+@dataclass
+class SimulatorConfig:
+    """Configuração do simulador de ERP/CRM"""
+    records: int = 1000
+    page_size: int = 200
+    latency_ms: float = 20.0
+    latency_jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    rate_limit_rps: Optional[float] = None
+    api_daily_limit: int = 15000
+    seed: int = 42
+
+
+class ERPSimulator:
+    """
+    Servidor HTTP local que simula os endpoints usados pelo IntegrationManager.
+
+    Implementa o token OAuth e consultas SOQL do Salesforce (com
+    nextRecordsUrl), o token CSRF e as entidades OData SalesOrderSet e
+    ProductionOrderSet do SAP (com __next) e os endpoints de token, notas
+    fiscais e produção do TOTVS (com hasNext). Filtros por SystemModstamp e o
+    recurso getDeleted permitem testar a sincronização incremental. Latência,
+    taxa de erros, limite de requisições e tamanho dos datasets são
+    configuráveis.
+    """
+
+    SAP_PREFIX = '/sap/opu/odata/sap/API'
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Inicializa o simulador.
+
+        Args:
+            config: Configuração do simulador
+            host: Endereço de escuta
+            port: Porta de escuta (0 escolhe uma porta livre)
+        """
+        self.logger = self._setup_logger()
+        self.config = config or SimulatorConfig()
+        self.datasets = self._generate_datasets()
+        self.deleted = {}
+        self.api_usage = 0
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._rate_window = (0, 0)
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    def _setup_logger(self):
+        """Configura o logger para o simulador"""
+        logger = logging.getLogger("ERPSimulator")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    @property
+    def base_url(self) -> str:
+        """URL base do servidor em execução"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sap_base_url(self) -> str:
+        """URL base do serviço OData SAP simulado"""
+        return f"{self.base_url}{self.SAP_PREFIX}"
+
+    def _generate_datasets(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Gera datasets determinísticos para cada endpoint"""
+        rng = random.Random(self.config.seed)
+        n = self.config.records
+        start = datetime(2024, 1, 1)
+        stages = ['Prospecting', 'Negotiation', 'Closed Won', 'Closed Lost']
+        types = ['New Business', 'Existing Business']
+        statuses = ['OPEN', 'RELEASED', 'COMPLETED']
+
+        def day(i: int) -> datetime:
+            return start + timedelta(days=i * 365 // max(n, 1))
+
+        opportunities = [{
+            'attributes': {'type': 'Opportunity'},
+            'Id': f"006{i:015d}",
+            'Name': f"Oportunidade {i}",
+            'Amount': round(rng.uniform(1000, 100000), 2),
+            'CloseDate': day(i).strftime('%Y-%m-%d'),
+            'StageName': rng.choice(stages),
+            'Type': rng.choice(types),
+            'SystemModstamp': day(i).strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+        } for i in range(n)]
+
+        sales_orders = [{
+            'SalesOrder': f"{i:010d}",
+            'GrossAmount': f"{rng.uniform(500, 50000):.2f}",
+            'CreationDate': f"/Date({int(day(i).timestamp() * 1000)})/",
+            'Status': rng.choice(statuses)
+        } for i in range(n)]
+
+        production_orders = [{
+            'ProductionOrder': f"{i:010d}",
+            'Quantity': str(rng.randint(10, 1000)),
+            'CreationDate': f"/Date({int(day(i).timestamp() * 1000)})/",
+            'Status': rng.choice(statuses),
+            'Efficiency': f"{rng.uniform(0.6, 1.0):.3f}"
+        } for i in range(n)]
+
+        invoices = [{
+            'invoiceId': f"NF{i:08d}",
+            'grossValue': round(rng.uniform(100, 20000), 2),
+            'issueDate': day(i).strftime('%Y-%m-%d'),
+            'status': rng.choice(['issued', 'cancelled', 'paid'])
+        } for i in range(n)]
+
+        production = [{
+            'orderId': f"OP{i:08d}",
+            'quantity': rng.randint(10, 1000),
+            'date': day(i).strftime('%Y-%m-%d'),
+            'status': rng.choice(['open', 'finished']),
+            'efficiency': round(rng.uniform(0.6, 1.0), 3)
+        } for i in range(n)]
+
+        return {
+            'Opportunity': opportunities,
+            'SalesOrderSet': sales_orders,
+            'ProductionOrderSet': production_orders,
+            'invoices': invoices,
+            'production': production
+        }
+
+    def _check_rate_limit(self) -> bool:
+        """Aplica o limite global de requisições por segundo, se configurado"""
+        if not self.config.rate_limit_rps:
+            return True
+        with self._lock:
+            second = int(time.time())
+            window, count = self._rate_window
+            if window != second:
+                window, count = second, 0
+            count += 1
+            self._rate_window = (window, count)
+            return count <= self.config.rate_limit_rps
+
+    def _make_handler(self):
+        """Cria a classe de handler HTTP ligada a esta instância"""
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                simulator.logger.debug(format % args)
+
+            def _send(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body if body is not None else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self, method: str):
+                if method == 'POST':
+                    length = int(self.headers.get('Content-Length') or 0)
+                    self.rfile.read(length)
+
+                config = simulator.config
+                delay = config.latency_ms + random.uniform(0, config.latency_jitter_ms)
+                time.sleep(delay / 1000.0)
+
+                with simulator._lock:
+                    simulator.request_count += 1
+                    simulator.api_usage += 1
+
+                if not simulator._check_rate_limit():
+                    return self._send(429, {'error': 'REQUEST_LIMIT_EXCEEDED'}, {'Retry-After': '1'})
+                if config.error_rate and random.random() < config.error_rate:
+                    return self._send(503, {'error': 'SERVICE_UNAVAILABLE'}, {'Retry-After': '0'})
+
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                status, body, headers = simulator.route(method, parsed.path, query, self.headers.get('Host'))
+                self._send(status, body, headers)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
+
+    def _page(self, rows: List[Dict[str, Any]], offset: int, size: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Retorna uma página e se há mais registros"""
+        page = rows[offset:offset + size]
+        return page, offset + size < len(rows)
+
+    def route(self, method: str, path: str, query: Dict[str, str],
+              host: Optional[str]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Resolve uma requisição para a resposta simulada.
+
+        Args:
+            method: Método HTTP
+            path: Caminho da URL
+            query: Parâmetros da query string
+            host: Cabeçalho Host (usado em URLs absolutas de paginação)
+
+        Returns:
+            Tupla (status, corpo, cabeçalhos)
+        """
+        base = f"http://{host}" if host else self.base_url
+        size = self.config.page_size
+
+        # Salesforce
+        if method == 'POST' and path == '/services/oauth2/token':
+            return 200, {'access_token': 'sim-sf-token', 'instance_url': base,
+                         'token_type': 'Bearer', 'expires_in': 7200}, {}
+        sf_headers = {'Sforce-Limit-Info': f"api-usage={self.api_usage}/{self.config.api_daily_limit}"}
+        if path.startswith('/services/data/') and '/query' in path:
+            return self._salesforce_query(path, query, size, sf_headers)
+        deleted_match = re.match(r'/services/data/v[\d.]+/sobjects/(\w+)/deleted/?$', path)
+        if deleted_match:
+            return self._salesforce_deleted(deleted_match.group(1), query, sf_headers)
+
+        # SAP
+        if path == f"{self.SAP_PREFIX}/csrf-token":
+            return 200, {}, {'x-csrf-token': 'sim-csrf-token'}
+        if path.startswith(self.SAP_PREFIX + '/'):
+            entity = path[len(self.SAP_PREFIX) + 1:]
+            if entity not in ('SalesOrderSet', 'ProductionOrderSet'):
+                return 404, {'error': f"Entidade desconhecida: {entity}"}, {}
+            top = int(query.get('$top', len(self.datasets[entity])))
+            skip = int(query.get('$skip', 0))
+            rows = self.datasets[entity][:top]
+            page, has_more = self._page(rows, skip, size)
+            body = {'d': {'results': page}}
+            if has_more:
+                next_query = urllib.parse.urlencode({'$top': top, '$skip': skip + size, '$format': 'json'})
+                body['d']['__next'] = f"{base}{path}?{next_query}"
+            return 200, body, {}
+
+        # TOTVS
+        if method == 'POST' and path == '/api/oauth2/v1/token':
+            return 200, {'access_token': 'sim-totvs-token', 'token_type': 'Bearer', 'expires_in': 3600}, {}
+        totvs_endpoints = {'/api/financial/v1/invoices': 'invoices',
+                           '/api/manufacturing/v1/production': 'production'}
+        if path in totvs_endpoints:
+            rows = self.datasets[totvs_endpoints[path]]
+            page_number = int(query.get('page', 1))
+            page_size = int(query.get('pageSize', size))
+            page, has_more = self._page(rows, (page_number - 1) * page_size, page_size)
+            return 200, {'items': page, 'hasNext': has_more}, {}
+
+        return 404, {'error': f"Endpoint não encontrado: {path}"}, {}
+
+    def _salesforce_query(self, path: str, query: Dict[str, str], size: int,
+                          headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """Executa uma consulta SOQL simplificada (SELECT ... FROM ... LIMIT) com cursores"""
+        cursor = re.search(r'/query/(\w+)-(\d+)$', path)
+        if cursor:
+            object_name, offset = cursor.group(1), int(cursor.group(2))
+            limit = int(query.get('limit', len(self.datasets.get(object_name, []))))
+            fields = query.get('fields', '').split(',') if query.get('fields') else None
+            modstamp_filter = tuple(query['modstamp'].split(' ', 1)) if query.get('modstamp') else None
+        else:
+            soql = query.get('q', '')
+            match = re.search(r'SELECT\s+(.+?)\s+FROM\s+(\w+)', soql, re.IGNORECASE)
+            if not match:
+                return 400, [{'errorCode': 'MALFORMED_QUERY', 'message': soql}], headers
+            fields = [field.strip() for field in match.group(1).split(',')]
+            object_name, offset = match.group(2), 0
+            limit_match = re.search(r'LIMIT\s+(\d+)', soql, re.IGNORECASE)
+            limit = int(limit_match.group(1)) if limit_match else len(self.datasets.get(object_name, []))
+            modstamp_match = re.search(r'SystemModstamp\s*(>=|>)\s*(\S+)', soql, re.IGNORECASE)
+            modstamp_filter = modstamp_match.groups() if modstamp_match else None
+
+        if object_name not in self.datasets:
+            return 400, [{'errorCode': 'INVALID_TYPE', 'message': object_name}], headers
+
+        rows = self.datasets[object_name]
+        if modstamp_filter:
+            operator, literal = modstamp_filter
+            threshold = self._parse_sf_datetime(literal)
+            rows = [row for row in rows if (self._parse_sf_datetime(row['SystemModstamp']) >= threshold
+                                             if operator == '>=' else
+                                             self._parse_sf_datetime(row['SystemModstamp']) > threshold)]
+        rows = rows[:limit]
+        page, has_more = self._page(rows, offset, size)
+        if fields:
+            keep = set(fields) | {'attributes'}
+            page = [{key: value for key, value in row.items() if key in keep} for row in page]
+
+        body = {'totalSize': len(rows), 'done': not has_more, 'records': page}
+        if has_more:
+            cursor_params = {'limit': limit, 'fields': ','.join(fields or [])}
+            if modstamp_filter:
+                cursor_params['modstamp'] = ' '.join(modstamp_filter)
+            cursor_query = urllib.parse.urlencode(cursor_params)
+            body['nextRecordsUrl'] = f"/services/data/v52.0/query/{object_name}-{offset + size}?{cursor_query}"
+        return 200, body, headers
+
+    @staticmethod
+    def _parse_sf_datetime(value: str) -> datetime:
+        """Converte datas do Salesforce ('...T00:00:00.000+0000' ou '...Z') em UTC sem fuso"""
+        value = value.replace('Z', '+0000')
+        for fmt in ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z'):
+            try:
+                return datetime.strptime(value, fmt).astimezone(timezone.utc).replace(tzinfo=None)
+            except ValueError:
+                continue
+        raise ValueError(f"Data inválida: {value}")
+
+    def _salesforce_deleted(self, object_name: str, query: Dict[str, str],
+                            headers: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """Simula o recurso getDeleted (sobjects/<objeto>/deleted)"""
+        try:
+            start = self._parse_sf_datetime(query['start'])
+            end = self._parse_sf_datetime(query['end'])
+        except (KeyError, ValueError):
+            return 400, [{'errorCode': 'INVALID_REPLICATION_DATE'}], headers
+
+        deleted = [record for record in self.deleted.get(object_name, [])
+                   if start <= self._parse_sf_datetime(record['deletedDate']) <= end]
+        earliest = datetime.utcnow() - timedelta(days=30)
+        return 200, {
+            'deletedRecords': deleted,
+            'earliestDateAvailable': earliest.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+            'latestDateCovered': end.strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+        }, headers
+
+    def mutate(self, object_name: str = 'Opportunity', updates: int = 0, deletes: int = 0,
+               inserts: int = 0) -> Dict[str, int]:
+        """
+        Aplica alterações aleatórias a um dataset Salesforce para testar sincronização.
+
+        Args:
+            object_name: Objeto a alterar
+            updates: Registros a atualizar (novo Amount e SystemModstamp)
+            deletes: Registros a excluir (registrados para getDeleted)
+            inserts: Novos registros a criar
+
+        Returns:
+            Contagem de alterações aplicadas
+        """
+        rng = random.Random()
+        now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+        with self._lock:
+            rows = self.datasets[object_name]
+            for row in rng.sample(rows, min(updates, len(rows))):
+                row['Amount'] = round(rng.uniform(1000, 100000), 2)
+                row['SystemModstamp'] = now
+            for row in rng.sample(rows, min(deletes, len(rows))):
+                rows.remove(row)
+                self.deleted.setdefault(object_name, []).append({'id': row['Id'], 'deletedDate': now})
+            for i in range(inserts):
+                template = dict(rng.choice(rows))
+                template.update({'Id': f"006N{len(rows) + i:014d}", 'SystemModstamp': now})
+                rows.append(template)
+        return {'updates': updates, 'deletes': deletes, 'inserts': inserts}
+
+    def start(self) -> 'ERPSimulator':
+        """Inicia o servidor em uma thread de segundo plano"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="ERPSimulator", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Simulador ERP/CRM em {self.base_url} ({self.config.records} registros por dataset)")
+        return self
+
+    def stop(self):
+        """Encerra o servidor"""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'ERPSimulator':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Executa o simulador como processo independente"""
+    parser = argparse.ArgumentParser(description="Simulador local de ERP/CRM")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rps', type=float, default=None)
+    args = parser.parse_args()
+
+    config = SimulatorConfig(records=args.records, page_size=args.page_size, latency_ms=args.latency_ms,
+                             error_rate=args.error_rate, rate_limit_rps=args.rate_limit_rps)
+    simulator = ERPSimulator(config, args.host, args.port)
+    simulator.logger.info(f"Simulador ERP/CRM em {simulator.base_url}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        simulator.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,12 @@ import logging
 from dotenv import load_dotenv
 
 # Importar componentes da plataforma
-from langchain_project.security_system import SecurityManager, create_mock_users_db
+from langchain_project.security_system import SecurityManager, get_user_store
 from langchain_project.multi_tenancy import TenantManager, TenantConfig
 from langchain_project.data_connector import DataConnector
 from langchain_project.erp_crm_integration import IntegrationManager
 from langchain_project.analytics.predictive_analysis import PredictiveAnalysis
+from langchain_project.analytics.memoization import ResultCache
 
 # Importar componentes existentes
 from langchain_project.components.charts import create_dashboard
@@ -75,11 +76,11 @@ def initialize_components():
     # Inicializar conector de dados
     data_connector = DataConnector()
     
-    # Inicializar gerenciador de integrações
-    integration_manager = IntegrationManager()
+    # Inicializar gerenciador de integrações (com cache de fallback para quedas da fonte)
+    integration_manager = IntegrationManager(fallback_cache=True)
     
-    # Inicializar análise preditiva
-    predictive_analysis = PredictiveAnalysis()
+    # Inicializar análise preditiva (resultados memoizados entre reruns e sessões)
+    predictive_analysis = PredictiveAnalysis(result_cache=ResultCache())
     
     # Armazenar componentes na sessão
     st.session_state.security_manager = security_manager
@@ -88,8 +89,8 @@ def initialize_components():
     st.session_state.integration_manager = integration_manager
     st.session_state.predictive_analysis = predictive_analysis
     
-    # Carregar banco de usuários mockado (substituir por real em produção)
-    st.session_state.users_db = create_mock_users_db()
+    # Store de usuários compartilhado (populado com os usuários de demonstração uma única vez)
+    st.session_state.users_db = get_user_store()
     
     logger.info("Componentes inicializados")
     return True
@@ -257,9 +258,16 @@ def show_home_page():
             start_date = (datetime.now().replace(day=1) - pd.DateOffset(months=1)).strftime("%Y-%m-%d")
             end_date = datetime.now().strftime("%Y-%m-%d")
             
-            df = st.session_state.integration_manager.get_financial_data(
-                financial_integration, start_date, end_date
+            # Ler snapshot pré-aquecido pelo agendador; buscar no ERP apenas se ainda não existir
+            df = st.session_state.integration_manager.get_cached_dataset(
+                tenant_id, "financial", financial_integration, start_date, end_date
             )
+            if df is None:
+                df = st.session_state.integration_manager.get_financial_data(
+                    financial_integration, start_date, end_date, tenant_id=tenant_id
+                )
+                if df is not None and df.attrs.get('stale'):
+                    st.warning(f"{financial_integration} indisponível: exibindo os últimos dados em cache.")
             
             if df is not None and not df.empty:
                 # Usar dados reais
@@ -723,16 +731,10 @@ def show_config_page():
         # Lista de usuários existentes
         st.subheader("Usuários Ativos")
         
-        # Em um sistema real, obteríamos isso do banco de dados
-        # Aqui estamos usando o mock para demonstração
         users_db = st.session_state.users_db
         
-        # Filtrar usuários da empresa atual
-        company_users = {
-            username: user_data 
-            for username, user_data in users_db.items() 
-            if user_data.get("company_id") == tenant.tenant_id
-        }
+        # Usuários da empresa atual (consulta pelo índice de company_id)
+        company_users = users_db.list_by_company(tenant.tenant_id)
         
         if not company_users:
             st.info("Nenhum usuário encontrado para esta empresa.")
@@ -813,9 +815,7 @@ def show_config_page():
                                 new_permissions.append(perm)
                 
                 if st.button("Salvar Alterações"):
-                    # Em um sistema real, atualizaríamos o banco de dados
-                    # Aqui estamos atualizando o mock
-                    users_db[selected_user].update({
+                    users_db.update_user(selected_user, {
                         "full_name": new_fullname,
                         "email": new_email,
                         "role": new_role,
@@ -825,7 +825,7 @@ def show_config_page():
                     # Resetar senha se solicitado
                     if reset_password and new_password:
                         pass_hash, salt = st.session_state.security_manager._hash_password(new_password)
-                        users_db[selected_user].update({
+                        users_db.update_user(selected_user, {
                             "password_hash": pass_hash,
                             "salt": salt
                         })
@@ -873,7 +873,7 @@ def show_config_page():
                         user_id = str(uuid.uuid4())[:8]
                         
                         # Criar novo usuário
-                        users_db[username] = {
+                        users_db.add_user(username, {
                             "id": user_id,
                             "password_hash": pass_hash,
                             "salt": salt,
@@ -881,9 +881,8 @@ def show_config_page():
                             "full_name": fullname,
                             "role": role,
                             "company_id": tenant.tenant_id,
-                            "permissions": ["view_dashboard"],  # Permissões básicas
-                            "failed_attempts": 0
-                        }
+                            "permissions": ["view_dashboard"]  # Permissões básicas
+                        })
                         
                         st.success(f"Usuário {username} criado com sucesso!")
 
@@ -1,3 +1,10 @@
 from .security_manager import SecurityManager, create_mock_users_db
+from .permissions import PermissionRegistry
+from .user_store import UserStore, SQLiteUserStore, get_user_store
+from .lockout import LoginAttemptTracker, get_login_tracker
+from .revocation import TokenRevocationList, get_revocation_list
 
-__all__ = ['SecurityManager', 'create_mock_users_db']
+__all__ = ['SecurityManager', 'create_mock_users_db', 'PermissionRegistry',
+           'UserStore', 'SQLiteUserStore', 'get_user_store',
+           'LoginAttemptTracker', 'get_login_tracker',
+           'TokenRevocationList', 'get_revocation_list']
@@ -0,0 +1,313 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+
+class LoginAttemptTracker:
+    """
+    Contagem de tentativas de login com falha e bloqueio de contas.
+
+    O estado fica em um banco SQLite local em modo WAL, compartilhado pelas
+    sessões e pelos processos da mesma máquina. As falhas são contadas em
+    janela deslizante, dividida em baldes de tempo incrementados por upsert
+    atômico; baldes e bloqueios expirados são removidos periodicamente.
+    Contas bloqueadas ficam também em memória até o fim do bloqueio, de modo
+    que rajadas de tentativas contra elas não geram escritas nem leituras.
+    Apenas reset() encurta um bloqueio, e cada reset é registrado em um log
+    com sequência crescente: quando PRAGMA data_version indica gravações de
+    outra conexão, só os usuários com reset novo no log saem da cópia em
+    memória. Se o banco não puder ser consultado ou atualizado, a conta é
+    tratada como bloqueada.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, window_minutes: float = 15,
+                 buckets: int = 15, purge_interval_seconds: float = 60):
+        """
+        Inicializa o controle de tentativas.
+
+        Args:
+            db_path: Caminho do banco (padrão: data/login_attempts.db)
+            window_minutes: Janela deslizante de contagem das falhas
+            buckets: Número de baldes em que a janela é dividida
+            purge_interval_seconds: Intervalo mínimo entre limpezas de registros expirados
+        """
+        self.logger = self._setup_logger()
+        self.db_path = db_path or os.path.join(os.getcwd(), 'data', 'login_attempts.db')
+        self.window_seconds = window_minutes * 60
+        self.bucket_seconds = self.window_seconds / buckets
+        self.purge_interval_seconds = purge_interval_seconds
+        self._local = threading.local()
+        self._locked: Dict[str, float] = {}
+        self._reset_seq = 0
+        self._sync_lock = threading.Lock()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+        self._reset_seq = self._connection().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM login_resets"
+        ).fetchone()[0]
+
+    def _setup_logger(self):
+        """Configura o logger para o controle de tentativas de login"""
+        logger = logging.getLogger("LoginAttemptTracker")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (transações controladas explicitamente)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return conn
+
+    def _sync_local_locks(self):
+        """Descarta da memória os bloqueios de usuários com reset registrado por outra conexão"""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._local.data_version:
+            return
+        self._local.data_version = version
+        with self._sync_lock:
+            rows = conn.execute(
+                "SELECT seq, username FROM login_resets WHERE seq > ? ORDER BY seq", (self._reset_seq,)
+            ).fetchall()
+            for seq, username in rows:
+                self._locked.pop(username, None)
+                self._reset_seq = seq
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS login_attempts ("
+            " username TEXT NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " PRIMARY KEY (username, bucket)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS login_lockouts ("
+            " username TEXT PRIMARY KEY,"
+            " locked_until REAL NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS login_resets ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " username TEXT NOT NULL,"
+            " reset_at REAL NOT NULL)"
+        )
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _first_bucket(self, now: float) -> int:
+        """Primeiro balde ainda dentro da janela deslizante"""
+        return self._bucket(now - self.window_seconds) + 1
+
+    def locked_until(self, username: str) -> Optional[float]:
+        """
+        Verifica se a conta está bloqueada.
+
+        Args:
+            username: Nome de usuário
+
+        Returns:
+            Fim do bloqueio (timestamp Unix), infinito se o banco não puder ser
+            consultado, ou None se não bloqueada
+        """
+        now = time.time()
+        try:
+            self._sync_local_locks()
+            cached = self._locked.get(username)
+            if cached is not None:
+                if cached > now:
+                    return cached
+                self._locked.pop(username, None)
+
+            row = self._connection().execute(
+                "SELECT locked_until FROM login_lockouts WHERE username = ? AND locked_until > ?",
+                (username, now)
+            ).fetchone()
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar bloqueio de {username}: {str(e)}")
+            return math.inf
+        if row is None:
+            return None
+        self._locked[username] = row[0]
+        return row[0]
+
+    def failed_attempts(self, username: str) -> int:
+        """
+        Número de falhas dentro da janela deslizante.
+
+        Args:
+            username: Nome de usuário
+
+        Returns:
+            Número de tentativas com falha
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(attempts), 0) FROM login_attempts WHERE username = ? AND bucket >= ?",
+                (username, self._first_bucket(time.time()))
+            ).fetchone()
+            return row[0]
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar tentativas de {username}: {str(e)}")
+            return 0
+
+    def record_failure(self, username: str, max_attempts: int,
+                       lockout_seconds: float) -> Tuple[int, Optional[float]]:
+        """
+        Registra uma tentativa com falha e bloqueia a conta ao atingir o limite.
+
+        Args:
+            username: Nome de usuário
+            max_attempts: Falhas permitidas dentro da janela
+            lockout_seconds: Duração do bloqueio
+
+        Returns:
+            Tupla (falhas na janela, fim do bloqueio ou None); se o banco não
+            puder ser atualizado, (max_attempts, infinito)
+        """
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO login_attempts (username, bucket, attempts) VALUES (?, ?, 1)"
+                    " ON CONFLICT (username, bucket) DO UPDATE SET attempts = attempts + 1",
+                    (username, self._bucket(now))
+                )
+                attempts = conn.execute(
+                    "SELECT SUM(attempts) FROM login_attempts WHERE username = ? AND bucket >= ?",
+                    (username, self._first_bucket(now))
+                ).fetchone()[0]
+
+                locked_until = None
+                if attempts >= max_attempts:
+                    locked_until = now + lockout_seconds
+                    conn.execute(
+                        "INSERT INTO login_lockouts (username, locked_until) VALUES (?, ?)"
+                        " ON CONFLICT (username) DO UPDATE SET locked_until = excluded.locked_until",
+                        (username, locked_until)
+                    )
+                    # A contagem recomeça quando o bloqueio expira
+                    conn.execute("DELETE FROM login_attempts WHERE username = ?", (username,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar tentativa de login de {username}: {str(e)}")
+            return max_attempts, math.inf
+
+        if locked_until is not None:
+            self._locked[username] = locked_until
+        if now - self._last_purge > self.purge_interval_seconds:
+            self.purge_expired()
+        return attempts, locked_until
+
+    def reset(self, username: str) -> bool:
+        """
+        Remove falhas e bloqueio de uma conta (após login bem-sucedido).
+
+        Sem falhas nem bloqueio registrados, nada é gravado.
+
+        Args:
+            username: Nome de usuário
+
+        Returns:
+            True se removido com sucesso
+        """
+        self._locked.pop(username, None)
+        conn = self._connection()
+        try:
+            pending = conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM login_attempts WHERE username = ?)"
+                " OR EXISTS (SELECT 1 FROM login_lockouts WHERE username = ?)",
+                (username, username)
+            ).fetchone()[0]
+            if not pending:
+                return True
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM login_attempts WHERE username = ?", (username,))
+            conn.execute("DELETE FROM login_lockouts WHERE username = ?", (username,))
+            # Avisa os demais processos para descartarem o bloqueio em memória
+            conn.execute("INSERT INTO login_resets (username, reset_at) VALUES (?, ?)",
+                         (username, time.time()))
+            conn.execute("COMMIT")
+            return True
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.logger.error(f"Erro ao limpar tentativas de {username}: {str(e)}")
+            return False
+
+    def purge_expired(self) -> bool:
+        """
+        Remove baldes fora da janela, bloqueios expirados e resets antigos.
+
+        Resets ficam no log pela janela de contagem; um processo que não
+        consultar o banco por mais tempo mantém o bloqueio em memória até o
+        seu fim.
+
+        Returns:
+            True se a limpeza foi concluída
+        """
+        now = time.time()
+        self._last_purge = now
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM login_attempts WHERE bucket < ?", (self._first_bucket(now),))
+            conn.execute("DELETE FROM login_lockouts WHERE locked_until <= ?", (now,))
+            conn.execute("DELETE FROM login_resets WHERE reset_at < ?", (now - self.window_seconds,))
+            conn.execute("COMMIT")
+            return True
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.logger.error(f"Erro ao limpar tentativas expiradas: {str(e)}")
+            return False
+
+
+# Controles compartilhados pelo processo, por caminho do banco
+_trackers: Dict[str, LoginAttemptTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_login_tracker(db_path: Optional[str] = None, window_minutes: float = 15) -> LoginAttemptTracker:
+    """
+    Obtém o controle de tentativas de login compartilhado pelo processo.
+
+    Args:
+        db_path: Caminho do banco (padrão: data/login_attempts.db)
+        window_minutes: Janela deslizante de contagem das falhas
+
+    Returns:
+        Controle de tentativas
+    """
+    path = os.path.abspath(db_path or os.path.join(os.getcwd(), 'data', 'login_attempts.db'))
+    with _trackers_lock:
+        tracker = _trackers.get(path)
+        if tracker is None:
+            tracker = LoginAttemptTracker(path, window_minutes=window_minutes)
+            _trackers[path] = tracker
+        return tracker
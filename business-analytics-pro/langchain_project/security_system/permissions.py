@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, Optional, List, Iterable
+
+# Permissão curinga: o bit 0 concede todas as permissões
+ALL_PERMISSIONS = "all"
+
+DEFAULT_GROUPS = {
+    "dashboard": ["view_dashboard", "edit_dashboard"],
+    "financial": ["view_financial", "edit_financial"],
+    "commercial": ["view_commercial", "edit_commercial"],
+    "operational": ["view_operational", "edit_operational"],
+    "general": ["upload_files", "export_data"]
+}
+
+DEFAULT_ROLES = {
+    "user": {"permissions": ["view_dashboard"]},
+    "analyst": {"inherits": ["user"], "permissions": ["view_financial", "edit_financial"]},
+    "manager": {"inherits": ["user"], "permissions": ["view_financial", "view_commercial",
+                                                      "edit_commercial", "view_operational"]},
+    "admin": {"permissions": [ALL_PERMISSIONS]}
+}
+
+
+class PermissionRegistry:
+    """
+    Registro de permissões com papéis pré-compilados em máscaras de bits.
+
+    Cada nome de permissão recebe uma posição de bit; grupos e papéis
+    (com herança) são compilados em uma máscara inteira, e a verificação de
+    uma permissão é um teste de bit. As permissões citadas nas definições
+    ocupam posições em ordem alfabética e a versão é um hash apenas das
+    definições, de modo que processos com as mesmas definições concordam
+    nas máscaras dos papéis. Permissões individuais fora das definições
+    recebem posições locais ao processo; as máscaras são calculadas no
+    processo que verifica e não são transportadas em tokens.
+    """
+
+    def __init__(self):
+        """Inicializa um registro vazio (apenas a permissão curinga)"""
+        self.logger = self._setup_logger()
+        self._lock = threading.RLock()
+        self._bits: Dict[str, int] = {ALL_PERMISSIONS: 0}
+        self._groups: Dict[str, Dict[str, List[str]]] = {}
+        self._roles: Dict[str, Dict[str, List[str]]] = {}
+        self._compiled: Dict[str, int] = {}
+        self._version: Optional[str] = None
+
+    def _setup_logger(self):
+        """Configura o logger para o registro de permissões"""
+        logger = logging.getLogger("PermissionRegistry")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    @classmethod
+    def with_defaults(cls) -> 'PermissionRegistry':
+        """Cria um registro com os grupos e papéis padrão da aplicação"""
+        registry = cls()
+        for name, permissions in DEFAULT_GROUPS.items():
+            registry.define_group(name, permissions)
+        for name, definition in DEFAULT_ROLES.items():
+            registry.define_role(name, **definition)
+        return registry
+
+    @property
+    def version(self) -> str:
+        """Hash curto das definições de grupos e papéis"""
+        with self._lock:
+            if self._version is None:
+                content = json.dumps([self._groups, self._roles], sort_keys=True)
+                self._version = hashlib.sha256(content.encode()).hexdigest()[:12]
+            return self._version
+
+    def _changed(self):
+        """Reatribui as posições de bits após alterar as definições"""
+        defined = sorted({permission
+                          for definition in (*self._groups.values(), *self._roles.values())
+                          for permission in definition["permissions"]} - {ALL_PERMISSIONS})
+        extra = [permission for permission in self._bits
+                 if permission != ALL_PERMISSIONS and permission not in defined]
+        bits = {ALL_PERMISSIONS: 0}
+        for permission in defined + extra:
+            bits[permission] = len(bits)
+        self._bits = bits
+        self._compiled.clear()
+        self._version = None
+
+    def intern(self, permission: str) -> int:
+        """
+        Obtém (ou atribui) a posição de bit de uma permissão.
+
+        Args:
+            permission: Nome da permissão
+
+        Returns:
+            Posição do bit
+        """
+        bit = self._bits.get(permission)
+        if bit is not None:
+            return bit
+        with self._lock:
+            if permission not in self._bits:
+                self._bits[permission] = len(self._bits)
+            return self._bits[permission]
+
+    def define_group(self, name: str, permissions: Iterable[str], inherits: Iterable[str] = ()):
+        """
+        Define um grupo de permissões.
+
+        Args:
+            name: Nome do grupo
+            permissions: Permissões do grupo
+            inherits: Grupos cujas permissões são incluídas
+        """
+        with self._lock:
+            self._groups[name] = {"permissions": list(permissions), "inherits": list(inherits)}
+            self._changed()
+
+    def define_role(self, name: str, permissions: Iterable[str] = (), groups: Iterable[str] = (),
+                    inherits: Iterable[str] = ()):
+        """
+        Define um papel.
+
+        Args:
+            name: Nome do papel
+            permissions: Permissões concedidas diretamente
+            groups: Grupos de permissões concedidos
+            inherits: Papéis cujas permissões são herdadas
+        """
+        with self._lock:
+            self._roles[name] = {"permissions": list(permissions), "groups": list(groups),
+                                 "inherits": list(inherits)}
+            self._changed()
+
+    def _compile(self, kind: str, name: str, visiting: frozenset) -> int:
+        """Compila um grupo ou papel (e suas heranças) em uma máscara"""
+        definitions = self._roles if kind == "role" else self._groups
+        if name not in definitions:
+            raise ValueError(f"{'Papel' if kind == 'role' else 'Grupo'} não definido: {name}")
+        if (kind, name) in visiting:
+            raise ValueError(f"Herança circular de permissões em: {name}")
+        visiting = visiting | {(kind, name)}
+
+        definition = definitions[name]
+        mask = self.mask(definition["permissions"])
+        for group in definition.get("groups", []):
+            mask |= self._compile("group", group, visiting)
+        for parent in definition["inherits"]:
+            mask |= self._compile(kind, parent, visiting)
+        return mask
+
+    def role_mask(self, role: str) -> int:
+        """
+        Máscara pré-compilada de um papel.
+
+        Args:
+            role: Nome do papel
+
+        Returns:
+            Máscara de bits (0 para papel desconhecido)
+        """
+        mask = self._compiled.get(role)
+        if mask is not None:
+            return mask
+        with self._lock:
+            try:
+                mask = self._compile("role", role, frozenset())
+            except ValueError as e:
+                self.logger.warning(str(e))
+                mask = 0
+            self._compiled[role] = mask
+            return mask
+
+    def mask(self, permissions: Iterable[str]) -> int:
+        """Máscara de uma lista de permissões"""
+        mask = 0
+        for permission in permissions:
+            mask |= 1 << self.intern(permission)
+        return mask
+
+    def user_mask(self, role: str, permissions: Optional[Iterable[str]] = None) -> int:
+        """
+        Máscara efetiva de um usuário.
+
+        A lista individual, quando presente, é autoritativa (é a que o admin
+        edita): do papel vale apenas o curinga, de modo que admin continua
+        com todas as permissões e remover uma permissão da lista a revoga.
+        Sem lista, vale a máscara pré-compilada do papel.
+
+        Args:
+            role: Papel do usuário
+            permissions: Permissões atribuídas ao usuário (None para usar o papel)
+
+        Returns:
+            Máscara de bits
+        """
+        if permissions is None:
+            return self.role_mask(role)
+        return (self.role_mask(role) & 1) | self.mask(permissions)
+
+    def has(self, mask: int, permission: str) -> bool:
+        """
+        Verifica uma permissão em uma máscara (teste de bit).
+
+        Args:
+            mask: Máscara do usuário
+            permission: Permissão necessária
+
+        Returns:
+            Booleano indicando se tem permissão
+        """
+        if mask & 1:
+            return True
+        bit = self._bits.get(permission)
+        return bit is not None and bool(mask >> bit & 1)
+
+    def names(self, mask: int) -> List[str]:
+        """Nomes das permissões presentes em uma máscara"""
+        return [name for name, bit in self._bits.items() if mask >> bit & 1]
+
+
+# Registro compartilhado pelo processo (papéis padrão)
+_default_registry = PermissionRegistry.with_defaults()
@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+
+class TokenRevocationList:
+    """
+    Lista de tokens revogados compartilhada pelos processos da mesma máquina.
+
+    As revogações ficam em um banco SQLite local em modo WAL, identificadas
+    pelo SHA-256 do token e mantidas até o exp do token. Cada processo guarda
+    uma cópia em memória das revogações vigentes e só a recarrega quando
+    PRAGMA data_version indica que outra conexão gravou no banco, de modo
+    que a verificação a cada renderização não consulta a tabela. Se o banco
+    não puder ser consultado, o token é tratado como revogado.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, purge_interval_seconds: float = 300):
+        """
+        Inicializa a lista de revogação.
+
+        Args:
+            db_path: Caminho do banco (padrão: data/revoked_tokens.db)
+            purge_interval_seconds: Intervalo mínimo entre limpezas de revogações expiradas
+        """
+        self.logger = self._setup_logger()
+        self.db_path = db_path or os.path.join(os.getcwd(), 'data', 'revoked_tokens.db')
+        self.purge_interval_seconds = purge_interval_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, float] = {}
+        self._loaded_version: Optional[int] = None
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+    def _setup_logger(self):
+        """Configura o logger para a lista de revogação de tokens"""
+        logger = logging.getLogger("TokenRevocationList")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (transações controladas explicitamente)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.data_version = None
+        return conn
+
+    def _create_schema(self):
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+            " digest TEXT PRIMARY KEY,"
+            " expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _refresh(self, now: float):
+        """Recarrega as revogações vigentes se outra conexão gravou no banco"""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._local.data_version:
+            return
+        rows = conn.execute(
+            "SELECT digest, expires_at FROM revoked_tokens WHERE expires_at > ?", (now,)
+        ).fetchall()
+        with self._lock:
+            self._revoked = dict(rows)
+        self._local.data_version = version
+
+    def is_revoked(self, digest: str) -> bool:
+        """
+        Verifica se um token foi revogado.
+
+        Args:
+            digest: SHA-256 do token
+
+        Returns:
+            True se revogado e ainda não expirado, ou se o banco não puder ser consultado
+        """
+        now = time.time()
+        try:
+            self._refresh(now)
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar tokens revogados: {str(e)}")
+            return True
+        with self._lock:
+            expires_at = self._revoked.get(digest)
+            if expires_at is not None and expires_at <= now:
+                del self._revoked[digest]
+                return False
+            return expires_at is not None
+
+    def revoke(self, digest: str, expires_at: float) -> bool:
+        """
+        Revoga um token até o seu exp.
+
+        Args:
+            digest: SHA-256 do token
+            expires_at: exp do token (timestamp Unix)
+
+        Returns:
+            True se registrado com sucesso
+        """
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT INTO revoked_tokens (digest, expires_at) VALUES (?, ?)"
+                " ON CONFLICT (digest) DO UPDATE SET expires_at = excluded.expires_at",
+                (digest, expires_at)
+            )
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar token revogado: {str(e)}")
+            return False
+
+        # A própria escrita não altera data_version desta conexão
+        with self._lock:
+            self._revoked[digest] = expires_at
+        if now - self._last_purge > self.purge_interval_seconds:
+            self.purge_expired()
+        return True
+
+    def purge_expired(self) -> bool:
+        """
+        Remove revogações de tokens já expirados.
+
+        Returns:
+            True se a limpeza foi concluída
+        """
+        now = time.time()
+        self._last_purge = now
+        try:
+            self._connection().execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+        except Exception as e:
+            self.logger.error(f"Erro ao limpar tokens revogados expirados: {str(e)}")
+            return False
+        with self._lock:
+            self._revoked = {d: e for d, e in self._revoked.items() if e > now}
+        return True
+
+
+# Listas compartilhadas pelo processo, por caminho do banco
+_revocation_lists: Dict[str, TokenRevocationList] = {}
+_revocation_lists_lock = threading.Lock()
+
+
+def get_revocation_list(db_path: Optional[str] = None) -> TokenRevocationList:
+    """
+    Obtém a lista de revogação de tokens compartilhada pelo processo.
+
+    Args:
+        db_path: Caminho do banco (padrão: data/revoked_tokens.db)
+
+    Returns:
+        Lista de revogação
+    """
+    path = os.path.abspath(db_path or os.path.join(os.getcwd(), 'data', 'revoked_tokens.db'))
+    with _revocation_lists_lock:
+        revocation_list = _revocation_lists.get(path)
+        if revocation_list is None:
+            revocation_list = TokenRevocationList(path)
+            _revocation_lists[path] = revocation_list
+        return revocation_list
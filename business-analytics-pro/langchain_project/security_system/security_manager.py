@@ -7,8 +7,16 @@ import datetime
 from typing import Dict, Any, Optional, List, Union, Tuple
 import logging
 import json
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
+from .permissions import PermissionRegistry, _default_registry
+from .lockout import LoginAttemptTracker, get_login_tracker
+from .revocation import TokenRevocationList, get_revocation_list
+from .user_store import UserRecord
+
 @dataclass
 class User:
     id: str
@@ -19,22 +27,112 @@ class User:
     company_id: str
     permissions: List[str]
     last_login: Optional[datetime.datetime] = None
+    permission_mask: Optional[int] = None
+    # Versão do registro, papel e permissões usados no cálculo de permission_mask
+    permission_key: Optional[Tuple[str, str, Optional[Tuple[str, ...]]]] = None
+    
+class _VerifiedTokenCache:
+    """
+    Cache LRU de tokens já validados, compartilhado por todas as sessões do processo.
     
+    A chave é o SHA-256 do segredo e do token, de modo que o token não fica
+    em memória e uma troca de segredo invalida todas as entradas. Cada
+    entrada expira no exp do token (ou antes, em max_ttl segundos). As
+    revogações ficam na TokenRevocationList, compartilhada entre processos.
+    """
+    
+    def __init__(self, max_entries: int = 10000, max_ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+    @staticmethod
+    def token_digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+        
+    @staticmethod
+    def cache_key(secret: str, token: str) -> str:
+        return hashlib.sha256(f"{secret}\x00{token}".encode()).hexdigest()
+        
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+            
+    def put(self, key: str, payload: Dict[str, Any]):
+        expires_at = min(float(payload.get('exp', 0)), time.time() + self.max_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Caches compartilhados pelo processo, um por configuração (tamanho, ttl)
+_token_caches: Dict[Tuple[int, float], _VerifiedTokenCache] = {}
+_token_caches_lock = threading.Lock()
+
+
+def _get_token_cache(max_entries: int = 10000, max_ttl: float = 300.0) -> _VerifiedTokenCache:
+    """Cache de tokens compartilhado pelos gerenciadores com a mesma configuração"""
+    with _token_caches_lock:
+        cache = _token_caches.get((max_entries, max_ttl))
+        if cache is None:
+            cache = _token_caches[(max_entries, max_ttl)] = _VerifiedTokenCache(max_entries, max_ttl)
+        return cache
+
+
 class SecurityManager:
     """
     Gerenciador de segurança para controle de autenticação e autorização.
     """
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None,
+                 permission_registry: Optional[PermissionRegistry] = None,
+                 login_tracker: Optional[LoginAttemptTracker] = None,
+                 revocation_list: Optional[TokenRevocationList] = None):
         """
         Inicializa o gerenciador de segurança.
         
         Args:
             config_path: Caminho para o arquivo de configuração (opcional)
+            permission_registry: Registro de papéis e permissões (padrão: compartilhado)
+            login_tracker: Controle de tentativas de login (padrão: compartilhado em data/)
+            revocation_list: Lista de tokens revogados (padrão: compartilhada em data/)
         """
         self.logger = self._setup_logger()
         self.config = self._load_config(config_path)
         self._init_jwt_secret()
+        self.permissions = permission_registry or _default_registry
+        self.login_tracker = login_tracker or get_login_tracker(
+            window_minutes=self.config.get('login_attempt_window_minutes', 15)
+        )
+        self.revocation_list = revocation_list or get_revocation_list()
+        # Gerenciadores com configurações diferentes não compartilham o cache
+        self.token_cache = _get_token_cache(self.config.get('token_cache_size', 10000),
+                                            self.config.get('token_cache_ttl_seconds', 300.0))
         
     def _setup_logger(self):
         """Configura o logger para o gerenciador de segurança"""
@@ -211,6 +309,9 @@ class SecurityManager:
         """
         Valida token JWT.
         
+        Tokens já validados são servidos do cache compartilhado até o seu
+        exp, sem repetir a verificação HS256 a cada renderização.
+        
         Args:
             token: Token JWT a ser validado
             
@@ -221,11 +322,23 @@ class SecurityManager:
         if not jwt_secret:
             self.logger.error("Segredo JWT não encontrado")
             return False, None
+        if not token:
+            return False, None
+            
+        if self.revocation_list.is_revoked(self.token_cache.token_digest(token)):
+            self.logger.warning("Token revogado")
+            return False, None
+            
+        key = self.token_cache.cache_key(jwt_secret, token)
+        payload = self.token_cache.get(key)
+        if payload is not None:
+            return True, dict(payload)
             
         try:
             # Decodificar e validar token
             payload = jwt.decode(token, jwt_secret, algorithms=["HS256"])
-            return True, payload
+            self.token_cache.put(key, payload)
+            return True, dict(payload)
         except jwt.ExpiredSignatureError:
             self.logger.warning("Token expirado")
             return False, None
@@ -233,6 +346,35 @@ class SecurityManager:
             self.logger.warning(f"Token inválido: {str(e)}")
             return False, None
             
+    def revoke_token(self, token: str) -> bool:
+        """
+        Revoga um token antes da expiração (ex: no logout), em todos os processos.
+        
+        Args:
+            token: Token JWT a ser revogado
+            
+        Returns:
+            True se o token foi revogado
+        """
+        jwt_secret = os.environ.get("JWT_SECRET")
+        if not token or not jwt_secret:
+            return False
+            
+        try:
+            # Assinatura verificada, mas sem exigir validade: tokens expirados já são recusados
+            payload = jwt.decode(token, jwt_secret, algorithms=["HS256"],
+                                 options={"verify_exp": False})
+        except jwt.InvalidTokenError as e:
+            self.logger.warning(f"Revogação de token inválido: {str(e)}")
+            return False
+            
+        self.token_cache.invalidate(self.token_cache.cache_key(jwt_secret, token))
+        if not self.revocation_list.revoke(self.token_cache.token_digest(token),
+                                           float(payload.get('exp', time.time()))):
+            return False
+        self.logger.info(f"Token revogado para usuário: {payload.get('username')}")
+        return True
+            
     def login_user(self, username: str, password: str, users_db) -> Tuple[bool, Optional[str], Optional[User]]:
         """
         Autentica um usuário.
@@ -253,16 +395,10 @@ class SecurityManager:
                 
             user_data = users_db[username]
             
-            # Verificar bloqueio por excesso de tentativas
-            if 'locked_until' in user_data:
-                locked_until = datetime.datetime.fromisoformat(user_data['locked_until'])
-                if datetime.datetime.now() < locked_until:
-                    self.logger.warning(f"Tentativa de login em conta bloqueada: {username}")
-                    return False, None, None
-                else:
-                    # Reset do contador de tentativas após expiração do bloqueio
-                    if 'failed_attempts' in user_data:
-                        user_data['failed_attempts'] = 0
+            # Verificar bloqueio por excesso de tentativas (estado compartilhado entre sessões)
+            if self.login_tracker.locked_until(username) is not None:
+                self.logger.warning(f"Tentativa de login em conta bloqueada: {username}")
+                return False, None, None
             
             # Verificar senha
             stored_hash = user_data['password_hash']
@@ -271,24 +407,20 @@ class SecurityManager:
             input_hash, _ = self._hash_password(password, stored_salt)
             
             if input_hash != stored_hash:
-                # Incrementar contador de tentativas falhas
-                user_data['failed_attempts'] = user_data.get('failed_attempts', 0) + 1
-                
-                # Verificar se deve bloquear a conta
-                if user_data['failed_attempts'] >= self.config['max_login_attempts']:
-                    lockout_until = datetime.datetime.now() + datetime.timedelta(
-                        minutes=self.config['lockout_duration_minutes']
-                    )
-                    user_data['locked_until'] = lockout_until.isoformat()
+                # Incrementar contador de tentativas falhas e bloquear a conta ao atingir o limite
+                _, locked_until = self.login_tracker.record_failure(
+                    username,
+                    self.config['max_login_attempts'],
+                    self.config['lockout_duration_minutes'] * 60
+                )
+                if locked_until is not None:
                     self.logger.warning(f"Conta bloqueada por excesso de tentativas: {username}")
                 
                 self.logger.warning(f"Tentativa de login com senha incorreta: {username}")
                 return False, None, None
                 
             # Reset do contador de tentativas após login bem-sucedido
-            user_data['failed_attempts'] = 0
-            if 'locked_until' in user_data:
-                del user_data['locked_until']
+            self.login_tracker.reset(username)
                 
             # Criar objeto do usuário
             user = User(
@@ -302,16 +434,17 @@ class SecurityManager:
                 last_login=datetime.datetime.now()
             )
             
-            # Atualizar timestamp de último login
+            # Atualizar timestamp de último login (uma única escrita no store)
             user_data['last_login'] = user.last_login.isoformat()
+            if isinstance(user_data, UserRecord):
+                user_data.save()
             
-            # Gerar token JWT
+            # Gerar token JWT (permissões são verificadas no registro atual do usuário, não no token)
             token = self.generate_token(
                 user_id=user.id,
                 username=user.username,
                 role=user.role,
-                company_id=user.company_id,
-                extra_data={"permissions": user.permissions}
+                company_id=user.company_id
             )
             
             self.logger.info(f"Login bem-sucedido: {username}")
@@ -325,6 +458,10 @@ class SecurityManager:
         """
         Verifica se o usuário tem permissão específica.
         
+        A máscara do usuário (ver PermissionRegistry.user_mask) fica no
+        objeto e a verificação é um teste de bit; ela é recalculada quando o
+        papel, as permissões do usuário ou as definições do registro mudam.
+        
         Args:
             user: Objeto do usuário
             required_permission: Permissão necessária
@@ -332,12 +469,40 @@ class SecurityManager:
         Returns:
             Booleano indicando se tem permissão
         """
-        # Admin tem todas as permissões
-        if user.role == "admin":
-            return True
+        permissions = None if user.permissions is None else tuple(user.permissions)
+        key = (self.permissions.version, user.role, permissions)
+        if user.permission_mask is None or user.permission_key != key:
+            user.permission_mask = self.permissions.user_mask(user.role, user.permissions)
+            user.permission_key = key
+            
+        # Papel admin e a permissão "all" ativam o bit curinga
+        return self.permissions.has(user.permission_mask, required_permission)
+    
+    def refresh_user(self, user: User, users_db) -> bool:
+        """
+        Atualiza papel e permissões do usuário da sessão a partir do store.
+        
+        Chamado a cada renderização, de modo que alterações feitas pelo admin
+        valem sem novo login; a leitura é servida pelo cache do store.
+        
+        Args:
+            user: Objeto do usuário da sessão
+            users_db: Banco de dados de usuários
             
-        # Verificar na lista de permissões do usuário
-        return required_permission in user.permissions
+        Returns:
+            False se o usuário não existe mais
+        """
+        try:
+            user_data = users_db.get(user.username)
+            if user_data is None:
+                self.logger.warning(f"Usuário da sessão removido: {user.username}")
+                return False
+            user.role = user_data['role']
+            user.permissions = user_data.get('permissions')
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar usuário da sessão: {str(e)}")
+            return False
     
     def init_streamlit_auth(self):
         """
@@ -364,6 +529,9 @@ class SecurityManager:
         
         # Se já autenticado, não mostrar o formulário
         if st.session_state.authenticated:
+            if not self.refresh_user(st.session_state.user, users_db):
+                self.streamlit_logout()
+                return False
             return True
             
         # Título e layout do formulário
@@ -395,11 +563,12 @@ class SecurityManager:
                         st.experimental_rerun()
                         return True
                     else:
-                        if username in users_db and 'failed_attempts' in users_db[username]:
-                            attempts = users_db[username]['failed_attempts']
+                        if username in users_db:
+                            locked = self.login_tracker.locked_until(username) is not None
+                            attempts = self.login_tracker.failed_attempts(username)
                             remaining = self.config['max_login_attempts'] - attempts
                             
-                            if remaining > 0:
+                            if not locked and remaining > 0:
                                 st.error(f"Credenciais inválidas. Tentativas restantes: {remaining}")
                             else:
                                 st.error("Conta bloqueada por excesso de tentativas. Tente novamente mais tarde.")
@@ -414,6 +583,9 @@ class SecurityManager:
         """
         Realiza logout do usuário na sessão do Streamlit.
         """
+        if st.session_state.get('token'):
+            self.revoke_token(st.session_state.token)
+            
         if 'user' in st.session_state:
             del st.session_state.user
         if 'token' in st.session_state:
@@ -444,13 +616,14 @@ class SecurityManager:
             
         # Verificar validade do token
         token = st.session_state.token
-        is_valid, _ = self.validate_token(token)
+        is_valid, payload = self.validate_token(token)
         
         if not is_valid:
             st.error("🔒 Sessão expirada. Faça login novamente.")
             self.streamlit_logout()
             return False
             
+        st.session_state.token_payload = payload
         return True
     
     def streamlit_require_permission(self, permission: str):
@@ -491,8 +664,7 @@ def create_mock_users_db():
         "full_name": "Administrador do Sistema",
         "role": "admin",
         "company_id": "001",
-        "permissions": ["all"],
-        "failed_attempts": 0
+        "permissions": ["all"]
     }
     
     # Gerente
@@ -505,8 +677,7 @@ def create_mock_users_db():
         "full_name": "Gerente Comercial",
         "role": "manager",
         "company_id": "001",
-        "permissions": ["view_dashboard", "view_financial", "view_commercial", "edit_commercial", "view_operational"],
-        "failed_attempts": 0
+        "permissions": ["view_dashboard", "view_financial", "view_commercial", "edit_commercial", "view_operational"]
     }
     
     # Analista
@@ -519,8 +690,7 @@ def create_mock_users_db():
         "full_name": "Analista Financeiro",
         "role": "analyst",
         "company_id": "001",
-        "permissions": ["view_dashboard", "view_financial", "edit_financial"],
-        "failed_attempts": 0
+        "permissions": ["view_dashboard", "view_financial", "edit_financial"]
     }
     
     return users
@@ -0,0 +1,504 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+# Campos com coluna própria (indexados); os demais ficam no JSON de dados
+_INDEXED_FIELDS = ("id", "email", "company_id")
+
+
+class UserRecord(dict):
+    """
+    Registro de usuário retornado pelo store.
+
+    Comporta-se como o dicionário do antigo users_db. As alterações ficam
+    no registro até save(), que as grava no store em uma única escrita.
+    """
+
+    def __init__(self, store: 'UserStore', username: str, data: Dict[str, Any]):
+        super().__init__(data)
+        self._store = store
+        self._username = username
+        self._changes: Dict[str, Any] = {}
+        self._removed = False
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changes[key] = value
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._removed = True
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        self._changes.update(changes)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._removed = True
+        return super().pop(key, *default)
+
+    def save(self) -> bool:
+        """
+        Grava as alterações pendentes no store.
+
+        Returns:
+            True se gravado (ou sem alterações pendentes)
+        """
+        if self._removed:
+            saved = self._store.replace_user(self._username, dict(self))
+        elif self._changes:
+            saved = self._store.update_user(self._username, self._changes)
+        else:
+            return True
+        if saved:
+            self._changes = {}
+            self._removed = False
+        return saved
+
+
+class UserStore(ABC):
+    """
+    Interface de armazenamento de usuários.
+
+    Oferece acesso compatível com o dicionário users_db (users_db[username],
+    username in users_db, items()) sobre as operações abstratas abaixo,
+    implementadas pelos backends.
+    """
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """Dados de um usuário ou None se não existir"""
+
+    @abstractmethod
+    def get_by_email(self, email: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Tupla (username, dados) do usuário com o e-mail ou None"""
+
+    @abstractmethod
+    def add_user(self, username: str, data: Dict[str, Any]) -> bool:
+        """Adiciona um usuário; False se já existir"""
+
+    @abstractmethod
+    def update_user(self, username: str, changes: Dict[str, Any]) -> bool:
+        """Atualiza campos de um usuário; False se não existir"""
+
+    @abstractmethod
+    def replace_user(self, username: str, data: Dict[str, Any]) -> bool:
+        """Cria ou substitui todos os dados de um usuário"""
+
+    @abstractmethod
+    def delete_user(self, username: str) -> bool:
+        """Remove um usuário; False se não existir"""
+
+    @abstractmethod
+    def list_by_company(self, company_id: str) -> Dict[str, Dict[str, Any]]:
+        """Usuários de uma empresa (username -> dados)"""
+
+    @abstractmethod
+    def usernames(self) -> List[str]:
+        """Nomes de usuário cadastrados"""
+
+    def __getitem__(self, username: str) -> UserRecord:
+        data = self.get_user(username)
+        if data is None:
+            raise KeyError(username)
+        return UserRecord(self, username, data)
+
+    def __setitem__(self, username: str, data: Dict[str, Any]):
+        if not self.replace_user(username, data):
+            raise ValueError(f"Não foi possível salvar o usuário: {username}")
+
+    def __delitem__(self, username: str):
+        if not self.delete_user(username):
+            raise KeyError(username)
+
+    def __contains__(self, username) -> bool:
+        return isinstance(username, str) and self.get_user(username) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.usernames())
+
+    def __len__(self) -> int:
+        return len(self.usernames())
+
+    def get(self, username: str, default=None):
+        data = self.get_user(username)
+        return default if data is None else UserRecord(self, username, data)
+
+    def keys(self) -> List[str]:
+        return self.usernames()
+
+    def items(self) -> Iterator[Tuple[str, UserRecord]]:
+        for username in self.usernames():
+            record = self.get(username)
+            if record is not None:
+                yield username, record
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Store de usuários em SQLite.
+
+    username é a chave primária e email e company_id têm índices próprios;
+    as consultas usam SQL fixo, preparado uma vez por conexão pelo cache de
+    statements do sqlite3. Cada thread usa sua própria conexão (modo WAL,
+    leituras concorrentes) e as leituras por username passam por um cache
+    LRU. O cache é esvaziado quando PRAGMA data_version indica que outra
+    conexão (de outra thread ou outro processo) gravou no banco, de modo
+    que alterações de papel valem em todos os workers na leitura seguinte.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, cache_size: int = 1024,
+                 cache_ttl_seconds: float = 30):
+        """
+        Inicializa o store.
+
+        Args:
+            db_path: Caminho do banco (padrão: data/users.db)
+            cache_size: Número máximo de usuários no cache de leitura
+            cache_ttl_seconds: Validade máxima das entradas do cache
+        """
+        self.logger = self._setup_logger()
+        self.db_path = db_path or os.path.join(os.getcwd(), 'data', 'users.db')
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._local = threading.local()
+        self._cache: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Incrementada a cada limpeza: leituras anteriores a ela não entram no cache
+        self._cache_generation = 0
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+    def _setup_logger(self):
+        """Configura o logger para o store de usuários"""
+        logger = logging.getLogger("SQLiteUserStore")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (transações controladas explicitamente)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=64,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Transação de escrita (BEGIN IMMEDIATE), confirmada ao fim do bloco ou desfeita em erro"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _create_schema(self):
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " id TEXT,"
+                " email TEXT,"
+                " company_id TEXT,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_company ON users(company_id)")
+
+    @staticmethod
+    def _row(username: str, data: Dict[str, Any]) -> Tuple:
+        return (username, data.get("id"), data.get("email"), data.get("company_id"),
+                json.dumps(data, default=str))
+
+    def _check_external_writes(self):
+        """Esvazia o cache se outra conexão gravou no banco desde a última verificação"""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._local.data_version:
+            self._local.data_version = version
+            self._clear_cache()
+
+    def _clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+
+    def _cache_get(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self._cache.get(username)
+            if entry is None:
+                return None
+            if time.monotonic() > entry[0]:
+                del self._cache[username]
+                return None
+            self._cache.move_to_end(username)
+            return entry[1]
+
+    def _cache_put(self, username: str, data: Dict[str, Any], generation: int):
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            self._cache[username] = (time.monotonic() + self.cache_ttl_seconds, data)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _invalidate(self, username: str):
+        with self._cache_lock:
+            self._cache.pop(username, None)
+            self._cache_generation += 1
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém os dados de um usuário.
+
+        Args:
+            username: Nome de usuário
+
+        Returns:
+            Cópia dos dados do usuário ou None se não existir
+        """
+        try:
+            self._check_external_writes()
+            data = self._cache_get(username)
+            if data is None:
+                generation = self._cache_generation
+                row = self._connection().execute(
+                    "SELECT data FROM users WHERE username = ?", (username,)
+                ).fetchone()
+                if row is None:
+                    return None
+                data = json.loads(row[0])
+                self._cache_put(username, data, generation)
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar usuário {username}: {str(e)}")
+            return None
+        return json.loads(json.dumps(data))
+
+    def get_by_email(self, email: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Obtém um usuário pelo e-mail.
+
+        Args:
+            email: E-mail do usuário
+
+        Returns:
+            Tupla (username, dados) ou None se não existir
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT username, data FROM users WHERE email = ? LIMIT 1", (email,)
+            ).fetchone()
+            return None if row is None else (row[0], json.loads(row[1]))
+        except Exception as e:
+            self.logger.error(f"Erro ao consultar usuário por e-mail: {str(e)}")
+            return None
+
+    def add_user(self, username: str, data: Dict[str, Any]) -> bool:
+        """
+        Adiciona um usuário.
+
+        Args:
+            username: Nome de usuário
+            data: Dados do usuário (id, password_hash, salt, email, ...)
+
+        Returns:
+            True se adicionado, False se já existir ou em caso de erro
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO users (username, id, email, company_id, data)"
+                    " VALUES (?, ?, ?, ?, ?)", self._row(username, data)
+                )
+            self._invalidate(username)
+            return cursor.rowcount == 1
+        except Exception as e:
+            self.logger.error(f"Erro ao adicionar usuário {username}: {str(e)}")
+            return False
+
+    def replace_user(self, username: str, data: Dict[str, Any]) -> bool:
+        """
+        Cria ou substitui todos os dados de um usuário.
+
+        Args:
+            username: Nome de usuário
+            data: Dados completos do usuário
+
+        Returns:
+            True se salvo com sucesso
+        """
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO users (username, id, email, company_id, data)"
+                    " VALUES (?, ?, ?, ?, ?)", self._row(username, data)
+                )
+            self._invalidate(username)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar usuário {username}: {str(e)}")
+            return False
+
+    def update_user(self, username: str, changes: Dict[str, Any]) -> bool:
+        """
+        Atualiza campos de um usuário.
+
+        Args:
+            username: Nome de usuário
+            changes: Campos alterados
+
+        Returns:
+            True se atualizado, False se não existir ou em caso de erro
+        """
+        try:
+            # Leitura e escrita na mesma transação de escrita
+            with self._transaction() as conn:
+                row = conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+                if row is not None:
+                    data = json.loads(row[0])
+                    data.update(changes)
+                    conn.execute(
+                        "UPDATE users SET id = ?, email = ?, company_id = ?, data = ? WHERE username = ?",
+                        self._row(username, data)[1:] + (username,)
+                    )
+            self._invalidate(username)
+            return row is not None
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar usuário {username}: {str(e)}")
+            return False
+
+    def delete_user(self, username: str) -> bool:
+        """
+        Remove um usuário.
+
+        Args:
+            username: Nome de usuário
+
+        Returns:
+            True se removido
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            self._invalidate(username)
+            return cursor.rowcount == 1
+        except Exception as e:
+            self.logger.error(f"Erro ao remover usuário {username}: {str(e)}")
+            return False
+
+    def list_by_company(self, company_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Lista os usuários de uma empresa (consulta pelo índice de company_id).
+
+        Args:
+            company_id: ID da empresa
+
+        Returns:
+            Dicionário username -> dados
+        """
+        try:
+            rows = self._connection().execute(
+                "SELECT username, data FROM users WHERE company_id = ? ORDER BY username", (company_id,)
+            ).fetchall()
+            return {username: json.loads(data) for username, data in rows}
+        except Exception as e:
+            self.logger.error(f"Erro ao listar usuários da empresa {company_id}: {str(e)}")
+            return {}
+
+    def usernames(self) -> List[str]:
+        """Lista os nomes de usuário cadastrados"""
+        try:
+            rows = self._connection().execute("SELECT username FROM users ORDER BY username").fetchall()
+            return [row[0] for row in rows]
+        except Exception as e:
+            self.logger.error(f"Erro ao listar usuários: {str(e)}")
+            return []
+
+    def __len__(self) -> int:
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        except Exception as e:
+            self.logger.error(f"Erro ao contar usuários: {str(e)}")
+            return 0
+
+    def seed(self, users: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Adiciona usuários ainda inexistentes.
+
+        Args:
+            users: Dicionário username -> dados
+
+        Returns:
+            Número de usuários adicionados
+        """
+        try:
+            with self._transaction() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, id, email, company_id, data)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [self._row(username, data) for username, data in users.items()]
+                )
+                added = conn.total_changes - before
+            self._clear_cache()
+            return added
+        except Exception as e:
+            self.logger.error(f"Erro ao popular store de usuários: {str(e)}")
+            return 0
+
+
+# Stores compartilhados pelo processo, por caminho do banco
+_stores: Dict[str, SQLiteUserStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_user_store(db_path: Optional[str] = None, seed_mock_users: bool = True) -> SQLiteUserStore:
+    """
+    Obtém o store de usuários compartilhado pelo processo.
+
+    Na primeira abertura de um banco vazio, os usuários de demonstração são
+    gravados uma única vez; as sessões seguintes não recalculam hashes.
+
+    Args:
+        db_path: Caminho do banco (padrão: data/users.db)
+        seed_mock_users: Se True, popula um banco vazio com create_mock_users_db
+
+    Returns:
+        Store de usuários
+    """
+    path = os.path.abspath(db_path or os.path.join(os.getcwd(), 'data', 'users.db'))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = SQLiteUserStore(path)
+            if seed_mock_users and len(store) == 0:
+                from .security_manager import create_mock_users_db
+                added = store.seed(create_mock_users_db())
+                store.logger.info(f"Store de usuários populado com {added} usuários de demonstração")
+            _stores[path] = store
+        return store
@@ -13,7 +13,14 @@ setup(
         "statsmodels==0.14.1",
         "PyJWT==2.8.0",
         "sqlalchemy==2.0.27",
-        "scikit-learn==1.4.0"  # Adicionando scikit-learn para análise preditiva
+        "scikit-learn==1.4.0",  # Adicionando scikit-learn para análise preditiva
+        "scipy==1.11.4",
+        "joblib==1.3.2",
+        "threadpoolctl==3.2.0",
+        "pyarrow==14.0.2"
     ],
+    extras_require={
+        "duckdb": ["duckdb==0.9.2"]  # Agregação RFM direto no DuckDB
+    },
 )
 
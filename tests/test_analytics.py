@@ -0,0 +1,568 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from langchain_project.analytics import (
+    ModelRegistry, OnlineAnomalyDetector, PredictiveAnalysis, ResultCache, order_selection
+)
+from langchain_project.analytics.anomaly_stream import RollingMoments
+from langchain_project.analytics.order_selection import ArimaOrderSelector
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def monthly_panel(keys, periods=36, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-31', periods=periods, freq='M')
+    frames = []
+    for i, key in enumerate(keys):
+        values = 100 + 10 * i + np.arange(periods) + rng.normal(0, 2, periods)
+        frames.append(pd.DataFrame({'reg': key, 'data': dates, 'valor': values}))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_forecast_many_accepts_single_id_column(workdir, max_workers):
+    df = monthly_panel(['norte', 'sul', 'leste'])
+    forecasts, metrics, failures = PredictiveAnalysis().forecast_many(
+        df, 'reg', 'data', 'valor', periods=3, model_type='ets', max_workers=max_workers
+    )
+
+    assert failures.empty
+    assert sorted(metrics['reg']) == ['leste', 'norte', 'sul']
+    future = forecasts[forecasts['tipo'] == 'previsão']
+    assert future.groupby('reg').size().to_dict() == {'leste': 3, 'norte': 3, 'sul': 3}
+
+
+@pytest.mark.parametrize('evaluation, fits', [(None, 2), ('refit', 2), ('reuse', 1)])
+def test_forecast_refits_on_full_series_unless_reuse(workdir, monkeypatch, evaluation, fits):
+    from langchain_project.analytics import predictive_analysis
+
+    fitted = []
+    arima = predictive_analysis.ARIMA
+
+    def counting_arima(endog, **kwargs):
+        fitted.append(len(endog))
+        return arima(endog, **kwargs)
+
+    monkeypatch.setattr(predictive_analysis, 'ARIMA', counting_arima)
+    options = {'evaluation': evaluation} if evaluation else {}
+    df = monthly_panel(['norte'])
+    result_df, metrics = PredictiveAnalysis().forecast_time_series(
+        df, 'data', 'valor', periods=3, order=(1, 1, 0), **options
+    )
+
+    assert len(fitted) == fits and fitted[0] == int(len(df) * 0.8)
+    if fits == 2:
+        assert fitted[1] == len(df)
+    assert (result_df['tipo'] == 'previsão').sum() == 3
+
+
+def _write_orders(args):
+    cache_path, worker = args
+    selector = ArimaOrderSelector(cache_path=cache_path)
+    for i in range(50):
+        selector._update_cache(f"w{worker}_s{i}|s=0", {'order': [1, 1, 0], 'worker': worker})
+    return worker
+
+
+def test_order_cache_keeps_concurrent_process_updates(tmp_path):
+    cache_path = str(tmp_path / 'orders.db')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_write_orders, [(cache_path, w) for w in range(4)]))
+
+    selector = ArimaOrderSelector(cache_path=cache_path)
+    stored = selector._connection().execute("SELECT COUNT(*) FROM arima_orders").fetchone()[0]
+    assert stored == 200
+    assert selector._get_cached('w3_s49|s=0')['worker'] == 3
+
+    selector.clear_cache('w3_s49')
+    assert selector._get_cached('w3_s49|s=0') is None
+    assert selector._get_cached('w3_s4|s=0') is not None
+
+
+def test_order_selection_reuses_cache_and_search_pool(tmp_path):
+    selector = ArimaOrderSelector(cache_path=str(tmp_path / 'orders.db'), max_workers=2)
+    series = monthly_panel(['a', 'b']).set_index('data').groupby('reg')['valor']
+
+    first = selector.select_order(series.get_group('a'), series_key='a')
+    pool = order_selection._search_executors[2]
+    selector.select_order(series.get_group('b'), series_key='b')
+    again = selector.select_order(series.get_group('a'), series_key='a')
+
+    assert order_selection._search_executors[2] is pool
+    assert not first['cached'] and again['cached']
+    assert again['order'] == first['order']
+
+
+def test_order_cache_is_scoped_by_tenant(tmp_path):
+    selector = ArimaOrderSelector(cache_path=str(tmp_path / 'orders.db'), max_workers=1)
+    ts = monthly_panel(['a']).set_index('data')['valor']
+
+    selector.select_order(ts, series_key='valor/a', tenant_id='acme')
+    assert not selector.select_order(ts, series_key='valor/a', tenant_id='globex')['cached']
+    assert selector.select_order(ts, series_key='valor/a', tenant_id='acme')['cached']
+
+    selector.clear_cache(tenant_id='acme')
+    assert not selector.select_order(ts, series_key='valor/a', tenant_id='acme')['cached']
+    assert selector.select_order(ts, series_key='valor/a', tenant_id='globex')['cached']
+
+
+def test_memoized_forecast_is_served_from_cache(workdir):
+    analysis = PredictiveAnalysis(result_cache=ResultCache(base_dir=str(workdir / 'results')))
+    df = monthly_panel(['a'])
+
+    first, _ = analysis.forecast_time_series(df, 'data', 'valor', periods=3, model_type='ets', tenant_id='acme')
+    first.loc[0, 'valor'] = -1
+    again, _ = analysis.forecast_time_series(df, 'data', 'valor', periods=3, model_type='ets', tenant_id='acme')
+
+    assert again.loc[0, 'valor'] != -1
+    assert list((workdir / 'results' / 'acme' / 'forecast_time_series').glob('*.pkl'))
+
+    changed = df.assign(valor=df['valor'] * 2)
+    other, _ = analysis.forecast_time_series(changed, 'data', 'valor', periods=3, model_type='ets', tenant_id='acme')
+    assert other['valor'].iloc[0] == pytest.approx(2 * again['valor'].iloc[0])
+
+
+def test_failed_segmentation_is_not_memoized(workdir):
+    analysis = PredictiveAnalysis(result_cache=ResultCache(base_dir=str(workdir / 'results')))
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'y': [3.0, 2.0, 1.0]})
+
+    failed = analysis.customer_segmentation(df, ['x', 'y'], method='invalido')
+    assert failed is df
+    assert not (workdir / 'results').exists()
+
+    segmented = analysis.customer_segmentation(df, ['x', 'y'], n_clusters=2)
+    assert 'segmento' in segmented.columns
+
+
+def test_segmentation_cache_ignores_columns_outside_features(workdir):
+    cache = ResultCache(base_dir=str(workdir / 'results'))
+    analysis = PredictiveAnalysis(result_cache=cache)
+    df, _ = customer_blobs(per_cluster=50)
+    df['nome'] = [f"cliente {i}" for i in range(len(df))]
+
+    first = analysis.customer_segmentation(df, ['gasto', 'visitas'], n_clusters=4, tenant_id='acme')
+    hits = cache.stats()['hits']
+    renamed = analysis.customer_segmentation(df.assign(nome='outro'), ['gasto', 'visitas'],
+                                             n_clusters=4, tenant_id='acme')
+
+    assert cache.stats()['hits'] == hits + 1
+    assert (renamed['nome'] == 'outro').all()
+    assert renamed['segmento'].tolist() == first['segmento'].tolist()
+    assert renamed.attrs['segmentacao']['n_clusters'] == 4
+    assert list((workdir / 'results' / 'acme' / '_segment_customers').glob('*.pkl'))
+
+
+def test_result_cache_keeps_large_results_in_memory_only(workdir):
+    cache = ResultCache(base_dir=str(workdir / 'results'), max_disk_mb=0.01)
+
+    assert cache.put('acme', 'metodo', 'pequeno', list(range(10)))
+    assert cache.put('acme', 'metodo', 'grande', np.zeros(10000))
+
+    assert [path.name for path in (workdir / 'results' / 'acme' / 'metodo').iterdir()] == ['pequeno.pkl']
+    found, result = cache.get('acme', 'metodo', 'grande')
+    assert found and len(result) == 10000
+
+
+@pytest.mark.parametrize('tenant_id, method', [('..', 'metodo'), ('a/b', 'metodo'), ('acme', '../x')])
+def test_result_cache_rejects_path_traversal(workdir, tenant_id, method):
+    cache = ResultCache(base_dir=str(workdir / 'results'))
+
+    assert not cache.put(tenant_id, method, 'chave', [1])
+    assert cache.get(tenant_id, method, 'chave') == (False, None)
+    assert not (workdir / 'results').exists()
+    assert not cache.clear('../..')
+
+
+def test_tenant_state_paths_are_validated(workdir):
+    from langchain_project.analytics import RFMBuilder
+
+    builder = RFMBuilder()
+    assert not builder.save('../outro')
+    assert not builder.load_state('a/b')
+    with pytest.raises(ValueError):
+        OnlineAnomalyDetector().score('..', 'receita', 1.0)
+    assert not (workdir / 'data').exists()
+
+
+@pytest.mark.parametrize('method', ['bottom_up', 'mint'])
+def test_hierarchical_forecast_is_coherent(workdir, method):
+    df = monthly_panel(['norte', 'sul', 'leste', 'oeste'])
+    df['regiao'] = df['reg'].map({'norte': 'n', 'sul': 's', 'leste': 'n', 'oeste': 's'})
+    forecasts, _ = PredictiveAnalysis().forecast_hierarchical(
+        df, ['regiao', 'reg'], 'data', 'valor', periods=3, method=method, max_workers=1
+    )
+
+    future = forecasts[forecasts['tipo'] == 'previsão']
+    by_level = {level: frame.groupby('data')['valor'].sum() for level, frame in future.groupby('nivel')}
+    assert set(by_level) == {'total', 'regiao', 'reg'}
+    assert len(by_level['total']) == 3
+    np.testing.assert_allclose(by_level['regiao'], by_level['total'])
+    np.testing.assert_allclose(by_level['reg'], by_level['total'])
+
+    regions = future[future['nivel'] == 'regiao'].set_index(['regiao', 'data'])['valor']
+    leaves = future[future['nivel'] == 'reg'].groupby(['regiao', 'data'])['valor'].sum()
+    np.testing.assert_allclose(leaves.reindex(regions.index), regions)
+
+
+def test_hierarchical_forecast_scopes_node_fits_by_tenant(workdir):
+    analysis = PredictiveAnalysis(result_cache=ResultCache(base_dir=str(workdir / 'results')))
+    df = monthly_panel(['norte', 'sul'])
+
+    forecasts, _ = analysis.forecast_hierarchical(df, ['reg'], 'data', 'valor', periods=3,
+                                                  max_workers=1, tenant_id='acme')
+
+    assert forecasts is not None
+    assert {path.name for path in (workdir / 'results').iterdir()} == {'acme'}
+    assert {path.name for path in (workdir / 'results' / 'acme').iterdir()} == {'forecast_hierarchical',
+                                                                                 'forecast_many'}
+
+
+def regression_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'x1': rng.normal(size=rows), 'x2': rng.normal(size=rows), 'x3': rng.normal(size=rows)})
+    df['y'] = 3 * df['x1'] - 2 * df['x2'] + rng.normal(0, 0.1, rows)
+    return df
+
+
+def test_registry_round_trip_loads_models_with_mmap(workdir):
+    df = regression_frame()
+    registry = ModelRegistry(base_dir=str(workdir / 'tenants'))
+    trainer = PredictiveAnalysis(registry=registry)
+    trainer.train_prediction_model(df, 'y', ['x1', 'x2', 'x3'], 'vendas', tenant_id='acme',
+                                   model_type='ridge', track_memory=False)
+    trainer.train_prediction_model(df, 'y', ['x1', 'x2', 'x3'], 'vendas', tenant_id='acme',
+                                   model_type='random_forest', n_jobs=1, track_memory=False,
+                                   model_params={'n_estimators': 5})
+    expected = trainer.predict(df, 'vendas', tenant_id='acme', version=1)
+
+    assert registry.list_versions('acme', 'vendas') == [1, 2]
+    registry.cache.invalidate(registry._model_dir('acme', 'vendas'))
+    model, scaler, metadata = registry.load('acme', 'vendas', version=1)
+
+    assert isinstance(model.coef_, np.memmap)
+    assert metadata['features'] == ['x1', 'x2', 'x3'] and metadata['model_class'] == 'Ridge'
+    reader = PredictiveAnalysis(registry=registry)
+    assert np.allclose(reader.predict(df, 'vendas', tenant_id='acme', version=1), expected)
+    assert registry.cache_stats()['hits'] >= 1
+
+
+@pytest.mark.parametrize('tenant_id, model_id', [('..', 'vendas'), ('acme', '../../etc'), ('a/b', 'vendas'), ('acme', '')])
+def test_registry_rejects_path_traversal(workdir, tenant_id, model_id):
+    registry = ModelRegistry(base_dir=str(workdir / 'tenants'))
+    with pytest.raises(ValueError):
+        registry._model_dir(tenant_id, model_id)
+    assert registry.register(tenant_id, model_id, {'pesos': [1]}) is None
+    assert not (workdir / 'etc').exists()
+
+
+@pytest.mark.parametrize('model_type', ['random_forest', 'extra_trees', 'hist_gradient_boosting', 'ridge'])
+def test_training_backends_fit_and_report_profile(model_type):
+    analysis = PredictiveAnalysis()
+    params = {'n_estimators': 20} if model_type in ('random_forest', 'extra_trees') else None
+    metrics = analysis.train_prediction_model(regression_frame(), 'y', ['x1', 'x2', 'x3'], model_type,
+                                              model_type=model_type, n_jobs=2, model_params=params)
+
+    assert metrics['r2'] > 0.8 and metrics['n_train'] == 320
+    assert metrics['training_time'] > 0 and metrics['peak_memory_mb'] > 0 and metrics['model_size_mb'] > 0
+    assert set(metrics['feature_importance']) == {'x1', 'x2', 'x3'}
+    assert (analysis.scalers[model_type] is not None) == (model_type == 'ridge')
+
+
+def test_training_subsamples_and_rejects_unknown_backend():
+    analysis = PredictiveAnalysis()
+    metrics = analysis.train_prediction_model(regression_frame(), 'y', ['x1', 'x2'], 'amostra',
+                                              model_type='ridge', sample_size=0.5, track_memory=False)
+    assert metrics['n_rows_total'] == 400 and metrics['n_train'] == 160
+    assert metrics['peak_memory_mb'] is None
+    assert analysis.train_prediction_model(regression_frame(), 'y', ['x1'], 'x', model_type='svm') == {}
+
+
+def test_predict_stream_matches_batch_predict(workdir):
+    train = regression_frame()
+    analysis = PredictiveAnalysis()
+    analysis.train_prediction_model(train, 'y', ['x1', 'x2', 'x3'], 'vendas', model_type='ridge',
+                                    track_memory=False)
+    scoring = regression_frame(rows=1000, seed=1).assign(cliente=np.arange(1000))
+    scoring.loc[::7, 'x2'] = np.nan
+    expected = analysis.predict(scoring, 'vendas')
+
+    chunks = [scoring.iloc[i:i + 90] for i in range(0, len(scoring), 90)]
+    streamed = pd.concat(analysis.predict_stream(iter(chunks), 'vendas', id_columns=['cliente'],
+                                                 max_workers=3), ignore_index=True)
+    assert streamed['cliente'].tolist() == list(range(1000))
+    assert np.allclose(streamed['previsao'], expected)
+
+    scoring.to_parquet(workdir / 'clientes.parquet')
+    written = analysis.predict_to_parquet(str(workdir / 'clientes.parquet'), str(workdir / 'previsoes.parquet'),
+                                          'vendas', id_columns=['cliente'], chunk_size=250)
+    assert written == 1000
+    assert np.allclose(pd.read_parquet(workdir / 'previsoes.parquet')['previsao'], expected)
+
+
+def test_rolling_moments_are_stable_for_large_values():
+    values = 1e9 + np.random.default_rng(0).normal(0, 1, 2000)
+    moments = RollingMoments(window=50)
+    for value in values:
+        moments.update(value)
+
+    assert moments.count == 50
+    assert moments.mean == pytest.approx(values[-50:].mean(), abs=1e-4)
+    assert moments.std == pytest.approx(values[-50:].std(), rel=1e-5)
+    restored = RollingMoments(50, moments.to_dict()['values'])
+    assert restored.std == pytest.approx(moments.std, rel=1e-5)
+
+
+@pytest.mark.parametrize('window', ['cumulative', 'ewma', 'rolling'])
+def test_online_detector_flags_injected_spikes_and_persists(workdir, window):
+    values = 100 + np.random.default_rng(3).normal(0, 1, 300)
+    spikes = [120, 250]
+    values[spikes] += 15
+    detector = OnlineAnomalyDetector(window=window, threshold=4, update_on_anomaly=False,
+                                     base_dir=str(workdir / 'tenants'))
+
+    scored = detector.score_many('acme', 'receita', values[:200])
+    assert scored.index[scored['anomalia']].tolist() == [120]
+    assert detector.save_state('acme')
+
+    reloaded = OnlineAnomalyDetector(window=window, threshold=4, update_on_anomaly=False,
+                                     base_dir=str(workdir / 'tenants'))
+    assert reloaded.get_stats('acme')['receita']['count'] == detector.get_stats('acme')['receita']['count']
+    rest = reloaded.score_many('acme', 'receita', values[200:])
+    assert (rest.index[rest['anomalia']] + 200).tolist() == [250]
+    assert reloaded.get_stats('globex') == {}
+
+
+@pytest.mark.parametrize('method', ['std', 'iqr', 'mad', 'rolling_z'])
+def test_grouped_anomalies_match_per_series_detection(method):
+    panel = monthly_panel(['norte', 'sul', 'leste'], periods=48, seed=5)
+    panel['valor'] -= np.tile(np.arange(48), 3)
+    panel.loc[panel.index[[30, 80, 130]], 'valor'] += 40
+    shuffled = panel.sample(frac=1, random_state=0)
+    analysis = PredictiveAnalysis()
+
+    grouped = analysis.detect_anomalies(shuffled, 'valor', method=method, group_columns=['reg'],
+                                        date_column='data', threshold=3.5)
+
+    assert grouped.index.equals(shuffled.index)
+    for key, series in shuffled.groupby('reg'):
+        alone = analysis.detect_anomalies(series.sort_values('data'), 'valor', method=method,
+                                          date_column='data', threshold=3.5)
+        expected = alone.loc[series.index]
+        assert grouped.loc[series.index, 'anomalia'].tolist() == expected['anomalia'].tolist()
+        assert np.allclose(grouped.loc[series.index, 'score'], expected['score'], equal_nan=True)
+    assert set(grouped.index[grouped['anomalia']]) >= set(panel.index[[30, 80, 130]])
+
+
+def basket_transactions(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    items = np.array(['pao', 'leite', 'cafe', 'manteiga', 'queijo', 'suco', 'raro'])
+    weights = np.array([0.3, 0.25, 0.2, 0.12, 0.08, 0.045, 0.005])
+    rows = []
+    for tx in range(count):
+        basket = rng.choice(items, size=rng.integers(1, 5), p=weights)
+        if 'pao' in basket and rng.random() < 0.7:
+            basket = np.append(basket, 'manteiga')
+        rows.extend((f"t{tx}", item) for item in basket)
+    return pd.DataFrame(rows, columns=['transacao', 'item'])
+
+
+@pytest.mark.parametrize('algorithm', ['fpgrowth', 'apriori'])
+def test_market_basket_matches_dense_encoding(algorithm):
+    mlxtend = pytest.importorskip('mlxtend.frequent_patterns')
+    transactions = basket_transactions()
+    result = PredictiveAnalysis().market_basket_analysis(transactions, 'item', 'transacao',
+                                                         min_support=0.05, algorithm=algorithm)
+
+    dense = pd.crosstab(transactions['transacao'], transactions['item']).gt(0)
+    expected = mlxtend.apriori(dense, min_support=0.05, use_colnames=True)
+    expected_supports = {frozenset(itemset): support
+                         for itemset, support in zip(expected['itemsets'], expected['support'])}
+    supports = {frozenset(row['itens']): row['suporte'] for row in result['itemsets']}
+    assert supports.keys() == expected_supports.keys()
+    assert all(supports[key] == pytest.approx(expected_supports[key]) for key in supports)
+    assert not any('raro' in key for key in supports)
+
+    expected_rules = mlxtend.association_rules(expected, metric='lift', min_threshold=1.0)
+    lifts = {(frozenset(rule['antecedentes']), frozenset(rule['consequentes'])): rule['lift']
+             for rule in result['rules']}
+    assert lifts == pytest.approx({(frozenset(a), frozenset(c)): lift for a, c, lift in
+                                   zip(expected_rules['antecedents'], expected_rules['consequents'],
+                                       expected_rules['lift'])})
+    assert result['summary']['total_rules'] == len(expected_rules) > 0
+
+
+def customer_blobs(per_cluster=400, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0, 0], [10, 10], [0, 10], [10, 0]])
+    points = np.vstack([center + rng.normal(0, 0.8, (per_cluster, 2)) for center in centers])
+    truth = np.repeat(np.arange(len(centers)), per_cluster)
+    return pd.DataFrame({'gasto': points[:, 0], 'visitas': points[:, 1]}), truth
+
+
+@pytest.mark.parametrize('method', ['kmeans', 'minibatch'])
+def test_segmentation_selects_k_and_recovers_clusters(method):
+    from sklearn.metrics import adjusted_rand_score
+
+    df, truth = customer_blobs()
+    df.loc[5, 'gasto'] = np.nan
+    result = PredictiveAnalysis().customer_segmentation(df, ['gasto', 'visitas'], n_clusters='auto',
+                                                        method=method, batch_size=256,
+                                                        k_range=[2, 3, 4, 5, 6], sample_size=800)
+
+    info = result.attrs['segmentacao']
+    assert info['metodo'] == method
+    assert info['n_clusters'] == 4
+    assert max(info['silhouette'], key=info['silhouette'].get) == 4
+    assert adjusted_rand_score(truth, result['segmento']) > 0.95
+    assert sum(profile['tamanho'] for profile in info['perfis'].values()) == len(df)
+    assert result['segmento_nome'].notna().all()
+    assert 'segmento' not in df.columns
+
+
+def test_rfm_segment_names_follow_cluster_profiles():
+    rng = np.random.default_rng(3)
+    groups = {
+        'Clientes Ocasionais': (300, 200, 1, 50),
+        'Clientes Recentes': (150, 5, 1, 60),
+        'Clientes Regulares': (80, 40, 8, 800),
+        'Clientes VIP': (20, 10, 20, 5000),
+    }
+    frames = []
+    for name, (size, recencia, frequencia, valor) in groups.items():
+        frames.append(pd.DataFrame({
+            'recencia': recencia + rng.normal(0, 1, size),
+            'frequencia': frequencia + rng.normal(0, 0.2, size),
+            'valor': valor * (1 + rng.normal(0, 0.02, size)),
+            'esperado': name
+        }))
+    df = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+
+    result = PredictiveAnalysis().customer_segmentation(df, ['recencia', 'frequencia', 'valor'], n_clusters=4)
+
+    assert (result['segmento_nome'] == result['esperado']).all()
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_trend_many_matches_single_series_analysis(max_workers):
+    panel = monthly_panel(['norte', 'sul', 'leste'], periods=36, seed=2)
+    panel['valor'] += 8 * np.sin(np.arange(len(panel)) * np.pi / 6)
+    panel = panel.drop(panel.index[[5, 40]])
+    panel = panel[~((panel['reg'] == 'leste') & (panel['data'] < '2022-01-01'))]
+    analysis = PredictiveAnalysis()
+
+    result = analysis.analyze_trend_many(panel.iloc[::-1], ['reg'], 'data', 'valor',
+                                         max_workers=max_workers, chunk_size=1)
+
+    summary = result['summary']
+    assert summary['reg'].tolist() == ['leste', 'sul', 'norte']
+    for i, row in summary.iterrows():
+        alone = analysis.analyze_trend(panel[panel['reg'] == row['reg']], 'data', 'valor')
+        points = slice(result['offsets'][i], result['offsets'][i + 1])
+        assert row['total_growth_pct'] == pytest.approx(alone['total_growth_pct'])
+        assert row['avg_growth_rate_pct'] == pytest.approx(alone['avg_growth_rate_pct'])
+        assert row['trend_direction'] == alone['trend_direction']
+        rolling = result['rolling_mean'][points]
+        assert rolling[~np.isnan(rolling)] == pytest.approx(alone['rolling_mean'])
+        assert row['decomposicao'] == (alone['seasonality'] is not None)
+        if row['decomposicao']:
+            for name, component in alone['seasonality'].items():
+                values = result['seasonality'][name][points]
+                assert values[~np.isnan(values)] == pytest.approx(component)
+
+
+def seasonal_series(periods=60, seed=4):
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods)
+    values = 200 + 1.5 * t + 25 * np.sin(2 * np.pi * t / 12) + rng.normal(0, 1, periods)
+    return pd.DataFrame({'data': pd.date_range('2019-01-31', periods=periods, freq='M'), 'valor': values})
+
+
+@pytest.mark.parametrize('model_type', ['ets', 'theta', 'seasonal_naive'])
+def test_statistical_engines_forecast_seasonal_series(model_type):
+    df = seasonal_series()
+    history, future = df.iloc[:48], df.iloc[48:]
+
+    result, metrics = PredictiveAnalysis().forecast_time_series(history, 'data', 'valor', periods=12,
+                                                                model_type=model_type, backtest_origins=2,
+                                                                backtest_horizon=3)
+
+    forecast = result[result['tipo'] == 'previsão']
+    assert len(forecast) == 12 and forecast['valor'].notna().all()
+    assert metrics['model_type'] == model_type
+    assert metrics['backtest_origins'] == 2 and metrics['backtest_horizon'] == 3
+    mape = np.mean(np.abs(forecast['valor'].to_numpy() - future['valor'].to_numpy()) / future['valor'].to_numpy())
+    assert mape < 0.1
+
+
+@pytest.mark.parametrize('model_type', ['ets', 'theta', 'seasonal_naive'])
+def test_statistical_engines_handle_series_shorter_than_two_cycles(model_type):
+    result, _ = PredictiveAnalysis().forecast_time_series(seasonal_series(periods=15), 'data', 'valor',
+                                                          periods=6, model_type=model_type)
+
+    forecast = result[result['tipo'] == 'previsão']
+    assert len(forecast) == 6 and np.isfinite(forecast['valor']).all()
+
+
+def test_auto_forecast_picks_lowest_backtest_error():
+    result, metrics = PredictiveAnalysis().forecast_time_series(
+        seasonal_series(), 'data', 'valor', periods=6, model_type='auto',
+        candidates=['ets', 'theta', 'seasonal_naive']
+    )
+
+    assert set(metrics['candidates']) == {'ets', 'theta', 'seasonal_naive'}
+    assert metrics['model_type'] == min(metrics['candidates'], key=metrics['candidates'].get)
+    assert (result['tipo'] == 'previsão').sum() == 6
+
+
+@pytest.fixture
+def bench_predictive():
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).parent.parent / 'business-analytics-pro' / 'benchmarks' / 'bench_predictive.py'
+    spec = importlib.util.spec_from_file_location('bench_predictive', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_benchmark_compare_flags_regressions_beyond_tolerance(bench_predictive):
+    baseline = {
+        'rapido/small': {'wall_s': 1.0, 'peak_rss_mb': 100.0, 'accuracy': {'mae': 10.0, 'recall': 0.9}},
+        'falhou/small': {'wall_s': 1.0, 'peak_rss_mb': 100.0, 'accuracy': {}},
+        'novo/small': {'error': 'falha'}
+    }
+    results = {
+        'rapido/small': {'wall_s': 1.5, 'peak_rss_mb': 110.0, 'accuracy': {'mae': 10.5, 'recall': 0.7}},
+        'falhou/small': {'error': 'ValueError: x'},
+        'novo/small': {'wall_s': 9.0, 'peak_rss_mb': 900.0, 'accuracy': {}},
+        'sem_baseline/small': {'wall_s': 9.0, 'peak_rss_mb': 900.0, 'accuracy': {}}
+    }
+
+    regressions = bench_predictive.compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.25,
+                                           accuracy_tolerance=0.1)
+
+    assert {(r['case'], r['metric']) for r in regressions} == {
+        ('rapido/small', 'wall_s'), ('rapido/small', 'recall'), ('falhou/small', 'error')
+    }
+
+
+def test_benchmark_baseline_cases_run_in_isolation(bench_predictive):
+    with open(bench_predictive.__file__.replace('bench_predictive.py', 'baseline_predictive.json')) as f:
+        baseline = json.load(f)
+    assert {key.split('/')[0] for key in baseline['results']} <= set(bench_predictive.CASES)
+
+    result = bench_predictive.run_isolated('detect_anomalies', 'small', seed=42, timeout=300)
+
+    assert 'error' not in result
+    assert result['wall_s'] > 0
+    assert result['accuracy']['recall'] > 0.9
@@ -0,0 +1,316 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+import requests
+
+from langchain_project.erp_crm_integration import (
+    CircuitBreaker, CircuitOpenError, IntegrationManager, RateLimitExceeded
+)
+from langchain_project.erp_crm_integration.scheduler import RefreshJob, RefreshScheduler
+from langchain_project.erp_crm_integration.schema import _parse_decimals, get_schema, normalize_frame
+from langchain_project.erp_crm_integration.simulator import ERPSimulator, SimulatorConfig
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def simulator():
+    config = SimulatorConfig(records=1500, page_size=500, latency_ms=0, latency_jitter_ms=0)
+    with ERPSimulator(config) as sim:
+        yield sim
+
+
+def build_manager(simulator: ERPSimulator) -> IntegrationManager:
+    manager = IntegrationManager()
+    for system in ('salesforce', 'sap', 'totvs'):
+        manager.configure_rate_limit(system, rate=1e6, capacity=1e6)
+    manager.configure_salesforce('client', 'secret', 'user', 'pass', 'token', login_url=simulator.base_url)
+    manager.configure_sap(simulator.sap_base_url, 'user', 'pass', '100')
+    return manager
+
+
+class _StaticManager(IntegrationManager):
+    """IntegrationManager que devolve lotes pré-definidos em get_financial_data"""
+
+    def __init__(self, batches, tenant_id=None):
+        super().__init__(tenant_id=tenant_id)
+        self.batches = list(batches)
+        self.calls = []
+
+    def get_financial_data(self, source, start_date, end_date, tenant_id=None, modified_since=None):
+        self.calls.append({'start_date': start_date, 'tenant_id': tenant_id, 'modified_since': modified_since})
+        return self.batches.pop(0)
+
+
+class _FakeSession:
+    """Sessão que devolve respostas HTTP com os códigos informados, em ordem"""
+
+    def __init__(self, *status_codes, headers=None):
+        self.status_codes = list(status_codes)
+        self.headers = headers or {}
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = self.status_codes.pop(0)
+        response.headers.update(self.headers)
+        response.url = url
+        return response
+
+
+def test_circuit_breaker_state_machine(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('langchain_project.erp_crm_integration.rate_limiter.time.monotonic', lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.is_open() and not breaker.allow_request()
+
+    clock[0] += 10
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open()
+
+    clock[0] += 10
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_request_releases_probe_when_limiter_gives_up(monkeypatch):
+    manager = IntegrationManager()
+    manager.configure_rate_limit('sap', rate=1e6, capacity=1e6, failure_threshold=1, recovery_timeout=0)
+    breaker = manager.circuit_breakers['sap']
+    breaker.record_failure()
+
+    def give_up(tokens=1.0):
+        raise RateLimitExceeded("espera longa")
+
+    monkeypatch.setattr(manager.rate_limiters['sap'], 'acquire', give_up)
+    with pytest.raises(RateLimitExceeded):
+        manager._request('sap', 'GET', 'http://erp/api', session=_FakeSession(200))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    monkeypatch.undo()
+    response = manager._request('sap', 'GET', 'http://erp/api', session=_FakeSession(200))
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limited_responses_back_off_without_opening_circuit(monkeypatch):
+    manager = IntegrationManager()
+    manager.configure_rate_limit('sap', rate=1e6, capacity=1e6, failure_threshold=1)
+    limiter = manager.rate_limiters['sap']
+    pauses = []
+    monkeypatch.setattr(limiter, 'pause', pauses.append)
+
+    session = _FakeSession(429, 429, 200)
+    response = manager._request('sap', 'GET', 'http://erp/api', session=session, backoff_seconds=0.5)
+
+    assert response.status_code == 200 and session.calls == 3
+    assert pauses == [0.5, 1.0]
+    assert manager.circuit_breakers['sap'].state == CircuitBreaker.CLOSED
+
+
+def test_request_counts_server_errors_as_failures():
+    manager = IntegrationManager()
+    manager.configure_rate_limit('sap', rate=1e6, capacity=1e6, failure_threshold=1)
+    with pytest.raises(requests.HTTPError):
+        manager._request('sap', 'GET', 'http://erp/api', session=_FakeSession(500))
+    with pytest.raises(CircuitOpenError):
+        manager._request('sap', 'GET', 'http://erp/api', session=_FakeSession(200))
+
+
+def test_fallback_cache_is_tenant_scoped_and_marked_stale(workdir, simulator):
+    manager = build_manager(simulator)
+    manager.fallback_cache = True
+    fresh = manager.get_financial_data('sap', '2024-01-01', '2024-12-31', tenant_id='acme')
+    assert fresh.attrs['stale'] is False
+
+    manager.configure_rate_limit('sap', rate=1e6, capacity=1e6, failure_threshold=1)
+    manager.circuit_breakers['sap'].record_failure()
+
+    stale = manager.get_financial_data('sap', '2024-01-01', '2024-12-31', tenant_id='acme')
+    assert stale.attrs['stale'] is True
+    assert len(stale) == len(fresh)
+    assert manager.get_financial_data('sap', '2024-01-01', '2024-12-31', tenant_id='globex') is None
+
+
+def test_fallback_cache_disabled_writes_nothing(workdir, simulator):
+    build_manager(simulator).get_financial_data('sap', '2024-01-01', '2024-12-31', tenant_id='acme')
+    assert not (workdir / 'cache').exists()
+
+
+def test_refresh_job_uses_schema_key_column():
+    job = RefreshJob('acme', 'financial', 'sap', '0 * * * *')
+    assert job.key_column == 'SalesOrder'
+
+
+def test_refresh_job_requires_key_column():
+    with pytest.raises(ValueError):
+        RefreshJob('acme', 'sales', 'salesforce', '0 * * * *')
+
+
+def test_incremental_merge_keeps_latest_version_by_key(workdir):
+    first = pd.DataFrame({'Id': ['a', 'b'], 'Receita': [10.0, 20.0], 'Data': ['2024-01-01', '2024-01-02'],
+                          'Status': ['open', 'open']})
+    second = pd.DataFrame({'Id': ['b', 'c'], 'Receita': [25.0, 30.0], 'Data': ['2024-01-02', '2024-01-03'],
+                           'Status': ['won', 'open']})
+    manager = _StaticManager([first, second])
+    job = RefreshJob('acme', 'financial', 'salesforce', '0 * * * *', lookback_days=3650)
+    scheduler = RefreshScheduler(manager, [job], state_path=str(workdir / 'runs.json'))
+
+    scheduler.run_job(job, datetime(2024, 1, 5))
+    stats = scheduler.run_job(job, datetime(2024, 1, 6))
+
+    snapshot = manager.get_cached_dataset('acme', 'financial', 'salesforce').set_index('Id')
+    assert stats['last_status'] == 'success'
+    assert sorted(snapshot.index) == ['a', 'b', 'c']
+    assert snapshot.loc['b', 'Receita'] == 25.0
+
+
+def test_incremental_window_filters_on_modification_time(workdir):
+    first = pd.DataFrame({'Id': ['a'], 'Receita': [10.0], 'Data': ['2024-01-01'], 'Status': ['open']})
+    manager = _StaticManager([first, first.iloc[:0]])
+    job = RefreshJob('acme', 'financial', 'salesforce', '0 * * * *', lookback_days=30, overlap_days=1)
+    scheduler = RefreshScheduler(manager, [job], state_path=str(workdir / 'runs.json'))
+
+    scheduler.run_job(job, datetime(2024, 1, 5))
+    scheduler.run_job(job, datetime(2024, 1, 6))
+
+    full, incremental = manager.calls
+    assert full['modified_since'] is None
+    assert incremental['modified_since'] == datetime(2024, 1, 4)
+    assert full['start_date'] == '2023-12-06' and incremental['start_date'] == '2023-12-07'
+
+
+def test_stale_fallback_data_fails_the_job(workdir):
+    fresh = pd.DataFrame({'Id': ['a'], 'Receita': [10.0], 'Data': ['2024-01-01'], 'Status': ['open']})
+    stale = fresh.copy()
+    stale.attrs['stale'] = True
+    manager = _StaticManager([fresh, stale])
+    job = RefreshJob('acme', 'financial', 'salesforce', '0 * * * *', lookback_days=3650)
+    scheduler = RefreshScheduler(manager, [job], state_path=str(workdir / 'runs.json'))
+
+    scheduler.run_job(job, datetime(2024, 1, 5))
+    stats = scheduler.run_job(job, datetime(2024, 1, 6))
+
+    assert stats['last_status'] == 'failure' and stats['failures'] == 1
+    assert stats['last_success_at'] == datetime(2024, 1, 5).isoformat()
+
+
+def test_scheduler_uses_each_tenant_manager(workdir):
+    rows = pd.DataFrame({'Id': ['a'], 'Receita': [10.0], 'Data': ['2024-01-01'], 'Status': ['open']})
+    managers = {tenant: _StaticManager([rows], tenant_id=tenant) for tenant in ('acme', 'globex')}
+    jobs = [RefreshJob(tenant, 'financial', 'salesforce', '0 * * * *', lookback_days=3650)
+            for tenant in ('acme', 'globex', 'initech')]
+    scheduler = RefreshScheduler(managers, jobs, state_path=str(workdir / 'runs.json'))
+
+    results = [scheduler.run_job(job, datetime(2024, 1, 5)) for job in jobs]
+
+    assert [result['last_status'] for result in results] == ['success', 'success', 'failure']
+    assert [call['tenant_id'] for call in managers['acme'].calls] == ['acme']
+    assert [call['tenant_id'] for call in managers['globex'].calls] == ['globex']
+
+
+@pytest.mark.parametrize('source', ['salesforce', 'sap'])
+def test_financial_data_is_not_capped(workdir, simulator, source):
+    df = build_manager(simulator).get_financial_data(source, '2024-01-01', '2024-12-31')
+    assert len(df) == 1500
+
+
+def test_salesforce_financial_data_filters_on_modstamp(workdir, simulator):
+    manager = build_manager(simulator)
+    simulator.mutate(updates=7)
+    changed = manager.get_financial_data('salesforce', '2024-01-01', '2024-12-31',
+                                         modified_since=datetime.utcnow() - pd.Timedelta(minutes=5))
+    assert len(changed) == 7
+
+
+def test_parse_decimals_detects_separator_per_column():
+    brazilian = _parse_decimals(pd.Series(['1.234,56', '12,5', '1.234', '1.234.567', None]))
+    assert brazilian.iloc[:4].tolist() == [1234.56, 12.5, 1234.0, 1234567.0]
+    assert pd.isna(brazilian.iloc[4])
+
+    american = _parse_decimals(pd.Series(['1,234.56', '1,234,567', '2.5', '1,000']))
+    assert american.tolist() == [1234.56, 1234567.0, 2.5, 1000.0]
+
+    assert _parse_decimals(pd.Series(['2.5', '10', '1.234'])).tolist() == [2.5, 10.0, 1.234]
+
+
+def test_normalize_frame_maps_and_downcasts():
+    raw = pd.DataFrame({
+        'SalesOrder': ['1', '2', '3'],
+        'GrossAmount': ['1.500,25', '2.000,50', 'x'],
+        'CreationDate': ['/Date(1704067200000)/', '2024-01-02T00:00:00Z', '2024-01-03'],
+        'Status': ['OPEN', 'OPEN', 'COMPLETED']
+    })
+    df = normalize_frame(raw, get_schema('sap', 'financial'))
+
+    assert df['Receita'].iloc[:2].tolist() == [1500.25, 2000.5]
+    assert df['Data'].tolist() == list(pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03']))
+    assert isinstance(df['Status'].dtype, pd.CategoricalDtype)
+    assert df['Fonte'].astype(str).unique().tolist() == ['SAP']
+    assert df.attrs['schema_report'] == {'missing_columns': [], 'coercion_errors': {'Receita': 1}}
+
+
+def test_simulator_pages_sap_results(simulator):
+    entity = f"{ERPSimulator.SAP_PREFIX}/SalesOrderSet"
+    status, body, _ = simulator.route('GET', entity, {'$skip': '1000'}, 'erp')
+    assert status == 200 and len(body['d']['results']) == 500
+    assert '__next' not in body['d']
+
+    status, body, _ = simulator.route('GET', entity, {}, 'erp')
+    assert body['d']['__next'].startswith(f"http://erp{entity}?")
+    assert '%24skip=500' in body['d']['__next']
+
+
+def test_simulator_enforces_rate_limit_with_retry_after():
+    config = SimulatorConfig(records=10, latency_ms=0, latency_jitter_ms=0, rate_limit_rps=1)
+    with ERPSimulator(config) as sim:
+        responses = [requests.get(f"{sim.base_url}/api/financial/v1/invoices") for _ in range(5)]
+    limited = [response for response in responses if response.status_code == 429]
+    assert len(limited) >= 3
+    assert all(response.headers['Retry-After'] == '1' for response in limited)
+    assert sim.request_count == 5
+
+
+def _simulator_opportunities(simulator: ERPSimulator) -> pd.DataFrame:
+    return pd.DataFrame(simulator.datasets['Opportunity']).set_index('Id').sort_index()
+
+
+def test_salesforce_delta_sync_matches_source(workdir, simulator):
+    manager = build_manager(simulator)
+    fields = ['Name', 'Amount']
+    assert len(manager.sync_salesforce_object('Opportunity', fields)) == 1500
+
+    simulator.mutate(updates=20, deletes=10, inserts=5)
+    snapshot = manager.sync_salesforce_object('Opportunity', fields).set_index('Id').sort_index()
+
+    expected = _simulator_opportunities(simulator)
+    assert snapshot.index.equals(expected.index)
+    assert snapshot['Amount'].tolist() == expected['Amount'].tolist()
+
+
+def test_salesforce_snapshots_keep_separate_watermarks(workdir, simulator):
+    manager = build_manager(simulator)
+    manager.sync_salesforce_object('Opportunity', ['Amount'], snapshot_id='tenant_a_opp')
+    simulator.mutate(updates=15)
+    manager.sync_salesforce_object('Opportunity', ['Amount'], snapshot_id='tenant_b_opp')
+
+    # A sincronização de tenant_b não pode avançar a marca d'água de tenant_a
+    snapshot = manager.sync_salesforce_object('Opportunity', ['Amount'], snapshot_id='tenant_a_opp')
+    expected = _simulator_opportunities(simulator)
+    assert snapshot.set_index('Id').sort_index()['Amount'].tolist() == expected['Amount'].tolist()
+    assert (workdir / 'cache' / 'tenant_a_opp.watermark.json').exists()
@@ -0,0 +1,319 @@
+import math
+import time
+
+import jwt
+import pytest
+
+from langchain_project.security_system import (LoginAttemptTracker, PermissionRegistry, SecurityManager,
+                                               SQLiteUserStore, TokenRevocationList, UserStore)
+from langchain_project.security_system.security_manager import User, create_mock_users_db
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('JWT_SECRET', 'segredo-de-teste')
+    return tmp_path
+
+
+def make_user(role='analyst', permissions=None):
+    return User(id='1', username='ana', email='ana@empresa.com', full_name='Ana',
+                role=role, company_id='001', permissions=permissions)
+
+
+def test_role_masks_follow_inheritance():
+    registry = PermissionRegistry.with_defaults()
+    analyst = registry.role_mask('analyst')
+
+    assert registry.has(analyst, 'view_dashboard')
+    assert registry.has(analyst, 'edit_financial')
+    assert not registry.has(analyst, 'view_commercial')
+    assert registry.has(registry.role_mask('admin'), 'anything')
+    assert registry.role_mask('desconhecido') == 0
+
+
+def test_circular_inheritance_grants_nothing():
+    registry = PermissionRegistry()
+    registry.define_role('a', permissions=['x'], inherits=['b'])
+    registry.define_role('b', inherits=['a'])
+    assert registry.role_mask('a') == 0
+
+
+def test_individual_permissions_do_not_change_version():
+    registry = PermissionRegistry.with_defaults()
+    other = PermissionRegistry.with_defaults()
+    mask = registry.user_mask('user', ['view_dashboard', 'export_special'])
+
+    assert registry.version == other.version
+    assert registry.has(mask, 'export_special')
+    assert registry.has(mask, 'view_dashboard')
+
+
+def test_individual_permission_list_is_authoritative():
+    registry = PermissionRegistry.with_defaults()
+
+    revoked = registry.user_mask('manager', ['view_dashboard'])
+    assert registry.has(revoked, 'view_dashboard')
+    assert not registry.has(revoked, 'edit_commercial')
+    assert registry.has(registry.user_mask('manager'), 'edit_commercial')
+    assert not registry.has(registry.user_mask('analyst', []), 'view_dashboard')
+    assert registry.has(registry.user_mask('admin', []), 'edit_financial')
+
+
+def test_bits_do_not_depend_on_definition_order():
+    first = PermissionRegistry()
+    first.define_role('a', permissions=['b_perm', 'a_perm'])
+    first.define_role('b', permissions=['c_perm'])
+    second = PermissionRegistry()
+    second.user_mask('', ['adhoc'])
+    second.define_role('b', permissions=['c_perm'])
+    second.define_role('a', permissions=['b_perm', 'a_perm'])
+
+    assert first.version == second.version
+    assert first.role_mask('a') == second.role_mask('a')
+
+
+def test_check_permission_follows_role_changes(workdir):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults())
+    user = make_user('user')
+    assert not manager.check_permission(user, 'view_financial')
+
+    user.role = 'analyst'
+    assert manager.check_permission(user, 'view_financial')
+
+    manager.permissions.define_role('analyst', inherits=['user'])
+    assert not manager.check_permission(user, 'view_financial')
+
+
+def test_check_permission_follows_individual_list(workdir):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults())
+    user = make_user('manager', ['view_dashboard', 'edit_commercial'])
+    assert manager.check_permission(user, 'edit_commercial')
+
+    user.permissions = ['view_dashboard']
+    assert not manager.check_permission(user, 'edit_commercial')
+
+
+@pytest.fixture
+def store(workdir):
+    return SQLiteUserStore(str(workdir / 'users.db'))
+
+
+def sample_user(role='analyst'):
+    return {'id': '7', 'email': 'bia@empresa.com', 'company_id': '001', 'role': role,
+            'permissions': [], 'password_hash': 'x', 'salt': 'y'}
+
+
+def test_user_store_is_abstract():
+    with pytest.raises(TypeError):
+        UserStore()
+
+
+def test_user_record_writes_only_on_save(store):
+    store.add_user('bia', sample_user())
+    record = store['bia']
+    record['role'] = 'manager'
+    record['full_name'] = 'Bia'
+    assert store.get_user('bia')['role'] == 'analyst'
+
+    assert record.save()
+    assert store.get_user('bia')['role'] == 'manager'
+    assert store.get_user('bia')['full_name'] == 'Bia'
+
+
+def test_update_user_reports_missing_users(store):
+    store.add_user('bia', sample_user())
+    assert store.update_user('bia', {'email': 'nova@empresa.com'})
+    assert not store.update_user('ninguem', {'role': 'admin'})
+    assert store.get_by_email('nova@empresa.com')[0] == 'bia'
+    assert list(store.list_by_company('001')) == ['bia']
+
+
+def test_cached_reads_see_writes_from_other_connections(store, workdir):
+    store.add_user('bia', sample_user('analyst'))
+    assert store.get_user('bia')['role'] == 'analyst'
+
+    # Outro store sobre o mesmo banco faz o papel de outro processo
+    SQLiteUserStore(str(workdir / 'users.db')).update_user('bia', {'role': 'user'})
+    assert store.get_user('bia')['role'] == 'user'
+
+
+def test_login_records_last_login_in_store(store):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults())
+    store.seed(create_mock_users_db())
+
+    success, token, user = manager.login_user('analista', 'Analista@123', store)
+    assert success and token
+    assert store.get_user('analista')['last_login'] == user.last_login.isoformat()
+    assert manager.check_permission(user, 'edit_financial')
+
+
+def test_token_carries_no_permission_list(store):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults())
+    store.seed(create_mock_users_db())
+
+    _, token, _ = manager.login_user('gerente', 'Gerente@123', store)
+    payload = manager.validate_token(token)[1]
+
+    assert 'permissions' not in payload
+    assert payload['role'] == 'manager'
+
+
+def test_refresh_user_applies_admin_changes_without_new_login(store, workdir):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults())
+    store.seed(create_mock_users_db())
+    _, _, user = manager.login_user('gerente', 'Gerente@123', store)
+    assert manager.check_permission(user, 'edit_commercial')
+
+    # O admin edita o usuário em outro processo
+    SQLiteUserStore(str(workdir / 'users.db')).update_user('gerente', {'permissions': ['view_dashboard']})
+    assert manager.refresh_user(user, store)
+    assert not manager.check_permission(user, 'edit_commercial')
+
+    store.delete_user('gerente')
+    assert not manager.refresh_user(user, store)
+
+
+@pytest.fixture
+def tracker(workdir):
+    return LoginAttemptTracker(str(workdir / 'attempts.db'))
+
+
+def test_tracker_locks_after_max_attempts(tracker):
+    for expected in (1, 2):
+        attempts, locked_until = tracker.record_failure('bia', 3, 60)
+        assert (attempts, locked_until) == (expected, None)
+    assert tracker.locked_until('bia') is None
+
+    attempts, locked_until = tracker.record_failure('bia', 3, 60)
+    assert attempts == 3 and locked_until is not None
+    assert tracker.locked_until('bia') == locked_until
+    assert tracker.failed_attempts('bia') == 0
+
+
+def test_reset_in_other_process_unlocks_cached_account(tracker, workdir):
+    tracker.record_failure('bia', 1, 60)
+    assert tracker.locked_until('bia') is not None
+
+    # Outro controle sobre o mesmo banco faz o papel de outro processo
+    assert LoginAttemptTracker(str(workdir / 'attempts.db')).reset('bia')
+    assert tracker.locked_until('bia') is None
+
+
+def test_locked_until_fails_closed_on_database_error(tracker):
+    tracker._connection().close()
+    assert tracker.locked_until('bia') == math.inf
+
+
+def test_writes_from_other_processes_keep_cached_locks(tracker, workdir):
+    locked_until = tracker.record_failure('bia', 1, 60)[1]
+
+    other = LoginAttemptTracker(str(workdir / 'attempts.db'))
+    other.record_failure('caio', 5, 60)
+    tracker._sync_local_locks()
+    assert tracker._locked == {'bia': locked_until}
+
+    other.reset('bia')
+    assert tracker.locked_until('bia') is None
+
+
+def test_reset_without_failures_does_not_write(tracker, workdir):
+    other = LoginAttemptTracker(str(workdir / 'attempts.db'))._connection()
+    version = other.execute("PRAGMA data_version").fetchone()[0]
+
+    assert tracker.reset('bia')
+    assert other.execute("PRAGMA data_version").fetchone()[0] == version
+
+
+def test_record_failure_fails_closed_on_database_error(tracker):
+    tracker._connection().close()
+    assert tracker.record_failure('bia', 3, 60) == (3, math.inf)
+
+
+def test_login_is_refused_while_account_is_locked(store, tracker):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults(), login_tracker=tracker)
+    store.seed(create_mock_users_db())
+
+    for _ in range(manager.config['max_login_attempts']):
+        assert not manager.login_user('analista', 'errada', store)[0]
+    assert not manager.login_user('analista', 'Analista@123', store)[0]
+
+    tracker.reset('analista')
+    assert manager.login_user('analista', 'Analista@123', store)[0]
+
+
+def token_manager(workdir, revocations='revoked.db', **config):
+    manager = SecurityManager(permission_registry=PermissionRegistry.with_defaults(),
+                              revocation_list=TokenRevocationList(str(workdir / revocations)))
+    manager.config.update(config)
+    return manager
+
+
+def test_validated_tokens_are_served_from_cache(workdir):
+    manager = token_manager(workdir)
+    token = manager.generate_token('1', 'ana', 'analyst', '001')
+    before = manager.token_cache.stats()
+
+    assert manager.validate_token(token)[0]
+    valid, payload = manager.validate_token(token)
+
+    after = manager.token_cache.stats()
+    assert valid and payload['username'] == 'ana'
+    assert (after['misses'] - before['misses'], after['hits'] - before['hits']) == (1, 1)
+    assert not manager.validate_token(token[:-2] + 'xx')[0]
+
+
+def test_cached_token_expires_at_exp(workdir):
+    manager = token_manager(workdir)
+    # O PyJWT compara exp em segundos inteiros
+    exp = math.ceil(time.time()) + 1
+    token = jwt.encode({'sub': '1', 'username': 'ana', 'exp': exp}, 'segredo-de-teste', algorithm='HS256')
+    assert manager.validate_token(token)[0]
+    assert manager.validate_token(token)[0]
+    misses = manager.token_cache.stats()['misses']
+
+    time.sleep(exp - time.time() + 0.05)
+    assert not manager.validate_token(token)[0]
+    assert manager.token_cache.stats()['misses'] == misses + 1
+
+
+def test_token_cache_settings_are_per_configuration(workdir, tmp_path):
+    small = tmp_path / 'pequeno.json'
+    small.write_text('{"token_cache_size": 2, "token_cache_ttl_seconds": 5}')
+    default = token_manager(workdir)
+    configured = SecurityManager(config_path=str(small), revocation_list=default.revocation_list)
+
+    assert configured.token_cache.max_entries == 2 and configured.token_cache.max_ttl == 5
+    assert default.token_cache.max_entries == 10000 and default.token_cache.max_ttl == 300
+    assert token_manager(workdir).token_cache is default.token_cache
+
+
+def test_revoked_token_is_refused_by_other_processes(workdir):
+    manager = token_manager(workdir)
+    # Outro gerenciador sobre o mesmo banco faz o papel de outro processo
+    other = token_manager(workdir)
+    token = manager.generate_token('1', 'ana', 'analyst', '001')
+    assert other.validate_token(token)[0]
+
+    assert manager.revoke_token(token)
+    assert not manager.validate_token(token)[0]
+    assert not other.validate_token(token)[0]
+    assert other.validate_token(manager.generate_token('2', 'bia', 'analyst', '001'))[0]
+
+
+def test_expired_revocations_are_purged(workdir):
+    revocations = TokenRevocationList(str(workdir / 'revoked.db'))
+    assert revocations.revoke('vencido', time.time() - 1)
+    assert revocations.revoke('vigente', time.time() + 60)
+
+    assert revocations.purge_expired()
+    assert not revocations.is_revoked('vencido')
+    assert revocations.is_revoked('vigente')
+    rows = revocations._connection().execute("SELECT digest FROM revoked_tokens").fetchall()
+    assert rows == [('vigente',)]
+
+
+def test_revocation_check_fails_closed_on_database_error(workdir):
+    revocations = TokenRevocationList(str(workdir / 'revoked.db'))
+    revocations._connection().close()
+    assert revocations.is_revoked('qualquer')